@@ -0,0 +1,320 @@
+"""********************************************************************************************************************
+|
+|  Name        :  export_hostfindings_multiclient.py
+|  Description :  Exports and downloads a csv file containing hostfindings for every client associated with a user
+                  from the RiskSense platform via the REST API.  Every export is requested up front, and each one
+                  is downloaded as soon as the platform has finished generating it.
+|  Copyright   :  (c) RiskSense, Inc.
+|  License     :  Apache-2.0 (https://www.apache.org/licenses/LICENSE-2.0.txt)
+|
+********************************************************************************************************************"""
+
+import json
+import datetime
+import os
+import sys
+import requests
+import toml
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+#  Make the shared rs_api package (one directory up) importable.
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+from rs_api import client_list, export, jsondecode, session  # noqa: E402
+
+
+def get_clients(platform, key, cache_file=None, cache_max_age=0):
+
+    """
+    Retrieves the clients associated with the user's API token.
+
+    :param platform:        URL of the RiskSense platform to be queried.
+    :type  platform:        str
+
+    :param key:             API Key.
+    :type  key:             str
+
+    :param cache_file:      Path to a file to cache the list of clients in.  No cache is used if None.
+    :type  cache_file:      str
+
+    :param cache_max_age:   Number of seconds a cached list of clients can be reused for.
+    :type  cache_max_age:   int
+
+    :return:    Returns a list containing a dictionary for each client.
+    :rtype:     list
+    """
+
+    #  Retrieve every page of clients, not just the first one.  A cached list of clients
+    #  is reused if it is no older than cache_max_age seconds.
+    return client_list.get_clients(platform, key, cache_file, cache_max_age)
+
+
+def initiate_export(platform, key, client, filename):
+
+    """
+    Initiates the generation of an export file containing all host findings in .csv format.
+
+    :param platform:    URL of RiskSense Platform to be queried
+    :type  platform:    str
+
+    :param key:         API Key.
+    :type  key:         str
+
+    :param client:      Client ID associated with data to be exported.
+    :type  client:      int
+
+    :param filename:    Specifies the desired filename for the export.
+    :type  filename:    str
+
+    :return:    Returns the identifier for the export, or None if the request failed.
+    :rtype:     int
+    """
+
+    print()
+    print(f"Submitting request for host finding file export for client id {client}.")
+    export_identifier = 0
+    todays_date = datetime.date.today()
+
+    #  Assemble the URL for the API call
+    #  https://<platform>/api/vi/client/<client ID>/hostFinding/export
+    api_url = platform + '/api/v1/client/' + str(client) + '/hostFinding/export'
+
+    #  Get the shared client used to send the API call.  It provides the API key header.
+    api = session.get_client(platform, key)
+
+    #  Define the header for the API call
+    header = {
+        "Cache-Control": "no-cache"
+    }
+
+    #  This is where we define the filter(s) to be sed when generating the requested
+    #  export file.  In this case, we are filtering for host findings that have
+    #  threats.
+
+    filters = [
+        {
+            "field": "has_threat",
+            "exclusive": False,
+            "operator": "EXACT",
+            "value": True
+        }
+    ]
+
+    #  Define the body for the API call.
+    body = {
+        "filterRequest": {
+            "filters": filters
+        },
+        "fileType": "CSV",
+        "comment": "Host Finding Export for " + str(todays_date),
+        "fileName": filename
+    }
+
+    # Send API request to the platform
+    response = api.post(api_url, headers=header, data=json.dumps(body), idempotent=False)
+
+    # If successful...
+    if response and response.status_code == 200:
+        print("Export request submitted successfully.")
+        jsonified_response = jsondecode.response_json(response)
+        export_identifier = jsonified_response['id']
+
+    # If not successful...
+    else:
+        print(f"There was an error requesting the export for client id {client}.")
+        print(f"Response Status Code: {response.status_code}")
+        print(f"Response Text: {response.text}")
+        export_identifier = None
+
+    return export_identifier
+
+
+def download_exported_file(platform, key, client, export_id, filename, chunk_size=export.DEFAULT_CHUNK_SIZE):
+
+    """
+    Downloads an export via the RiskSense REST API, streaming it to disk.
+
+    :param platform:    URL of the RiskSense platform to be queried.
+    :type  platform:    str
+
+    :param key:         API Key
+    :type  key:         str
+
+    :param client:      Client ID associated with the export.
+    :type  client:      int
+
+    :param export_id:   Identifier of the export to be downloaded.
+    :type  export_id:   int
+
+    :param filename:    File path and name where download will be stored.
+    :type  filename:    str
+
+    :param chunk_size:  Number of bytes to read and write at a time.
+    :type  chunk_size:  int
+
+    :return:    Returns a boolean reflecting whether or not the download was successful.
+    :rtype:     bool
+    """
+
+    print(f"Downloading export {export_id} for client id {client} to {filename}.")
+
+    try:
+        checksum = export.download_export(platform, key, client, export_id, filename, chunk_size)
+
+    #  The connection kept failing, even after retrying.  Leave the other downloads running.
+    except requests.RequestException as error:
+        print(f"Download of export {export_id} for client id {client} failed ({error.__class__.__name__}).")
+        return False
+
+    if checksum is None:
+        return False
+
+    print(f" - Finished {filename}.  SHA-256: {checksum}")
+
+    return True
+
+
+def export_all_clients(platform, key, clients, settings, max_downloads=4):
+
+    """
+    Exports the host findings for every client.  Every export is requested up front, so
+    the platform can generate them all at once.  The exports are then polled together,
+    and each one is downloaded as soon as it is ready, with up to max_downloads
+    downloads running at the same time.  A client whose export can't be requested,
+    generated or downloaded is recorded as failed, and the rest carry on.
+
+    :param platform:        URL of the RiskSense platform to be queried.
+    :type  platform:        str
+
+    :param key:             API Key.
+    :type  key:             str
+
+    :param clients:         Clients, as returned by get_clients().
+    :type  clients:         list
+
+    :param settings:        The [export] section of the config file.
+    :type  settings:        dict
+
+    :param max_downloads:   Maximum number of exports to download at the same time.
+    :type  max_downloads:   int
+
+    :return:    The name of the downloaded file for each client ID (None if its export failed).
+    :rtype:     dict
+    """
+
+    downloaded = {client['id']: None for client in clients}
+
+    #  Request an export for every client.  Export IDs are returned.
+    exports = []
+    for client in clients:
+        export_id = initiate_export(platform, key, client['id'], f"hostfindings_export_{client['id']}")
+        if export_id is not None:
+            exports.append((client['id'], export_id))
+
+    with ThreadPoolExecutor(max_workers=max(1, max_downloads)) as executor:
+        downloads = {}
+
+        #  Hand each export to a download worker as soon as the platform has generated it, and
+        #  carry on polling for the rest in the meantime.
+        for client_id, export_id, ready in export.iter_ready_exports(
+                platform, key, exports,
+                poll_interval=settings.get('poll_interval', 2.0),
+                max_poll_interval=settings.get('max_poll_interval', 60.0),
+                timeout=settings.get('timeout', 3600.0)):
+
+            if ready:
+                filename = f"hostfindings_export_{client_id}.zip"
+                future = executor.submit(download_exported_file, platform, key, client_id, export_id, filename,
+                                         settings.get('chunk_size', export.DEFAULT_CHUNK_SIZE))
+                downloads[future] = (client_id, filename)
+
+        for future in as_completed(downloads):
+            client_id, filename = downloads[future]
+            if future.result():
+                downloaded[client_id] = filename
+
+    return downloaded
+
+
+def read_config_file(filename):
+
+    """
+    Reads TOML-formatted configuration file.
+
+    :param filename:    Path to file to be read.
+    :type  filename:    str
+
+    :return:    Variables found in config file.
+    :rtype:     dict
+    """
+
+    #  Read the config file
+    toml_data = open(filename).read()
+
+    #  Load the definitions in the config file
+    data = toml.loads(toml_data)
+
+    return data
+
+
+def main():
+
+    """ Main body of the script. """
+
+    #  Read config file to get platform info and API token
+    conf_file = os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), 'conf', 'config.toml')
+    configuration = read_config_file(conf_file)
+
+    # Set our variables based on what is read from the config file.
+    rs_url = configuration['platform']['url']
+    api_key = configuration['platform']['api_key']
+    settings = configuration.get('export', {})
+    max_downloads = settings.get('max_downloads', 4)
+
+    #  Open the shared, pooled HTTP session used for every API call made by this script.
+    session.open_client(rs_url, api_key, configuration)
+
+    #  The list of clients is cached next to the config file, so it can be reused by later runs.
+    client_cache = configuration.get('clients', {})
+    cache_file = os.path.join(os.path.dirname(conf_file), client_cache.get('cache_file', 'client_cache.json'))
+    cache_max_age = client_cache.get('cache_max_age', 0)
+
+    #  Get a list of all client IDs associated with api_key
+    clients = get_clients(rs_url, api_key, cache_file, cache_max_age)
+
+    #  Print your results to the console.
+    print()
+    print(f"{len(clients)} clients found.")
+
+    #  Export and download the host findings for every client.
+    downloaded = export_all_clients(rs_url, api_key, clients, settings, max_downloads)
+
+    print()
+    for client in clients:
+        if downloaded[client['id']]:
+            print(f"Host findings for client \"{client['name']}\" saved to {downloaded[client['id']]}.")
+        else:
+            print(f"There was an error exporting the host findings for client \"{client['name']}\".")
+
+    if not all(downloaded.values()):
+        exit(1)
+
+
+#  Execute the Script
+if __name__ == "__main__":
+    main()
+
+"""
+   Copyright 2019 RiskSense, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
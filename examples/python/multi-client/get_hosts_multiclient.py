@@ -8,64 +8,48 @@
 |
 ********************************************************************************************************************"""
 
-import json
 import os
-import requests
+import sys
 import toml
 
+#  Make the shared rs_api package (one directory up) importable.
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+from rs_api import client_list, fanout, search, session  # noqa: E402
 
-def get_clients(platform, key):
+
+def get_clients(platform, key, cache_file=None, cache_max_age=0):
 
     """
     Retrieves the clients associated with the user's API token.
 
-    :param platform:    URL of the RiskSense platform to be queried.
-    :type  platform:    str
+    :param platform:        URL of the RiskSense platform to be queried.
+    :type  platform:        str
 
-    :param key:         API Key.
-    :type  key:         str
+    :param key:             API Key.
+    :type  key:             str
+
+    :param cache_file:      Path to a file to cache the list of clients in.  No cache is used if None.
+    :type  cache_file:      str
+
+    :param cache_max_age:   Number of seconds a cached list of clients can be reused for.
+    :type  cache_max_age:   int
 
     :return:    Returns a list containing a dictionary for each client.
     :rtype:     list
     """
 
-    #  Set the page size for returned results
-    page_size = 100
-
-    #  Assemble the URL for the API call
-    url = platform + "/api/v1/client?size=" + str(page_size)
-
-    #  Define the header for the API call
-    header = {
-        'x-api-key': key,
-        'content-type': 'application/json'
-    }
-
-    #  Send API request to the platform
-    response = requests.get(url, headers=header)
+    #  Retrieve every page of clients, not just the first one.  A cached list of clients
+    #  is reused if it is no older than cache_max_age seconds.
+    return client_list.get_clients(platform, key, cache_file, cache_max_age)
 
-    # If request is successful...
-    if response and response.status_code == 200:
-        json_client_id_response = json.loads(response.text)
 
-    # If request is unsuccessful...
-    else:
-        #  print the actual response from the platform to the API query.
-        print("There was an issue retrieving the clients from the API.")
-        print(f"Status Code: {response.status_code}")
-        print(f"Response: {response.text}")
-        exit(1)
-
-    found_ids = json_client_id_response['_embedded']['clients']
-
-    return found_ids
-
-
-def get_hosts(platform, key, client_id):
+def iter_hosts(platform, key, client_id, max_workers=1, checkpoint=None):
 
     """
-    Retrieve a list of all of the hosts with a criticality of "5" that are associated
-    with the specified client ID.
+    Yields each of the hosts with a criticality of "5" that are associated with the
+    specified client ID.
+    Results are yielded one page at a time, so they can be processed without holding
+    all of them in memory.
 
     :param platform:    URL of the RiskSense platform to be queried.
     :type  platform:    str
@@ -76,24 +60,15 @@ def get_hosts(platform, key, client_id):
     :param client_id:   ID of the client to be queried.
     :type  client_id:   int
 
-    :return:    A list of all hosts returned by the API.
-    :rtype:     list
-    """
-
-    #  Assemble the URL for the API call
-    url = platform + "/api/v1/client/" + str(client_id) + "/host/search"
+    :param max_workers: Maximum number of pages of results to request concurrently.
+    :type  max_workers: int
 
-    #  Set the page size for returned results
-    page_size = 100
+    :param checkpoint:  Saves progress after each page, so an interrupted search can be resumed.
+    :type  checkpoint:  checkpoint.Checkpoint
 
-    #  Set the initial page of results to retrieve
-    page = 0
-
-    #  Define the header for the API call
-    header = {
-        "x-api-key": key,
-        "content-type": "application/json"
-    }
+    :return:    A generator of the hosts found.
+    :rtype:     generator
+    """
 
     #  Define the filters to be used in your query.  In this case we are filtering
     #  for hosts with a criticality of "5"
@@ -108,63 +83,36 @@ def get_hosts(platform, key, client_id):
         #  just as you can in the UI.
     ]
 
-    # Define the body for your API call.
-    body = {
-        "filters": filters,
-        "projection": "basic",  # Can also be set to "detail"
-        "sort": [
-            {
-                "field": "id",
-                "direction": "ASC"
-            }
-        ],
-        "page": page,
-        "size": page_size
-    }
-
-    #  Send your request to the API, and get the number of pages of results
-    #  that are available.
-    response = requests.post(url, headers=header, data=json.dumps(body))
-
-    #  If request is successful...
-    if response and response.status_code == 200:
-        jsonified_result = json.loads(response.text)
-
-    else:
-        print("There was an error retrieving the hosts from the API.")
-        print(f"Status Code Returned: {response.status_code}")
-        print(f"Response: {response.text}")
-        exit(1)
+    #  Send the search to the API, requesting the pages of results as they are needed.  The projection
+    #  can also be set to "detail".
+    return search.iter_search(platform, key, client_id, "host", filters, projection="basic",
+                              max_workers=max_workers, checkpoint=checkpoint)
 
-    number_of_pages = jsonified_result['page']['totalPages']
 
-    all_hosts = []
+def get_hosts(platform, key, client_id, max_workers=1):
 
-    #  Cycle thorough all of the pages of host results and add them to a list to be returned.
-    while page < number_of_pages:
+    """
+    Retrieve a list of all of the hosts with a criticality of "5" that are associated
+    with the specified client ID.
 
-        print(f"Getting page {page + 1}/{number_of_pages} of hosts for client id {client_id}...")
-        response = requests.post(url, headers=header, data=json.dumps(body))
+    :param platform:    URL of the RiskSense platform to be queried.
+    :type  platform:    str
 
-        #  If request is successful...
-        if response and response.status_code == 200:
-            jsonified_result = json.loads(response.text)
+    :param key:         API Key.
+    :type  key:         str
 
-        else:
-            print(f"There was an error retrieving page {page} of the found hosts.")
-            print(f"Status Code: {response.status_code}")
-            print(f"Response: {response.text}")
-            exit(1)
+    :param client_id:   ID of the client to be queried.
+    :type  client_id:   int
 
-        #  Append the hosts found to our list to be returned.
-        for finding in jsonified_result['_embedded']['hosts']:
-            all_hosts.append(finding)
+    :param max_workers: Maximum number of pages of results to request concurrently.
+    :type  max_workers: int
 
-        # Increment the page number to retrieve in the next run.
-        page += 1
-        body['page'] = page
+    :return:    A list of all hosts returned by the API.
+    :rtype:     list
+    """
 
-    return all_hosts
+    #  Collect every one of the hosts yielded by iter_hosts() into a single list.
+    return list(iter_hosts(platform, key, client_id, max_workers=max_workers))
 
 
 def read_config_file(filename):
@@ -199,9 +147,19 @@ def main():
     # Set our variables based on what is read from the config file.
     rs_url = configuration['platform']['url']
     api_key = configuration['platform']['api_key']
+    max_workers = configuration.get('search', {}).get('max_workers', 1)
+    max_clients = configuration.get('search', {}).get('max_clients', 1)
+
+    #  Open the shared, pooled HTTP session used for every API call made by this script.
+    session.open_client(rs_url, api_key, configuration)
+
+    #  The list of clients is cached next to the config file, so it can be reused by later runs.
+    client_cache = configuration.get('clients', {})
+    cache_file = os.path.join(os.path.dirname(conf_file), client_cache.get('cache_file', 'client_cache.json'))
+    cache_max_age = client_cache.get('cache_max_age', 0)
 
     #  Get a list of all client IDs associated with api_key
-    clients = get_clients(rs_url, api_key)
+    clients = get_clients(rs_url, api_key, cache_file, cache_max_age)
 
     #  Print your results to the console.
     print()
@@ -211,15 +169,19 @@ def main():
     print("Getting hosts for each client identified.")
     print()
 
-    #  Cycle through the list of clients that were found, and get the hosts for each
-    #  of these client IDs.  Print the number of hosts found.
-    for client in clients:
+    #  Get the hosts for each of the clients that were found, processing up to max_clients
+    #  clients at the same time.  Print the number of hosts found for each client.
+    results = fanout.run_for_clients(
+        clients,
+        lambda client: get_hosts(rs_url, api_key, client['id'], max_workers=max_workers),
+        max_clients=max_clients
+    )
 
-        # hosts variable is a list of all hosts found for that client
-        hosts = get_hosts(rs_url, api_key, client['id'])
+    for client, hosts, elapsed in results:
 
         #  Print your results to the console.
-        print(f"{len(hosts)} open hosts found with a criticality of 5 for client \"{client['name']}\".")
+        print(f"{len(hosts)} open hosts found with a criticality of 5 for client \"{client['name']}\" "
+              f"in {elapsed:.1f} seconds.")
         print()
 
 
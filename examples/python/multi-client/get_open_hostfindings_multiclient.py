@@ -8,66 +8,47 @@
 |
 ********************************************************************************************************************"""
 
-import json
 import os
-import requests
+import sys
 import toml
 
+#  Make the shared rs_api package (one directory up) importable.
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+from rs_api import client_list, fanout, search, session  # noqa: E402
 
-def get_clients(platform, key):
+
+def get_clients(platform, key, cache_file=None, cache_max_age=0):
 
     """
     Retrieve all clients that associated with a user.
 
-    :param platform:    URL for RiskSense Platform to be queried
-    :type  platform:    str
+    :param platform:        URL for RiskSense Platform to be queried
+    :type  platform:        str
 
-    :param key:         API Key
-    :type  key:         str
+    :param key:             API Key
+    :type  key:             str
+
+    :param cache_file:      Path to a file to cache the list of clients in.  No cache is used if None.
+    :type  cache_file:      str
+
+    :param cache_max_age:   Number of seconds a cached list of clients can be reused for.
+    :type  cache_max_age:   int
 
     :return:    Returns a list of clients found.
     :rtype:     list
     """
 
-    #  Set page size for results to be returned.
-    page_size = 100
-
-    #  Assemble the URL for the API call.
-    url = platform + "/api/v1/client?size=" + str(page_size)
-
-    #  Define the header for the API call.
-    header = {
-        'x-api-key': key,
-        'content-type': 'application/json'
-    }
-
-    #  Make the API call
-    response = requests.get(url, headers=header)
+    #  Retrieve every page of clients, not just the first one.  A cached list of clients
+    #  is reused if it is no older than cache_max_age seconds.
+    return client_list.get_clients(platform, key, cache_file, cache_max_age)
 
-    #  If request is successful...
-    if response and response.status_code == 200:
 
-        #  Convert the response to JSON
-        jsonified_response = json.loads(response.text)
-
-    #  If request is unsuccessful...
-    else:
-        print("There was an error retrieving the client IDs.")
-        print(f"Status Code: {response.status_code}")
-        print(f"Response: {response.text}")
-        exit(1)
-
-    #  Grab the list of found clients from the JSON-converted
-    #  response. Variable found_clients is a list of dictionaries.
-    found_clients = jsonified_response['_embedded']['clients']
-
-    return found_clients
-
-
-def get_all_open_hostfindings(platform, key, client_id):
+def iter_open_hostfindings(platform, key, client_id, max_workers=1, checkpoint=None, keyset=False):
 
     """
-    Retrieve all open hostfindings that are associated with the specified client ID.
+    Yields each of the open hostfindings that are associated with the specified client ID.
+    Results are yielded one page at a time, so they can be processed without holding
+    all of them in memory.
 
     :param platform:    URL for RiskSense Platform to be queried
     :type  platform:    str
@@ -78,24 +59,19 @@ def get_all_open_hostfindings(platform, key, client_id):
     :param client_id:   Client ID to be queried
     :type  client_id:   int
 
-    :return:    Returns a list of the hostfindings found.
-    :rtype:     list
-    """
-
-    #  Assemble the URL for the API call
-    url = platform + "/api/v1/client/" + str(client_id) + "/hostFinding/search"
+    :param max_workers: Maximum number of pages of results to request concurrently.
+    :type  max_workers: int
 
-    #  Set the page size for the returned results.  This is the number of results in a single page.
-    page_size = 100
+    :param checkpoint:  Saves progress after each page, so an interrupted search can be resumed.
+    :type  checkpoint:  checkpoint.Checkpoint
 
-    #  Set the initial page to retrieve.
-    page = 0
+    :param keyset:      Page through the results by ID (keyset pagination) rather than by page
+                        number.  Faster for very large searches.
+    :type  keyset:      bool
 
-    #  Define the header for the API call.
-    header = {
-        "x-api-key": key,
-        "content-type": "application/json"
-    }
+    :return:    A generator of the hostfindings found.
+    :rtype:     generator
+    """
 
     #  Define the filters for the API call.  In this case, we are filtering for all
     #  hostfindings that are open.
@@ -109,73 +85,35 @@ def get_all_open_hostfindings(platform, key, client_id):
         #  You can stack multiple filters here to further narrow your results , just as in the UI.
     ]
 
-    #  Define the body for the API call.
-    body = {
-        "filters": filters,
-        "projection": "basic",  # Can also be set to "detail"
-        "sort": [
-            {
-                "field": "id",
-                "direction": "ASC"
-            }
-        ],
-        "page": page,
-        "size": page_size
-    }
-
-    #  Send API request to the platform
-    response = requests.post(url, headers=header, data=json.dumps(body))
-
-    #  If request is successful...
-    if response and response.status_code == 200:
-
-        # Convert response to JSON format
-        jsonified_response = json.loads(response.text)
-
-        # Get the number of available pages of results from the response.
-        number_of_pages = jsonified_response['page']['totalPages']
+    #  Send the search to the API, requesting the pages of results as they are needed.  The projection
+    #  can also be set to "detail".
+    return search.iter_search(platform, key, client_id, "hostFinding", filters, projection="basic",
+                              max_workers=max_workers, checkpoint=checkpoint, keyset=keyset)
 
-    #  If request is unsuccessful...
-    else:
-        print("There was an error retrieving the hostfindings from the API")
-        print(f"Status Code: {response.status_code}")
-        print(f"Response: {response.text}")
-        exit(1)
 
-    all_hostfindings = []
+def get_all_open_hostfindings(platform, key, client_id, max_workers=1):
 
-    ###########################################
-    #  Cycle thorough all of the pages of
-    #  hostfindings and add them to a list
-    #  to be returned.
-    ###########################################
-    while page < number_of_pages:
-
-        print(f"Getting page {page + 1}/{number_of_pages} pages of hostFindings for client id {client_id}...")
+    """
+    Retrieve all open hostfindings that are associated with the specified client ID.
 
-        #  Send API request to the platform for this page of hostfindings
-        response = requests.post(url, headers=header, data=json.dumps(body))
+    :param platform:    URL for RiskSense Platform to be queried
+    :type  platform:    str
 
-        #  If request is successful...
-        if response and response.status_code == 200:
-            jsonified_response = json.loads(response.text)
+    :param key:         API Key
+    :type  key:         str
 
-        #  If request is unsuccessful...
-        else:
-            print(f"There was an issue retrieving page {page} of hostfindings.")
-            print(f"Status Code: {response.status_code}")
-            print(f"Response: {response.text}")
-            exit(1)
+    :param client_id:   Client ID to be queried
+    :type  client_id:   int
 
-        #  Cycle through findings in this set of results and append to the list to be returned.
-        for finding in jsonified_response['_embedded']['hostFindings']:
-            all_hostfindings.append(finding)
+    :param max_workers: Maximum number of pages of results to request concurrently.
+    :type  max_workers: int
 
-        #  Increment the page number for the next run.
-        page += 1
-        body['page'] = page
+    :return:    Returns a list of the hostfindings found.
+    :rtype:     list
+    """
 
-    return all_hostfindings
+    #  Collect every one of the hostfindings yielded by iter_open_hostfindings() into a single list.
+    return list(iter_open_hostfindings(platform, key, client_id, max_workers=max_workers))
 
 
 def read_config_file(filename):
@@ -210,9 +148,20 @@ def main():
     # Set our variables based on what is read from the config file.
     rs_url = configuration['platform']['url']
     api_key = configuration['platform']['api_key']
+    max_workers = configuration.get('search', {}).get('max_workers', 1)
+    keyset = configuration.get('search', {}).get('keyset', False)
+    max_clients = configuration.get('search', {}).get('max_clients', 1)
+
+    #  Open the shared, pooled HTTP session used for every API call made by this script.
+    session.open_client(rs_url, api_key, configuration)
+
+    #  The list of clients is cached next to the config file, so it can be reused by later runs.
+    client_cache = configuration.get('clients', {})
+    cache_file = os.path.join(os.path.dirname(conf_file), client_cache.get('cache_file', 'client_cache.json'))
+    cache_max_age = client_cache.get('cache_max_age', 0)
 
     #  Get all client IDs associated with your user.
-    clients = get_clients(rs_url, api_key)
+    clients = get_clients(rs_url, api_key, cache_file, cache_max_age)
 
     #  Print the number of clients found to the console.
     print()
@@ -220,14 +169,20 @@ def main():
     print(clients)
     print()
 
-    #  Get all hostFindings associated with each Client ID
-    for client in clients:
+    #  Count all hostFindings associated with each Client ID as they are retrieved, processing
+    #  up to max_clients clients at the same time.
+    results = fanout.run_for_clients(
+        clients,
+        lambda client: sum(1 for _ in iter_open_hostfindings(rs_url, api_key, client['id'], max_workers=max_workers,
+                                                             keyset=keyset)),
+        max_clients=max_clients
+    )
 
-        #  Get all hostfindings associated with a client ID
-        hostfindings = get_all_open_hostfindings(rs_url, api_key, client['id'])
+    for client, number_of_hostfindings, elapsed in results:
 
         #  Print the number of hostfindings found to the console.
-        print(f"{len(hostfindings)} open hostFindings found for Client {client['name']} found: ")
+        print(f"{number_of_hostfindings} open hostFindings found for Client {client['name']} "
+              f"in {elapsed:.1f} seconds.")
         print()
 
 
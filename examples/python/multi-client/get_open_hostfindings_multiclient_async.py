@@ -0,0 +1,159 @@
+"""********************************************************************************************************************
+|
+|  Name        :  get_open_hostfindings_multiclient_async.py
+|  Description :  Retrieves a list of all open hostfindings for all clients associated with a user from the
+                  RiskSense API.  Uses asyncio so that the pages for every client are requested from a single
+                  event loop, instead of one client at a time.
+|  Copyright   :  (c) RiskSense, Inc.
+|  License     :  Apache-2.0 (https://www.apache.org/licenses/LICENSE-2.0.txt)
+|
+********************************************************************************************************************"""
+
+import asyncio
+import os
+import sys
+import toml
+
+#  Make the shared rs_api package (one directory up) importable.
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+from rs_api import async_client, ratelimit, retry  # noqa: E402
+
+
+def read_config_file(filename):
+
+    """
+    Reads TOML-formatted configuration file.
+
+    :param filename:    path to file to be read.
+    :type  filename:    str
+
+    :return:    Variables found in config file.
+    :rtype:     dict
+    """
+
+    #  Read the config file
+    toml_data = open(filename).read()
+
+    #  Load the definitions in the config file
+    data = toml.loads(toml_data)
+
+    return data
+
+
+async def count_open_hostfindings(api, client_id):
+
+    """
+    Counts the open hostfindings that are associated with the specified client ID, one
+    page at a time, so only the pages in flight are held in memory.
+
+    :param api:         Client to send the requests with.
+    :type  api:         AsyncApiClient
+
+    :param client_id:   Client ID to be queried.
+    :type  client_id:   int
+
+    :return:    The number of open hostfindings found.
+    :rtype:     int
+    """
+
+    number_of_hostfindings = 0
+
+    async for hostfindings in async_client.iter_open_hostfindings(api, client_id):
+        number_of_hostfindings += len(hostfindings)
+
+    return number_of_hostfindings
+
+
+async def count_hostfindings_for_all_clients(platform, key, pool_size, max_in_flight, retry_policy, rate_limiter):
+
+    """
+    Count the open hostfindings for every client associated with the API key.
+
+    :param platform:        URL for RiskSense Platform to be queried
+    :type  platform:        str
+
+    :param key:             API Key
+    :type  key:             str
+
+    :param pool_size:       Maximum number of connections to keep open to the platform.
+    :type  pool_size:       int
+
+    :param max_in_flight:   Maximum number of requests to have in flight at once.
+    :type  max_in_flight:   int
+
+    :param retry_policy:    Policy for retrying failed requests.
+    :type  retry_policy:    RetryPolicy
+
+    :param rate_limiter:    Rate limiter shared by every request.
+    :type  rate_limiter:    RateLimiter
+
+    :return:    Returns a list of (client, number of open hostfindings) pairs.
+    :rtype:     list
+    """
+
+    async with async_client.AsyncApiClient(platform, key, pool_size, max_in_flight, retry_policy,
+                                           rate_limiter) as api:
+
+        #  Get all client IDs associated with your user.
+        clients = await async_client.get_clients(api)
+
+        #  Print the number of clients found to the console.
+        print()
+        print(f"{len(clients)} clients found: ")
+        print()
+
+        #  Search every client at the same time.  The client's max_in_flight limit keeps the
+        #  number of requests sent at once under control, and each search only requests a few
+        #  pages ahead of the count.
+        results = await asyncio.gather(*[
+            count_open_hostfindings(api, client['id']) for client in clients
+        ])
+
+    return list(zip(clients, results))
+
+
+def main():
+
+    """ Main Body of script. """
+
+    #  Define the path to the config file, and read it
+    conf_file = os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), 'conf', 'config.toml')
+    configuration = read_config_file(conf_file)
+
+    # Set our variables based on what is read from the config file.
+    rs_url = configuration['platform']['url']
+    api_key = configuration['platform']['api_key']
+    pool_size = configuration.get('http', {}).get('pool_size', 10)
+    max_in_flight = configuration.get('search', {}).get('max_in_flight', 50)
+    retry_policy = retry.RetryPolicy.from_config(configuration)
+    rate_limiter = ratelimit.RateLimiter.from_config(configuration)
+
+    #  Count the hostFindings associated with each Client ID
+    results = asyncio.run(count_hostfindings_for_all_clients(rs_url, api_key, pool_size, max_in_flight,
+                                                             retry_policy, rate_limiter))
+
+    #  Print the number of hostfindings found for each client to the console.
+    for client, number_of_hostfindings in results:
+        print(f"{number_of_hostfindings} open hostFindings found for Client {client['name']} found: ")
+        print()
+
+
+#  Execute the Script
+if __name__ == "__main__":
+    main()
+
+"""
+   Copyright 2019 RiskSense, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
@@ -8,66 +8,47 @@
 |
 ********************************************************************************************************************"""
 
-import json
 import os
-import requests
+import sys
 import toml
 
+#  Make the shared rs_api package (one directory up) importable.
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+from rs_api import client_list, fanout, search, session  # noqa: E402
 
-def get_clients(platform, key):
+
+def get_clients(platform, key, cache_file=None, cache_max_age=0):
 
     """
     Gets and returns a list of all clients associated with your API key.
 
-    :param platform:    URL for the RiskSense platform to be queried
-    :type  platform:    str
+    :param platform:        URL for the RiskSense platform to be queried
+    :type  platform:        str
 
-    :param key:         API Key
-    :type  key:         str
+    :param key:             API Key
+    :type  key:             str
+
+    :param cache_file:      Path to a file to cache the list of clients in.  No cache is used if None.
+    :type  cache_file:      str
+
+    :param cache_max_age:   Number of seconds a cached list of clients can be reused for.
+    :type  cache_max_age:   int
 
     :return:    A list containing a dictionary of attributes for each client found.
     :rtype:     list
     """
 
-    #  Define the page size for the results returned.
-    page_size = 100
-
-    #  Assemble the URL for the API request
-    url = platform + "/api/v1/client?size=" + str(page_size)
-
-    # Define the header for your API request.
-    header = {
-        'x-api-key': key,
-        'content-type': 'application/json'
-    }
-
-    #  Send the request to the API
-    response = requests.get(url, headers=header)
-
-    #  If the request is successful...
-    if response and response.status_code == 200:
+    #  Retrieve every page of clients, not just the first one.  A cached list of clients
+    #  is reused if it is no older than cache_max_age seconds.
+    return client_list.get_clients(platform, key, cache_file, cache_max_age)
 
-        #  Convert the response text to JSON format
-        jsonified_response = json.loads(response.text)
 
-        # Get the found clients from the JSON response.
-        # found_clients is a list of dictionaries.
-        found_clients = jsonified_response['_embedded']['clients']
-
-    #  If the request is unsuccessful...
-    else:
-        print("There was an error retrieving the clients from the API.")
-        print(f"Status Code: {response.status_code}")
-        print(f"Response: {response.text}")
-        exit(1)
-
-    return found_clients
-
-
-def get_users(platform, key, client_id):
+def iter_users(platform, key, client_id, max_workers=1, checkpoint=None):
 
     """
-    Gets and returns a list of all users with a 'Manager' role for the specified client ID.
+    Yields each of the users with a 'Manager' role for the specified client ID.
+    Results are yielded one page at a time, so they can be processed without holding
+    all of them in memory.
 
     :param platform:    URL for the RiskSense platform to be queried.
     :type  platform:    str
@@ -78,24 +59,15 @@ def get_users(platform, key, client_id):
     :param client_id:   Client ID to be queried.
     :type  client_id:   int
 
-    :return:    Returns a list of all users with a 'Manager' role for the specified client ID.
-    :rtype:     list
-    """
-
-    #  Assemble the URL for the API request
-    url = platform + "/api/v1/client/" + str(client_id) + "/user/search"
+    :param max_workers: Maximum number of pages of results to request concurrently.
+    :type  max_workers: int
 
-    #  Define the page size for returned results.  This is the number of results in a single page.
-    page_size = 100
+    :param checkpoint:  Saves progress after each page, so an interrupted search can be resumed.
+    :type  checkpoint:  checkpoint.Checkpoint
 
-    #  Define the page number to begin with when sending the API request.
-    page = 0
-
-    #  Define the header for your API request
-    header = {
-        "x-api-key": key,
-        "content-type": "application/json"
-    }
+    :return:    A generator of the users found.
+    :rtype:     generator
+    """
 
     #  Define the filters to be used in the API request.  In this case we are filtering for
     #  all users with a "Manager" role.
@@ -109,66 +81,34 @@ def get_users(platform, key, client_id):
         #  You can stack multiple filters here to further narrow your results, just as in the UI
     ]
 
-    #  Define the body for the API request.
-    body = {
-        "filters": filters,
-        "projection": "basic",
-        "sort": [
-            {
-                "field": "id",
-                "direction": "ASC"
-            }
-        ],
-        "page": page,
-        "size": page_size
-    }
-
-    #  Send the request to the API
-    response = requests.post(url, headers=header, data=json.dumps(body))
-
-    #  If the request is successful...
-    if response and response.status_code == 200:
-        jsonified_response = json.loads(response.text)
-        number_of_pages = jsonified_response['page']['totalPages']
-
-    #  If the request is unsuccessful...
-    else:
-        print("There was an error retrieving the users from the API.")
-        print(f"Status Code: {response.status_code}")
-        print(f"Response: {response.text}")
-        exit(1)
+    #  Send the search to the API, requesting the pages of results as they are needed.
+    return search.iter_search(platform, key, client_id, "user", filters, projection="basic",
+                              max_workers=max_workers, checkpoint=checkpoint)
 
-    found_users = []
 
-    #  Cycle thorough all of the pages of users and add them to a list to be returned.
-    while page < number_of_pages:
+def get_users(platform, key, client_id, max_workers=1):
 
-        print(f"Getting page {page + 1} of {number_of_pages} pages of users for client id {client_id}...")
-
-        # Send the request to the API
-        response = requests.post(url, headers=header, data=json.dumps(body))
+    """
+    Gets and returns a list of all users with a 'Manager' role for the specified client ID.
 
-        #  If the request is successful...
-        if response and response.status_code == 200:
+    :param platform:    URL for the RiskSense platform to be queried.
+    :type  platform:    str
 
-            # Convert the response text to JSON format.
-            jsonified_response = json.loads(response.text)
+    :param key:         API Key
+    :type  key:         str
 
-        #  If the request is unsuccessful...
-        else:
-            print(f"There was an error retrieving page {page} of users from the API.")
-            print(f"Status Code: {response.status_code}")
-            print(f"Response: {response.text}")
-            exit(1)
+    :param client_id:   Client ID to be queried.
+    :type  client_id:   int
 
-        for finding in jsonified_response['_embedded']['users']:
-            found_users.append(finding)
+    :param max_workers: Maximum number of pages of results to request concurrently.
+    :type  max_workers: int
 
-        #  Increment the page number for the next run
-        page += 1
-        body['page'] = page
+    :return:    Returns a list of all users with a 'Manager' role for the specified client ID.
+    :rtype:     list
+    """
 
-    return found_users
+    #  Collect every one of the users yielded by iter_users() into a single list.
+    return list(iter_users(platform, key, client_id, max_workers=max_workers))
 
 
 def read_config_file(filename):
@@ -203,9 +143,19 @@ def main():
     #  Set our variables based on what is read from the config file.
     rs_url = configuration['platform']['url']
     api_key = configuration['platform']['api_key']
+    max_workers = configuration.get('search', {}).get('max_workers', 1)
+    max_clients = configuration.get('search', {}).get('max_clients', 1)
+
+    #  Open the shared, pooled HTTP session used for every API call made by this script.
+    session.open_client(rs_url, api_key, configuration)
+
+    #  The list of clients is cached next to the config file, so it can be reused by later runs.
+    client_cache = configuration.get('clients', {})
+    cache_file = os.path.join(os.path.dirname(conf_file), client_cache.get('cache_file', 'client_cache.json'))
+    cache_max_age = client_cache.get('cache_max_age', 0)
 
     #  Get a list of all clients associated with your api_key
-    clients = get_clients(rs_url, api_key)
+    clients = get_clients(rs_url, api_key, cache_file, cache_max_age)
 
     #  Print your results to the console.
     print()
@@ -215,14 +165,17 @@ def main():
     print("Getting users for each client identified.")
     print()
 
-    #  Cycle through all clients returned and get the users for each of them.
-    for client in clients:
+    #  Get the users for each of the clients returned, processing up to max_clients at the same time.
+    results = fanout.run_for_clients(
+        clients,
+        lambda client: get_users(rs_url, api_key, client['id'], max_workers=max_workers),
+        max_clients=max_clients
+    )
 
-        # users variable is a list of all users found for that client
-        users = get_users(rs_url, api_key, client['id'])
+    for client, users, elapsed in results:
 
         #  Print the number of users with a "Manager" role to the console.
-        print(f"{len(users)} users (Managers) for client \"{client['name']}\" found. ")
+        print(f"{len(users)} users (Managers) for client \"{client['name']}\" found in {elapsed:.1f} seconds.")
         print()
 
 
@@ -7,66 +7,47 @@
 |
 ********************************************************************************************************************"""
 
-import json
 import os
+import sys
 import toml
-import requests
 
+#  Make the shared rs_api package (one directory up) importable.
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+from rs_api import client_list, fanout, search, session  # noqa: E402
 
-def get_clients(platform, key):
+
+def get_clients(platform, key, cache_file=None, cache_max_age=0):
 
     """
     Gets and returns a list of all client IDs associated with your API key.
 
-    :param platform:    URL of RiskSense platform to be queried.
-    :type  platform:    str
+    :param platform:        URL of RiskSense platform to be queried.
+    :type  platform:        str
 
-    :param key:         API Key
-    :type  key:         str
+    :param key:             API Key
+    :type  key:             str
+
+    :param cache_file:      Path to a file to cache the list of clients in.  No cache is used if None.
+    :type  cache_file:      str
+
+    :param cache_max_age:   Number of seconds a cached list of clients can be reused for.
+    :type  cache_max_age:   int
 
     :return:    Returns a list of all client IDs associated with your API key.
     :rtype:     list
     """
 
-    #  Define the size of the page to be returned by request.  This is the number
-    #  of results on a single page.
-    page_size = 100
-
-    #  Assemble the URL for your API request
-    url = platform + "/api/v1/client?size=" + str(page_size)
-
-    #  Define the header for your API request
-    header = {
-        'x-api-key': key,
-        'content-type': 'application/json'
-    }
-
-    #  Submit your request to the API
-    response = requests.get(url, headers=header)
+    #  Retrieve every page of clients, not just the first one.  A cached list of clients
+    #  is reused if it is no older than cache_max_age seconds.
+    return client_list.get_clients(platform, key, cache_file, cache_max_age)
 
-    #  If the request is successful...
-    if response and response.status_code == 200:
-        #  Convert the response text to JSON format.
-        jsonified_response = json.loads(response.text)
 
-        #  Get the found_ids from the JSON-formatted response.
-        #  found_ids is a list of dictionaries.
-        found_clients = jsonified_response['_embedded']['clients']
-
-    #  If the request is unsuccessful...
-    else:
-        print("There was an error retrieving the clients from the API.")
-        print(f"Status Code: {response.status_code}")
-        print(f"Response: {response.text}")
-        exit(1)
-
-    return found_clients
-
-
-def get_networks(platform, key, client_id):
+def iter_networks(platform, key, client_id, max_workers=1, checkpoint=None):
 
     """
-    Gets all networks with a type of 'hostname' for the specified client ID.
+    Yields each of the networks with a type of 'hostname' for the specified client ID.
+    Results are yielded one page at a time, so they can be processed without holding
+    all of them in memory.
 
     :param platform:    URL of RiskSense platform to be queried.
     :type  platform:    str
@@ -77,25 +58,15 @@ def get_networks(platform, key, client_id):
     :param client_id:   Client ID to be queried.
     :type  client_id:   int
 
-    :return:    Returns a list of dictionaries containing all of the found networks.
-    :rtype:     list
-    """
-
-    #  Assemble the URL for the API request.
-    url = platform + "/api/v1/client/" + str(client_id) + "/network/search"
+    :param max_workers: Maximum number of pages of results to request concurrently.
+    :type  max_workers: int
 
-    #  Define the page size for your request.  This is the number of results that can
-    #  be returned in a single page.
-    page_size = 100
+    :param checkpoint:  Saves progress after each page, so an interrupted search can be resumed.
+    :type  checkpoint:  checkpoint.Checkpoint
 
-    #  Define the starting page for your requests.
-    page = 0
-
-    #  Define the header for your request.
-    header = {
-        "x-api-key": key,
-        "content-type": "application/json"
-    }
+    :return:    A generator of the networks found.
+    :rtype:     generator
+    """
 
     #  Define the filter(s) for your request.  In this case, we are filtering for
     #  any network that is of the type "hostname".
@@ -109,65 +80,35 @@ def get_networks(platform, key, client_id):
         #  You can stack multiple filters here to further narrow the results, just as in the UI
     ]
 
-    #  Define the body for your request.
-    body = {
-        "filters": filters,
-        "projection": "basic",  # There is no "detail" projection for networks
-        "sort": [
-            {
-                "field": "id",
-                "direction": "ASC"
-            }
-        ],
-        "page": page,
-        "size": page_size
-    }
-
-    #  Submit your request to the API.
-    response = requests.post(url, headers=header, data=json.dumps(body))
-
-    #  If the request is successful...
-    if response and response.status_code == 200:
-        jsonified_response = json.loads(response.text)
-        number_of_pages = jsonified_response['page']['totalPages']
-
-    #  If the request is unsuccessful...
-    else:
-        print("There was an error retrieving the networks from the API.")
-        print(f"Status Code: {response.status_code}")
-        print(f"Response: {response.text}")
-        exit(1)
+    #  Send the search to the API, requesting the pages of results as they are needed.
+    #  There is no "detail" projection for networks.
+    return search.iter_search(platform, key, client_id, "network", filters, projection="basic",
+                              max_workers=max_workers, checkpoint=checkpoint)
 
-    found_networks = []
 
-    # Cycle through all of the pages of results, and add them to a list (found_networks)
-    while page < number_of_pages:
+def get_networks(platform, key, client_id, max_workers=1):
 
-        print(f"Getting page {page + 1}/{number_of_pages} of networks for client id {client_id}...")
+    """
+    Gets all networks with a type of 'hostname' for the specified client ID.
 
-        #  Submit your request to the API.
-        response = requests.post(url, headers=header, data=json.dumps(body))
+    :param platform:    URL of RiskSense platform to be queried.
+    :type  platform:    str
 
-        #  If the request is successful...
-        if response and response.status_code == 200:
-            jsonified_response = json.loads(response.text)
+    :param key:         API Key
+    :type  key:         str
 
-        #  If the request is unsuccessful...
-        else:
-            print(f"There was an error retrieving page {page} of the networks from the API.")
-            print(f"Status Code: {response.status_code}")
-            print(f"Response: {response.text}")
-            exit(1)
+    :param client_id:   Client ID to be queried.
+    :type  client_id:   int
 
-        #  Cycle through all of the findings returned, and append them to the found_networks list
-        for finding in jsonified_response['_embedded']['networks']:
-            found_networks.append(finding)
+    :param max_workers: Maximum number of pages of results to request concurrently.
+    :type  max_workers: int
 
-        #  Increment the page number for the next run.
-        page += 1
-        body['page'] = page
+    :return:    Returns a list of dictionaries containing all of the found networks.
+    :rtype:     list
+    """
 
-    return found_networks
+    #  Collect every one of the networks yielded by iter_networks() into a single list.
+    return list(iter_networks(platform, key, client_id, max_workers=max_workers))
 
 
 def read_config_file(filename):
@@ -202,9 +143,19 @@ def main():
     #  Set our variables based on what is read from the config file.
     rs_url = configuration['platform']['url']
     api_key = configuration['platform']['api_key']
+    max_workers = configuration.get('search', {}).get('max_workers', 1)
+    max_clients = configuration.get('search', {}).get('max_clients', 1)
+
+    #  Open the shared, pooled HTTP session used for every API call made by this script.
+    session.open_client(rs_url, api_key, configuration)
+
+    #  The list of clients is cached next to the config file, so it can be reused by later runs.
+    client_cache = configuration.get('clients', {})
+    cache_file = os.path.join(os.path.dirname(conf_file), client_cache.get('cache_file', 'client_cache.json'))
+    cache_max_age = client_cache.get('cache_max_age', 0)
 
     #  Get all clients associated with your api_key
-    clients = get_clients(rs_url, api_key)
+    clients = get_clients(rs_url, api_key, cache_file, cache_max_age)
 
     #  Print the number of clients found to the console.
     print()
@@ -214,14 +165,18 @@ def main():
     print("Getting networks for each client identified.")
     print()
 
-    #  Cycle through all of the clients found, and retrieve all networks returned by the filter.
-    for client in clients:
+    #  Retrieve all networks returned by the filter for each of the clients found, processing up to
+    #  max_clients clients at the same time.
+    results = fanout.run_for_clients(
+        clients,
+        lambda client: get_networks(rs_url, api_key, client['id'], max_workers=max_workers),
+        max_clients=max_clients
+    )
 
-        # networks variable is a list of all networks found for that client
-        networks = get_networks(rs_url, api_key, client['id'])
+    for client, networks, elapsed in results:
 
         #  Print the number of networks found to the console.
-        print(f"{len(networks)} networks for client \"{client['name']}\" found. ")
+        print(f"{len(networks)} networks for client \"{client['name']}\" found in {elapsed:.1f} seconds.")
         print()
 
 
@@ -0,0 +1,24 @@
+""" *******************************************************************************************************************
+|
+|  Name        : rs_api
+|  Description : Shared helpers used by the example scripts to interact with the RiskSense REST API.
+|  Copyright   : (c) RiskSense, Inc.
+|  License     : Apache-2.0 (https://www.apache.org/licenses/LICENSE-2.0.txt)
+|
+******************************************************************************************************************* """
+
+"""
+   Copyright 2019 RiskSense, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
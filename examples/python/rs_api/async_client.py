@@ -0,0 +1,522 @@
+""" *******************************************************************************************************************
+|
+|  Name        : async_client.py
+|  Description : Asyncio versions of the API functions used by the example scripts, built on aiohttp.  A single event
+                 loop can drive page requests for many clients at once.
+|  Copyright   : (c) RiskSense, Inc.
+|  License     : Apache-2.0 (https://www.apache.org/licenses/LICENSE-2.0.txt)
+|
+******************************************************************************************************************* """
+
+import asyncio
+import json
+from collections import deque
+from itertools import islice
+
+import aiohttp
+
+from rs_api import jsondecode
+from rs_api.ratelimit import RateLimiter
+from rs_api.retry import RetryPolicy
+from rs_api.search import build_search_body, page_records
+
+#  Default number of pages of a single search requested ahead of the caller.
+DEFAULT_PAGES_AHEAD = 10
+
+
+class AsyncApiClient:
+
+    """
+    Asyncio HTTP client for the RiskSense REST API.  Use it as an async context manager
+    so the underlying aiohttp session is closed when you are done with it.
+    """
+
+    def __init__(self, platform, key, pool_size=100, max_in_flight=50, retry_policy=None, rate_limiter=None):
+
+        """
+        :param platform:        URL of the RiskSense platform to be queried.
+        :type  platform:        str
+
+        :param key:             API Key.
+        :type  key:             str
+
+        :param pool_size:       Maximum number of connections to keep open to the platform.
+        :type  pool_size:       int
+
+        :param max_in_flight:   Maximum number of requests to have in flight at once, across
+                                every search running on this client.
+        :type  max_in_flight:   int
+
+        :param retry_policy:    Policy for retrying failed requests.  The defaults are used if None.
+        :type  retry_policy:    RetryPolicy
+
+        :param rate_limiter:    Rate limiter shared by every task using this client.  No limit is
+                                applied if None.
+        :type  rate_limiter:    RateLimiter
+        """
+
+        self.platform = platform
+        self.key = key
+        self.pool_size = pool_size
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.session = None
+
+    async def __aenter__(self):
+
+        self.session = aiohttp.ClientSession(
+            headers={
+                "x-api-key": self.key,
+                "content-type": "application/json"
+            },
+            connector=aiohttp.TCPConnector(limit=self.pool_size)
+        )
+
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+
+        await self.session.close()
+
+    async def request(self, method, url, body=None, params=None):
+
+        """
+        Sends a request to the API and returns the status code and response body.  Requests
+        that fail in a way that is worth retrying (see RetryPolicy) are sent again after a
+        backoff.  The retry wait does not hold one of the max_in_flight slots.
+
+        :param method:  HTTP method ("GET", "POST", "PUT", ...).
+        :type  method:  str
+
+        :param url:     URL for the API call.
+        :type  url:     str
+
+        :param body:    Body for the API call.  Sent as JSON if provided.
+        :type  body:    dict
+
+        :param params:  Query string parameters for the API call.
+        :type  params:  dict
+
+        :return:    The status code and body (bytes) of the last response received.
+        :rtype:     tuple
+        """
+
+        data = json.dumps(body) if body is not None else None
+        attempt = 1
+
+        while True:
+            try:
+                async with self.semaphore, self.rate_limiter:
+                    async with self.session.request(method, url, data=data, params=params) as response:
+                        status, content = response.status, await response.read()
+                        retry_after = response.headers.get("Retry-After")
+
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as error:
+                if not self.retry_policy.should_retry(attempt):
+                    raise
+
+                reason = f"{method} {url} failed ({error.__class__.__name__})"
+                retry_after = None
+
+            else:
+                if not self.retry_policy.should_retry(attempt, status):
+                    return status, content
+
+                reason = f"{method} {url} returned {status}"
+
+            seconds = self.retry_policy.delay(attempt, retry_after)
+            print(f" - {reason}.  Retrying in {seconds:.1f} seconds "
+                  f"(attempt {attempt + 1}/{self.retry_policy.max_attempts}).")
+            await asyncio.sleep(seconds)
+            attempt += 1
+
+
+async def fetch_page(api, url, body, page, number_of_pages, embedded_key, client_id):
+
+    """
+    Requests a single page of search results from the API.
+
+    :param api:             Client to send the request with.
+    :type  api:             AsyncApiClient
+
+    :param url:             URL of the search endpoint.
+    :type  url:             str
+
+    :param body:            Body of the search request.  It is copied, not modified.
+    :type  body:            dict
+
+    :param page:            Page of results to be requested.
+    :type  page:            int
+
+    :param number_of_pages: Total number of pages available ("?" if not yet known).  Used for
+                            progress output.
+    :type  number_of_pages: int
+
+    :param embedded_key:    Key that the results are found under (ex. "hosts").
+    :type  embedded_key:    str
+
+    :param client_id:       ID of the client being queried.  Used for progress output.
+    :type  client_id:       int
+
+    :return:    The JSON-converted response for the page.
+    :rtype:     dict
+    """
+
+    print(f"Getting page {page + 1}/{number_of_pages} of {embedded_key} for client id {client_id}...")
+    status, content = await api.request("POST", url, dict(body, page=page))
+
+    #  If request is unsuccessful...
+    if status != 200:
+        print(f"There was an error retrieving page {page} of {embedded_key}.")
+        print(f"Status Code: {status}")
+        print(f"Response: {content.decode(errors='replace')}")
+        exit(1)
+
+    return jsondecode.loads(content)
+
+
+async def fetch_page_records(api, url, body, page, number_of_pages, embedded_key, client_id):
+
+    """
+    Requests a single page of search results from the API, and picks the results out of
+    it.  See fetch_page().  The rest of the page can be freed as soon as it is parsed.
+
+    :return:    The results found in the page.
+    :rtype:     list
+    """
+
+    return page_records(await fetch_page(api, url, body, page, number_of_pages, embedded_key, client_id),
+                        embedded_key)
+
+
+async def iter_search_pages(api, client_id, resource, filters, projection="basic", page_size=100,
+                            pages_ahead=DEFAULT_PAGES_AHEAD):
+
+    """
+    Yields the results from each page of a search against the specified resource, one
+    page at a time, so that callers can process them without holding every page in
+    memory.  After the first page has been retrieved, no more than pages_ahead pages are
+    requested ahead of the caller; the client's max_in_flight limit bounds how many
+    requests are actually sent at the same time, across every search.  Pages are yielded
+    in page order, so results remain sorted by ID (ascending).
+
+    :param api:         Client to send the requests with.
+    :type  api:         AsyncApiClient
+
+    :param client_id:   ID of the client to be queried.
+    :type  client_id:   int
+
+    :param resource:    Resource to be searched ("host", "hostFinding", "group", "tag", "user", "network").
+    :type  resource:    str
+
+    :param filters:     Filters to be applied to the search.
+    :type  filters:     list
+
+    :param projection:  Projection to be requested.  "basic" or "detail".
+    :type  projection:  str
+
+    :param page_size:   Number of results in a single page.
+    :type  page_size:   int
+
+    :param pages_ahead: Maximum number of pages to have requested but not yet yielded.
+    :type  pages_ahead: int
+
+    :return:    An async generator of lists, each holding the results from one page.
+    :rtype:     async_generator
+    """
+
+    url = api.platform + "/api/v1/client/" + str(client_id) + "/" + resource + "/search"
+    embedded_key = resource + "s"
+    body = build_search_body(filters, projection, 0, page_size)
+
+    #  The first page also tells us the number of pages of results that are available.
+    jsonified_result = await fetch_page(api, url, body, 0, "?", embedded_key, client_id)
+    number_of_pages = jsonified_result['page']['totalPages']
+
+    yield page_records(jsonified_result, embedded_key)
+
+    remaining_pages = iter(range(1, number_of_pages))
+
+    #  Keep a window of pages in flight.  Pages are yielded in the order they were requested.
+    pending = deque(
+        asyncio.ensure_future(fetch_page_records(api, url, body, page, number_of_pages, embedded_key, client_id))
+        for page in islice(remaining_pages, pages_ahead)
+    )
+
+    try:
+        while pending:
+            records = await pending.popleft()
+
+            next_page = next(remaining_pages, None)
+            if next_page is not None:
+                pending.append(asyncio.ensure_future(
+                    fetch_page_records(api, url, body, next_page, number_of_pages, embedded_key, client_id)
+                ))
+
+            yield records
+
+    finally:
+        #  Don't leave requests running if the caller stops early.
+        for task in pending:
+            task.cancel()
+
+
+async def paginated_search(api, client_id, resource, filters, projection="basic", page_size=100):
+
+    """
+    Retrieve all of the results of a search against the specified resource.  See
+    iter_search_pages().  Results are returned sorted by ID (ascending).
+
+    :param api:         Client to send the requests with.
+    :type  api:         AsyncApiClient
+
+    :param client_id:   ID of the client to be queried.
+    :type  client_id:   int
+
+    :param resource:    Resource to be searched ("host", "hostFinding", "group", "tag", "user", "network").
+    :type  resource:    str
+
+    :param filters:     Filters to be applied to the search.
+    :type  filters:     list
+
+    :param projection:  Projection to be requested.  "basic" or "detail".
+    :type  projection:  str
+
+    :param page_size:   Number of results in a single page.
+    :type  page_size:   int
+
+    :return:    A list of all results returned by the API.
+    :rtype:     list
+    """
+
+    all_results = []
+
+    async for records in iter_search_pages(api, client_id, resource, filters, projection, page_size):
+        all_results.extend(records)
+
+    return all_results
+
+
+async def get_clients(api, page_size=100):
+
+    """
+    Retrieve all clients that are associated with the API key, cycling through all of
+    the pages of clients that are available.
+
+    :param api:         Client to send the requests with.
+    :type  api:         AsyncApiClient
+
+    :param page_size:   Number of clients in a single page.
+    :type  page_size:   int
+
+    :return:    Returns a list of clients found.
+    :rtype:     list
+    """
+
+    url = api.platform + "/api/v1/client"
+
+    async def get_page(page):
+
+        status, content = await api.request("GET", url, params={"size": page_size, "page": page})
+
+        #  If request is unsuccessful...
+        if status != 200:
+            print(f"There was an error retrieving page {page} of the clients.")
+            print(f"Status Code: {status}")
+            print(f"Response: {content.decode(errors='replace')}")
+            exit(1)
+
+        return jsondecode.loads(content)
+
+    jsonified_result = await get_page(0)
+    found_clients = page_records(jsonified_result, "clients")
+
+    for jsonified_result in await asyncio.gather(*[
+        get_page(page) for page in range(1, jsonified_result['page']['totalPages'])
+    ]):
+        found_clients.extend(page_records(jsonified_result, "clients"))
+
+    return found_clients
+
+
+def iter_open_hostfindings(api, client_id, projection="basic"):
+
+    """
+    Yields the open hostfindings that are associated with the specified client ID, one
+    page at a time.  See iter_search_pages().
+
+    :param api:         Client to send the requests with.
+    :type  api:         AsyncApiClient
+
+    :param client_id:   Client ID to be queried.
+    :type  client_id:   int
+
+    :param projection:  Projection to be requested.  "basic" or "detail".
+    :type  projection:  str
+
+    :return:    An async generator of lists, each holding the hostfindings from one page.
+    :rtype:     async_generator
+    """
+
+    filters = [
+        {
+            "field": "generic_state",
+            "exclusive": False,
+            "operator": "EXACT",
+            "value": "open"
+        }
+    ]
+
+    return iter_search_pages(api, client_id, "hostFinding", filters, projection)
+
+
+async def get_all_open_hostfindings(api, client_id, projection="basic"):
+
+    """
+    Retrieve all open hostfindings that are associated with the specified client ID.
+
+    :param api:         Client to send the requests with.
+    :type  api:         AsyncApiClient
+
+    :param client_id:   Client ID to be queried.
+    :type  client_id:   int
+
+    :param projection:  Projection to be requested.  "basic" or "detail".
+    :type  projection:  str
+
+    :return:    Returns a list of the hostfindings found.
+    :rtype:     list
+    """
+
+    all_results = []
+
+    async for records in iter_open_hostfindings(api, client_id, projection):
+        all_results.extend(records)
+
+    return all_results
+
+
+async def get_hosts(api, client_id, filters, projection="basic"):
+
+    """
+    Retrieve all hosts for the specified client ID that match the filters.
+
+    :param api:         Client to send the requests with.
+    :type  api:         AsyncApiClient
+
+    :param client_id:   Client ID to be queried.
+    :type  client_id:   int
+
+    :param filters:     Filters to be applied to the search.
+    :type  filters:     list
+
+    :param projection:  Projection to be requested.  "basic" or "detail".
+    :type  projection:  str
+
+    :return:    Returns a list of the hosts found.
+    :rtype:     list
+    """
+
+    return await paginated_search(api, client_id, "host", filters, projection)
+
+
+async def get_groups(api, client_id, filters):
+
+    """
+    Retrieve all groups for the specified client ID that match the filters.
+
+    :param api:         Client to send the requests with.
+    :type  api:         AsyncApiClient
+
+    :param client_id:   Client ID to be queried.
+    :type  client_id:   int
+
+    :param filters:     Filters to be applied to the search.
+    :type  filters:     list
+
+    :return:    Returns a list of the groups found.
+    :rtype:     list
+    """
+
+    return await paginated_search(api, client_id, "group", filters)
+
+
+async def get_tags(api, client_id, filters):
+
+    """
+    Retrieve all tags for the specified client ID that match the filters.
+
+    :param api:         Client to send the requests with.
+    :type  api:         AsyncApiClient
+
+    :param client_id:   Client ID to be queried.
+    :type  client_id:   int
+
+    :param filters:     Filters to be applied to the search.
+    :type  filters:     list
+
+    :return:    Returns a list of the tags found.
+    :rtype:     list
+    """
+
+    return await paginated_search(api, client_id, "tag", filters)
+
+
+async def get_users(api, client_id, filters):
+
+    """
+    Retrieve all users for the specified client ID that match the filters.
+
+    :param api:         Client to send the requests with.
+    :type  api:         AsyncApiClient
+
+    :param client_id:   Client ID to be queried.
+    :type  client_id:   int
+
+    :param filters:     Filters to be applied to the search.
+    :type  filters:     list
+
+    :return:    Returns a list of the users found.
+    :rtype:     list
+    """
+
+    return await paginated_search(api, client_id, "user", filters)
+
+
+async def get_networks(api, client_id, filters):
+
+    """
+    Retrieve all networks for the specified client ID that match the filters.
+
+    :param api:         Client to send the requests with.
+    :type  api:         AsyncApiClient
+
+    :param client_id:   Client ID to be queried.
+    :type  client_id:   int
+
+    :param filters:     Filters to be applied to the search.
+    :type  filters:     list
+
+    :return:    Returns a list of the networks found.
+    :rtype:     list
+    """
+
+    return await paginated_search(api, client_id, "network", filters)
+
+
+"""
+   Copyright 2019 RiskSense, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
@@ -0,0 +1,153 @@
+""" *******************************************************************************************************************
+|
+|  Name        : checkpoint.py
+|  Description : Records the progress of a long search in a local state file, so that a search that is interrupted
+                 can be resumed from the last completed page instead of starting over from page 0.
+|  Copyright   : (c) RiskSense, Inc.
+|  License     : Apache-2.0 (https://www.apache.org/licenses/LICENSE-2.0.txt)
+|
+******************************************************************************************************************* """
+
+import hashlib
+import json
+import os
+
+
+class Checkpoint:
+
+    """
+    Progress of a single search, persisted to a JSON state file after every completed
+    page.  The state records the next page to request, the ID of the last result
+    handed to the caller (the sort cursor, since results are sorted by ID), and the
+    number of results handed to the caller so far (the output offset).
+
+    The state is only reused for the same search; if the URL, filters, projection or
+    page size change, the search starts over.
+    """
+
+    def __init__(self, path):
+
+        """
+        :param path:    Path to the state file.
+        :type  path:    str
+        """
+
+        self.path = path
+        self.search_id = None
+        self.next_page = 0
+        self.last_id = None
+        self.records = 0
+
+        #  Called just before the state is saved (ex. to flush an output file, so that it
+        #  holds every result the saved state counts).
+        self.before_save = None
+
+    @staticmethod
+    def fingerprint(url, body):
+
+        """
+        Identifies a search by its URL and body (ignoring the page being requested).
+
+        :param url:     URL of the search endpoint.
+        :type  url:     str
+
+        :param body:    Body of the search request.
+        :type  body:    dict
+
+        :return:    Fingerprint of the search.
+        :rtype:     str
+        """
+
+        search = dict(body)
+        search.pop('page', None)
+
+        return hashlib.sha256(json.dumps([url, search], sort_keys=True).encode("utf-8")).hexdigest()
+
+    def load(self, url, body):
+
+        """
+        Loads the saved progress for a search, if there is any.
+
+        :param url:     URL of the search endpoint.
+        :type  url:     str
+
+        :param body:    Body of the search request.
+        :type  body:    dict
+
+        :return:    The page to resume from (0 if there is no saved progress).
+        :rtype:     int
+        """
+
+        self.search_id = self.fingerprint(url, body)
+
+        if os.path.isfile(self.path):
+            with open(self.path) as state_file:
+                state = json.load(state_file)
+
+            if state.get('search') == self.search_id:
+                self.next_page = state['next_page']
+                self.last_id = state['last_id']
+                self.records = state['records']
+                print(f"Resuming from page {self.next_page + 1} ({self.records} results already retrieved).")
+
+            else:
+                print(f"Ignoring {self.path}, which is the checkpoint for a different search.")
+
+        return self.next_page
+
+    def page_done(self, page, records):
+
+        """
+        Records that a page of results has been handed to the caller and processed.
+
+        :param page:        Page of results that was completed.
+        :type  page:        int
+
+        :param records:     Results in the page.
+        :type  records:     list
+        """
+
+        self.next_page = page + 1
+        self.records += len(records)
+        if records:
+            self.last_id = records[-1].get('id', self.last_id)
+
+        if self.before_save:
+            self.before_save()
+
+        state = {
+            "search": self.search_id,
+            "next_page": self.next_page,
+            "last_id": self.last_id,
+            "records": self.records
+        }
+
+        #  Write to a temporary file first, so an interrupted run can't leave a partial state file behind.
+        with open(self.path + ".tmp", "w") as state_file:
+            json.dump(state, state_file)
+
+        os.replace(self.path + ".tmp", self.path)
+
+    def finish(self):
+
+        """ Removes the state file once the search has completed. """
+
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+
+"""
+   Copyright 2019 RiskSense, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
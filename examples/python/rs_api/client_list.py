@@ -0,0 +1,161 @@
+""" *******************************************************************************************************************
+|
+|  Name        : client_list.py
+|  Description : Retrieves every client associated with an API key, one page at a time, and optionally caches the
+                 list on disk so it can be reused by later runs.
+|  Copyright   : (c) RiskSense, Inc.
+|  License     : Apache-2.0 (https://www.apache.org/licenses/LICENSE-2.0.txt)
+|
+******************************************************************************************************************* """
+
+import hashlib
+import json
+import os
+import time
+
+from rs_api import search
+
+
+def key_fingerprint(key):
+
+    """
+    Returns a fingerprint of an API key, so cached data can be matched to the key it was
+    retrieved with without writing the key itself to disk.
+
+    :param key:     API Key.
+    :type  key:     str
+
+    :return:    Fingerprint of the key.
+    :rtype:     str
+    """
+
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def read_client_cache(cache_file, platform, key, max_age):
+
+    """
+    Reads the cached list of clients, if it is present, was retrieved for the same
+    platform and API key, and is no older than max_age seconds.
+
+    :param cache_file:  Path to the cache file.
+    :type  cache_file:  str
+
+    :param platform:    URL of the RiskSense platform.
+    :type  platform:    str
+
+    :param key:         API Key.
+    :type  key:         str
+
+    :param max_age:     Maximum age of the cache, in seconds.
+    :type  max_age:     int
+
+    :return:    The cached list of clients, or None if the cache can't be used.
+    :rtype:     list
+    """
+
+    if not os.path.isfile(cache_file):
+        return None
+
+    try:
+        with open(cache_file) as cache:
+            cached = json.load(cache)
+    except ValueError:
+        return None
+
+    if cached.get('platform') != platform or cached.get('key') != key_fingerprint(key):
+        return None
+
+    if time.time() - cached.get('retrieved', 0) > max_age:
+        return None
+
+    return cached['clients']
+
+
+def write_client_cache(cache_file, platform, key, found_clients):
+
+    """
+    Writes the list of clients to the cache file.
+
+    :param cache_file:      Path to the cache file.
+    :type  cache_file:      str
+
+    :param platform:        URL of the RiskSense platform.
+    :type  platform:        str
+
+    :param key:             API Key.
+    :type  key:             str
+
+    :param found_clients:   Clients to be cached.
+    :type  found_clients:   list
+    """
+
+    cached = {
+        "platform": platform,
+        "key": key_fingerprint(key),
+        "retrieved": time.time(),
+        "clients": found_clients
+    }
+
+    #  Write to a temporary file first, so an interrupted run can't leave a partial cache behind.
+    with open(cache_file + ".tmp", "w") as cache:
+        json.dump(cached, cache)
+
+    os.replace(cache_file + ".tmp", cache_file)
+
+
+def get_clients(platform, key, cache_file=None, cache_max_age=0, page_size=100):
+
+    """
+    Retrieve all clients that are associated with the API key, cycling through all of
+    the pages of clients that are available.
+
+    :param platform:        URL of the RiskSense platform to be queried.
+    :type  platform:        str
+
+    :param key:             API Key.
+    :type  key:             str
+
+    :param cache_file:      Path to a file to cache the list of clients in.  No cache is used if None.
+    :type  cache_file:      str
+
+    :param cache_max_age:   Number of seconds a cached list of clients can be reused for.
+    :type  cache_max_age:   int
+
+    :param page_size:       Number of clients in a single page.
+    :type  page_size:       int
+
+    :return:    Returns a list containing a dictionary for each client.
+    :rtype:     list
+    """
+
+    if cache_file and cache_max_age > 0:
+        found_clients = read_client_cache(cache_file, platform, key, cache_max_age)
+
+        if found_clients is not None:
+            print(f"Using the cached list of clients in {cache_file}.")
+            return found_clients
+
+    found_clients = search.paginated_list(platform, key, "/api/v1/client", "clients", page_size)
+
+    if cache_file:
+        write_client_cache(cache_file, platform, key, found_clients)
+
+    return found_clients
+
+
+"""
+   Copyright 2019 RiskSense, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
@@ -0,0 +1,470 @@
+""" *******************************************************************************************************************
+|
+|  Name        : export.py
+|  Description : Helpers for the export endpoints (/api/v1/client/{clientId}/export) of the RiskSense REST API.
+                 Polls the status of an export until the platform has finished generating its file, and
+                 streams the file to disk, resuming interrupted downloads.  The CSV files inside a downloaded
+                 export can be read without extracting them.
+|  Copyright   : (c) RiskSense, Inc.
+|  License     : Apache-2.0 (https://www.apache.org/licenses/LICENSE-2.0.txt)
+|
+******************************************************************************************************************* """
+
+import csv
+import fnmatch
+import hashlib
+import io
+import os
+import re
+import time
+import zipfile
+import requests
+
+from rs_api import jsondecode, session
+
+#  Export statuses that mean the platform has stopped working on an export.
+COMPLETE_STATUS = "COMPLETE"
+FAILED_STATUSES = ("ERROR", "FAILED", "CANCELLED")
+
+#  Default number of bytes read from the network and written to disk at a time.
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+#  Values in an exported CSV file that are converted to numbers.  Numbers with a leading
+#  zero (ex. ZIP codes, "007") are left as text.
+INTEGER_VALUE = re.compile(r"-?(0|[1-9][0-9]*)$")
+FLOAT_VALUE = re.compile(r"-?(0|[1-9][0-9]*)\.[0-9]+$")
+
+#  Key that iter_export_rows() puts the values of a row with more values than columns under.
+EXTRA_VALUES = "_extra"
+
+
+def export_status(platform, key, client, export):
+
+    """
+    Checks the status of an export.
+
+    :param platform:    URL of the RiskSense platform to be queried.
+    :type  platform:    str
+
+    :param key:         API Key.
+    :type  key:         str
+
+    :param client:      Client ID associated with the export.
+    :type  client:      int
+
+    :param export:      Identifier of the export.
+    :type  export:      int
+
+    :return:    The status of the export (ex. "SCHEDULED", "COMPLETE"), or None if it could not
+                be checked.
+    :rtype:     str
+    """
+
+    #  Assemble the URL for the API call
+    url = platform + "/api/v1/client/" + str(client) + "/export/" + str(export) + "/status"
+
+    try:
+        response = session.get_client(platform, key).get(url)
+
+    #  The connection kept failing, even after retrying.  Leave the other exports to carry on.
+    except requests.RequestException as error:
+        print(f"There was an error checking the status of export {export} ({error.__class__.__name__}).")
+        return None
+
+    #  If request is unsuccessful...
+    if response.status_code != 200:
+        print(f"There was an error checking the status of export {export}.")
+        print(f"Response Status Code: {response.status_code}")
+        print(f"Response Text: {response.text}")
+        return None
+
+    return jsondecode.response_json(response)['status']
+
+
+def iter_ready_exports(platform, key, exports, poll_interval=2.0, max_poll_interval=60.0, timeout=3600.0):
+
+    """
+    Waits for the platform to finish generating a number of exports, yielding each one
+    as soon as it is finished.  The statuses are checked straight away, and then after
+    waits that start at poll_interval and double (up to max_poll_interval) each time, so
+    small exports are picked up within seconds while large ones aren't polled more
+    often than needed.
+
+    :param platform:            URL of the RiskSense platform to be queried.
+    :type  platform:            str
+
+    :param key:                 API Key.
+    :type  key:                 str
+
+    :param exports:             (client ID, export identifier) pairs for the exports to wait for.
+    :type  exports:             list
+
+    :param poll_interval:       Seconds to wait before the first re-check of the statuses.
+    :type  poll_interval:       float
+
+    :param max_poll_interval:   Longest wait between checks of the statuses, in seconds.
+    :type  max_poll_interval:   float
+
+    :param timeout:             Seconds to wait in total before giving up.
+    :type  timeout:             float
+
+    :return:    A generator of (client ID, export identifier, ready) tuples, where ready is
+                True if the export is ready to download, or False if it failed, timed out,
+                or its status could not be checked.
+    :rtype:     generator
+    """
+
+    deadline = time.monotonic() + timeout
+    delay = poll_interval
+    pending = list(exports)
+
+    while pending:
+        still_pending = []
+
+        for client, export in pending:
+            status = export_status(platform, key, client, export)
+
+            if status == COMPLETE_STATUS:
+                yield client, export, True
+
+            elif status is None:
+                yield client, export, False
+
+            elif status in FAILED_STATUSES:
+                print(f"Export {export} for client id {client} finished with status {status}.")
+                yield client, export, False
+
+            else:
+                still_pending.append((client, export))
+
+        pending = still_pending
+        if not pending:
+            return
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            for client, export in pending:
+                print(f"Gave up waiting for export {export} for client id {client} after {timeout} seconds.")
+                yield client, export, False
+            return
+
+        print(f" - Waiting for {len(pending)} of {len(exports)} exports to be generated.  "
+              f"Checking again in {min(delay, remaining):.0f} seconds.")
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, max_poll_interval)
+
+
+def wait_for_export(platform, key, client, export, poll_interval=2.0, max_poll_interval=60.0, timeout=3600.0):
+
+    """
+    Waits for the platform to finish generating a single export.  See iter_ready_exports().
+
+    :return:    True if the export is ready to download, False if it failed or timed out.
+    :rtype:     bool
+    """
+
+    for _, _, ready in iter_ready_exports(platform, key, [(client, export)], poll_interval, max_poll_interval,
+                                          timeout):
+        return ready
+
+
+def progress_printer(step=10, unknown_step=100 * 1024 * 1024):
+
+    """
+    Creates a progress callback for download_export() that prints a line each time
+    another step percent of the file has been received (or another unknown_step bytes,
+    if the size of the file isn't known).
+
+    :param step:            Percentage of the file between progress lines.
+    :type  step:            int
+
+    :param unknown_step:    Bytes between progress lines when the size of the file isn't known.
+    :type  unknown_step:    int
+
+    :return:    The progress callback.
+    :rtype:     function
+    """
+
+    reported = [0]
+
+    def report(received, total):
+        if total:
+            percent = received * 100 // total
+            if percent >= reported[0] + step or received == total:
+                reported[0] = percent - percent % step
+                print(f" - {received / 1048576:.1f} of {total / 1048576:.1f} MB received ({percent}%).")
+
+        elif received >= reported[0] + unknown_step:
+            reported[0] = received - received % unknown_step
+            print(f" - {received / 1048576:.1f} MB received.")
+
+    return report
+
+
+def file_sha256(filename, chunk_size=DEFAULT_CHUNK_SIZE):
+
+    """
+    Starts a SHA-256 checksum with the contents of an existing file.
+
+    :param filename:    File to be read.
+    :type  filename:    str
+
+    :param chunk_size:  Number of bytes to read at a time.
+    :type  chunk_size:  int
+
+    :return:    The checksum, ready to be updated with any bytes appended to the file.
+    :rtype:     hashlib.sha256
+    """
+
+    checksum = hashlib.sha256()
+
+    with open(filename, "rb") as existing:
+        for chunk in iter(lambda: existing.read(chunk_size), b""):
+            checksum.update(chunk)
+
+    return checksum
+
+
+def download_size(response, offset):
+
+    """
+    Works out the full size of the file being downloaded from a response's headers.
+
+    :param response:    Response to the download request.
+    :type  response:    requests.Response
+
+    :param offset:      Byte the response starts from.
+    :type  offset:      int
+
+    :return:    Size of the whole file in bytes, or None if it isn't known.
+    :rtype:     int
+    """
+
+    #  A partial response gives the full size in Content-Range ("bytes 100-999/1000").
+    content_range = response.headers.get('Content-Range', '')
+    if response.status_code == 206 and '/' in content_range and not content_range.endswith('/*'):
+        return int(content_range.rsplit('/', 1)[1])
+
+    #  Content-Length is only comparable to the bytes received if the response isn't
+    #  compressed for transfer.
+    if 'Content-Length' in response.headers and 'Content-Encoding' not in response.headers:
+        return offset + int(response.headers['Content-Length'])
+
+    return None
+
+
+def download_export(platform, key, client, export, filename, chunk_size=DEFAULT_CHUNK_SIZE, progress=None,
+                    expected_sha256=None):
+
+    """
+    Downloads the file generated for an export, streaming it to disk chunk_size bytes at
+    a time so that the whole file is never held in memory.
+
+    The file is written to <filename>.part, and only renamed to filename once it is
+    complete.  If the connection drops part way through (or a .part file is left by an
+    earlier run), the download continues from the last byte received using a Range
+    request.  If the platform ignores the Range header, the whole file is downloaded
+    again.  Attempts are limited by the shared client's retry policy.
+
+    Once the download has finished, the number of bytes received is checked against the
+    size reported by the platform, and the SHA-256 checksum of the file is checked
+    against expected_sha256 (if provided).
+
+    :param platform:        URL of the RiskSense platform to be queried.
+    :type  platform:        str
+
+    :param key:             API Key.
+    :type  key:             str
+
+    :param client:          Client ID associated with the export.
+    :type  client:          int
+
+    :param export:          Identifier of the export to be downloaded.
+    :type  export:          int
+
+    :param filename:        File path and name where the download will be stored.
+    :type  filename:        str
+
+    :param chunk_size:      Number of bytes to read and write at a time.
+    :type  chunk_size:      int
+
+    :param progress:        Called with (bytes received, total bytes or None) after each chunk
+                            is written.  See progress_printer().
+    :type  progress:        function
+
+    :param expected_sha256: Hex SHA-256 checksum the file must have.  Not checked if None.
+    :type  expected_sha256: str
+
+    :return:    The hex SHA-256 checksum of the file, or None if it could not be downloaded
+                completely or failed verification.
+    :rtype:     str
+    """
+
+    #  Assemble the URL for the API call
+    url = platform + "/api/v1/client/" + str(client) + "/export/" + str(export)
+
+    api = session.get_client(platform, key)
+    part_file = filename + ".part"
+    attempt = 1
+
+    while True:
+        offset = os.path.getsize(part_file) if os.path.isfile(part_file) else 0
+        header = {"Range": f"bytes={offset}-"} if offset else {}
+
+        response = api.get(url, headers=header, stream=True)
+
+        #  The .part file is no use if the platform can't continue from the end of it.
+        if response.status_code == 416:
+            response.close()
+            print(f" - Could not continue {part_file} from byte {offset}.  Starting again.")
+            os.remove(part_file)
+            continue
+
+        #  If request is unsuccessful...
+        if response.status_code not in (200, 206):
+            print(f"There was an error getting the file for export {export}.")
+            print(f"Response Status Code: {response.status_code}")
+            print(f"Response Text: {response.text}")
+            response.close()
+            return None
+
+        if offset and response.status_code == 200:
+            print(" - The platform ignored the request to continue the download.  Starting again.")
+            offset = 0
+
+        elif offset:
+            print(f" - Continuing the download from byte {offset}.")
+
+        total = download_size(response, offset)
+        checksum = file_sha256(part_file, chunk_size) if offset else hashlib.sha256()
+        received = offset
+
+        try:
+            with response, open(part_file, "ab" if offset else "wb") as download:
+                for chunk in response.iter_content(chunk_size):
+                    download.write(chunk)
+                    checksum.update(chunk)
+                    received += len(chunk)
+
+                    if progress:
+                        progress(received, total)
+
+        except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError) as error:
+            reason = f"Download of export {export} failed ({error.__class__.__name__})"
+
+        else:
+            if total is None or received >= total:
+                break
+
+            reason = f"Download of export {export} ended after {received} of {total} bytes"
+
+        if not api.retry_policy.should_retry(attempt):
+            print(f"{reason}.  Giving up; run again to continue from {part_file}.")
+            return None
+
+        api.retry_policy.wait(attempt, reason=reason)
+        attempt += 1
+
+    if total is not None and received != total:
+        print(f"Downloaded {received} bytes of export {export}, but the platform reported {total}.")
+        os.remove(part_file)
+        return None
+
+    if expected_sha256 and checksum.hexdigest() != expected_sha256.lower():
+        print(f"The checksum of {filename} ({checksum.hexdigest()}) does not match {expected_sha256}.")
+        os.remove(part_file)
+        return None
+
+    os.replace(part_file, filename)
+
+    return checksum.hexdigest()
+
+
+def typed_value(value):
+
+    """
+    Converts a value read from an exported CSV file to the type it represents.  Empty
+    values become None, "true" and "false" become booleans, and numbers become ints or
+    floats.  Anything else is left as a string.
+
+    :param value:   Value read from the CSV file.
+    :type  value:   str
+
+    :return:    The converted value.
+    """
+
+    if value == "":
+        return None
+
+    if value.lower() in ("true", "false"):
+        return value.lower() == "true"
+
+    if INTEGER_VALUE.match(value):
+        return int(value)
+
+    if FLOAT_VALUE.match(value):
+        return float(value)
+
+    return value
+
+
+def iter_export_rows(zip_filename, pattern="*.csv", column_types=None):
+
+    """
+    Yields the rows of the CSV files inside a downloaded export, one row at a time,
+    reading them straight out of the zip file.  Nothing is extracted to disk, and only
+    the row being read is held in memory, however large the export is.
+
+    The zip file's index is at the end of the file, so the export must have finished
+    downloading before it can be read.
+
+    :param zip_filename:    Path to the downloaded export.
+    :type  zip_filename:    str
+
+    :param pattern:         Only files inside the zip whose names match this pattern are read.
+    :type  pattern:         str
+
+    :param column_types:    Functions used to convert the values of particular columns (ex.
+                            {"Host ID": int}).  Values in other columns are converted by
+                            typed_value().  Empty values are always None.
+    :type  column_types:    dict
+
+    :return:    A generator of (name of file inside the zip, row) pairs, where each row
+                is a dict keyed by column name.  If a row has fewer values than there are
+                columns, the missing values are None.  If it has more, the values left
+                over are kept as they are (strings) in a list under EXTRA_VALUES.
+    :rtype:     generator
+    """
+
+    column_types = column_types or {}
+
+    with zipfile.ZipFile(zip_filename) as archive:
+        for member in archive.infolist():
+            if member.is_dir() or not fnmatch.fnmatch(member.filename, pattern):
+                continue
+
+            #  utf-8-sig drops the byte order mark that exported CSV files may start with.
+            with archive.open(member) as raw, io.TextIOWrapper(raw, encoding="utf-8-sig", newline="") as text:
+                for row in csv.DictReader(text, restkey=EXTRA_VALUES):
+                    yield member.filename, {
+                        column: value if column == EXTRA_VALUES else
+                        None if value is None or value == "" else column_types.get(column, typed_value)(value)
+                        for column, value in row.items()
+                    }
+
+
+"""
+   Copyright 2019 RiskSense, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
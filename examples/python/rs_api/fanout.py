@@ -0,0 +1,85 @@
+""" *******************************************************************************************************************
+|
+|  Name        : fanout.py
+|  Description : Runs the same piece of work for many clients at once.  Used by the multi-client scripts so that one
+                 large client does not hold up all of the small ones queued behind it.
+|  Copyright   : (c) RiskSense, Inc.
+|  License     : Apache-2.0 (https://www.apache.org/licenses/LICENSE-2.0.txt)
+|
+******************************************************************************************************************* """
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+def timed_call(func, client):
+
+    """
+    Calls func for a single client, and times how long it takes.
+
+    :param func:    Function to be called.  It is passed the client's dictionary.
+    :type  func:    function
+
+    :param client:  Client, as returned by the /client API endpoint.
+    :type  client:  dict
+
+    :return:    The result returned by func, and the number of seconds it took.
+    :rtype:     tuple
+    """
+
+    started = time.monotonic()
+    result = func(client)
+
+    return result, time.monotonic() - started
+
+
+def run_for_clients(clients, func, max_clients=1):
+
+    """
+    Calls func once for each client, processing up to max_clients clients at the same
+    time.  The limit on how many pages are requested at once for a single client is
+    still set by whatever max_workers func passes on to its search.
+
+    :param clients:     Clients, as returned by the /client API endpoint.
+    :type  clients:     list
+
+    :param func:        Function to be called for each client.  It is passed the client's dictionary.
+    :type  func:        function
+
+    :param max_clients: Maximum number of clients to process at the same time.
+    :type  max_clients: int
+
+    :return:    A (client, result, seconds taken) tuple for each client, in the same order as clients.
+    :rtype:     list
+    """
+
+    results = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_clients)) as executor:
+        futures = {executor.submit(timed_call, func, client): index for index, client in enumerate(clients)}
+
+        #  Report on each client as soon as it is finished, whatever order they finish in.
+        for future in as_completed(futures):
+            index = futures[future]
+            result, elapsed = future.result()
+            results[index] = (clients[index], result, elapsed)
+            print(f"Finished client id {clients[index]['id']} in {elapsed:.1f} seconds.")
+
+    return [results[index] for index in range(len(clients))]
+
+
+"""
+   Copyright 2019 RiskSense, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
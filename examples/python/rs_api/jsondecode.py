@@ -0,0 +1,131 @@
+""" *******************************************************************************************************************
+|
+|  Name        : jsondecode.py
+|  Description : Pluggable JSON decoder used for every response from the RiskSense REST API.  Uses orjson or ujson
+                 when one is installed, and the standard library's json module otherwise.  Responses are parsed
+                 straight from their bytes, without decoding them to a str first.
+|  Copyright   : (c) RiskSense, Inc.
+|  License     : Apache-2.0 (https://www.apache.org/licenses/LICENSE-2.0.txt)
+|
+******************************************************************************************************************* """
+
+import importlib
+import json
+
+#  Decoders in order of preference when "auto" is selected.  Each of them accepts bytes.
+DECODERS = ("orjson", "ujson", "json")
+
+#  The decoder in use.  Chosen by use_decoder().
+_decoder = json
+_decoder_name = "json"
+
+
+def available_decoders():
+
+    """
+    Lists the decoders that are installed.
+
+    :return:    Names of the installed decoders, in order of preference.
+    :rtype:     list
+    """
+
+    available = []
+
+    for name in DECODERS:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        available.append(name)
+
+    return available
+
+
+def use_decoder(name="auto"):
+
+    """
+    Selects the decoder used by loads().
+
+    :param name:    "orjson", "ujson", "json", or "auto" for the fastest one installed.
+    :type  name:    str
+
+    :return:    The name of the decoder selected.
+    :rtype:     str
+    """
+
+    global _decoder, _decoder_name
+
+    if name == "auto":
+        name = available_decoders()[0]
+
+    if name not in DECODERS:
+        print(f"Unknown JSON decoder \"{name}\".  Use one of: auto, {', '.join(DECODERS)}.")
+        exit(1)
+
+    try:
+        _decoder = importlib.import_module(name)
+    except ImportError:
+        print(f"The {name} JSON decoder is not installed (pip install {name}).")
+        exit(1)
+
+    _decoder_name = name
+
+    return name
+
+
+def decoder_name():
+
+    """
+    :return:    The name of the decoder in use.
+    :rtype:     str
+    """
+
+    return _decoder_name
+
+
+def loads(data):
+
+    """
+    Parses a JSON document with the selected decoder.
+
+    :param data:    The JSON document.  Bytes are parsed without being decoded to a str first.
+    :type  data:    bytes
+
+    :return:    The parsed document.
+    """
+
+    return _decoder.loads(data)
+
+
+def response_json(response):
+
+    """
+    Parses the body of a requests.Response with the selected decoder.
+
+    :param response:    Response from the API.
+    :type  response:    requests.Response
+
+    :return:    The parsed body.
+    """
+
+    return _decoder.loads(response.content)
+
+
+use_decoder()
+
+
+"""
+   Copyright 2019 RiskSense, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
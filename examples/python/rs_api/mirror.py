@@ -0,0 +1,408 @@
+""" *******************************************************************************************************************
+|
+|  Name        : mirror.py
+|  Description : Keeps a local SQLite mirror of the resources searched by the example scripts (hosts, host findings,
+                 groups, tags, networks and users), so that reports can query an indexed local copy instead of the
+                 RiskSense REST API.  Host findings can be kept up to date incrementally, by requesting only the
+                 findings updated since the last sync.
+|  Copyright   : (c) RiskSense, Inc.
+|  License     : Apache-2.0 (https://www.apache.org/licenses/LICENSE-2.0.txt)
+|
+******************************************************************************************************************* """
+
+import datetime
+import json
+import sqlite3
+from itertools import islice
+
+from rs_api import search
+
+#  The resources that are mirrored, the table each is stored in, and the fields copied out
+#  of each result into their own (indexed) columns.  The full result is always kept in the
+#  "data" column as JSON, so any other field can still be queried with json_extract().
+RESOURCES = {
+    "host": {
+        "table": "host",
+        "columns": {
+            "host_name": "hostName",
+            "ip_address": "ipAddress",
+            "criticality": "criticality"
+        }
+    },
+    "hostFinding": {
+        "table": "host_finding",
+        "columns": {
+            "host_id": "host.hostId",
+            "severity": "severity",
+            "status": "status"
+        }
+    },
+    "group": {
+        "table": "client_group",
+        "columns": {
+            "name": "name"
+        }
+    },
+    "tag": {
+        "table": "tag",
+        "columns": {
+            "name": "name"
+        }
+    },
+    "network": {
+        "table": "network",
+        "columns": {
+            "name": "name"
+        }
+    },
+    "user": {
+        "table": "user",
+        "columns": {
+            "username": "username"
+        }
+    }
+}
+
+#  Filter field and operator used to request only the results updated since the last sync.
+UPDATED_FILTER_FIELD = "updated_date"
+UPDATED_FILTER_OPERATOR = "RANGE"
+
+#  How far before the start of a sync the next incremental sync starts looking for updates,
+#  in seconds.  Covers results updated while the sync was running, and differences between
+#  the local and platform clocks.  Results seen twice are simply stored again.
+DEFAULT_OVERLAP = 300
+
+
+def field_value(record, path):
+
+    """
+    Looks up a field in a result by its dotted path (ex. "host.hostId").
+
+    :param record:  Result returned by a search.
+    :type  record:  dict
+
+    :param path:    Dotted path of the field.
+    :type  path:    str
+
+    :return:    The value of the field, or None if it isn't present.  Lists and objects
+                are returned as JSON.
+    """
+
+    value = record
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+
+    return value
+
+
+def connect(database):
+
+    """
+    Opens the mirror database, creating its tables and indexes if they don't exist.
+
+    :param database:    Path to the SQLite database file.
+    :type  database:    str
+
+    :return:    The connection to the database.
+    :rtype:     sqlite3.Connection
+    """
+
+    connection = sqlite3.connect(database)
+
+    #  Let reports read the mirror while it is being updated.
+    connection.execute("PRAGMA journal_mode=WAL")
+
+    with connection:
+        for settings in RESOURCES.values():
+            table = settings['table']
+            columns = "".join(f"{column}, " for column in settings['columns'])
+
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                f"client_id INTEGER NOT NULL, id INTEGER NOT NULL, {columns}"
+                f"data TEXT NOT NULL, synced_at TEXT NOT NULL, PRIMARY KEY (client_id, id))"
+            )
+
+            connection.execute(f"CREATE INDEX IF NOT EXISTS {table}_synced_at ON {table} (client_id, synced_at)")
+            for column in settings['columns']:
+                connection.execute(f"CREATE INDEX IF NOT EXISTS {table}_{column} ON {table} (client_id, {column})")
+
+        #  The point each resource has been synced up to, for each client.
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS sync_state ("
+            "client_id INTEGER NOT NULL, resource TEXT NOT NULL, high_water_mark TEXT NOT NULL, "
+            "PRIMARY KEY (client_id, resource))"
+        )
+
+    return connection
+
+
+def get_high_water_mark(connection, client_id, resource):
+
+    """
+    Returns the point a resource has been synced up to for a client.
+
+    :param connection:  Connection to the mirror database.
+    :type  connection:  sqlite3.Connection
+
+    :param client_id:   ID of the client.
+    :type  client_id:   int
+
+    :param resource:    Resource (ex. "hostFinding").
+    :type  resource:    str
+
+    :return:    The high-water mark (UTC, ISO 8601), or None if the resource has never been synced.
+    :rtype:     str
+    """
+
+    row = connection.execute("SELECT high_water_mark FROM sync_state WHERE client_id = ? AND resource = ?",
+                             (client_id, resource)).fetchone()
+
+    return row[0] if row else None
+
+
+def set_high_water_mark(connection, client_id, resource, started, overlap=DEFAULT_OVERLAP):
+
+    """
+    Records the point a resource has been synced up to for a client.  The next
+    incremental sync requests the results updated after it.
+
+    :param connection:  Connection to the mirror database.
+    :type  connection:  sqlite3.Connection
+
+    :param client_id:   ID of the client.
+    :type  client_id:   int
+
+    :param resource:    Resource (ex. "hostFinding").
+    :type  resource:    str
+
+    :param started:     When the sync that just finished started (UTC).
+    :type  started:     datetime.datetime
+
+    :param overlap:     Seconds before started that the next sync starts looking from.
+    :type  overlap:     int
+    """
+
+    high_water_mark = (started - datetime.timedelta(seconds=overlap)).replace(microsecond=0).isoformat()
+
+    connection.execute("INSERT OR REPLACE INTO sync_state (client_id, resource, high_water_mark) VALUES (?, ?, ?)",
+                       (client_id, resource, high_water_mark))
+
+
+def updated_since_filter(high_water_mark, until):
+
+    """
+    Builds the filter used to request only the results updated since the last sync.
+
+    :param high_water_mark: Point the last sync reached (UTC, ISO 8601).
+    :type  high_water_mark: str
+
+    :param until:           Start of the current sync (UTC).
+    :type  until:           datetime.datetime
+
+    :return:    The filter.
+    :rtype:     dict
+    """
+
+    return {
+        "field": UPDATED_FILTER_FIELD,
+        "exclusive": False,
+        "operator": UPDATED_FILTER_OPERATOR,
+        "value": high_water_mark + "," + until.replace(microsecond=0).isoformat()
+    }
+
+
+def store_records(connection, resource, client_id, records, synced_at):
+
+    """
+    Inserts results into the mirror, replacing any copies already stored.
+
+    :param connection:  Connection to the mirror database.
+    :type  connection:  sqlite3.Connection
+
+    :param resource:    Resource the results are from (ex. "hostFinding").
+    :type  resource:    str
+
+    :param client_id:   ID of the client the results belong to.
+    :type  client_id:   int
+
+    :param records:     Results returned by a search.
+    :type  records:     list
+
+    :param synced_at:   Time of the sync storing the results.
+    :type  synced_at:   str
+
+    :return:    The number of results stored.
+    :rtype:     int
+    """
+
+    settings = RESOURCES[resource]
+    columns = list(settings['columns'])
+    column_list = "".join(f"{column}, " for column in columns)
+    placeholders = ", ".join("?" * (len(columns) + 4))
+
+    rows = [
+        [client_id, record['id']] + [field_value(record, settings['columns'][column]) for column in columns] +
+        [json.dumps(record), synced_at]
+        for record in records
+    ]
+
+    connection.executemany(
+        f"INSERT OR REPLACE INTO {settings['table']} (client_id, id, {column_list}data, synced_at) "
+        f"VALUES ({placeholders})",
+        rows
+    )
+
+    return len(rows)
+
+
+def sync_resource(connection, platform, key, client_id, resource, projection="basic", batch_size=1000,
+                  overlap=DEFAULT_OVERLAP):
+
+    """
+    Replaces the mirror's copy of a resource for a client with everything the platform
+    currently has.  Results are written in batches as the pages arrive, and results that
+    no longer exist on the platform are removed once the sync has finished.  The old
+    copy stays readable until the new one is committed.
+
+    Results are paged through by ID (keyset pagination).  With page numbers, a result
+    deleted on the platform during the sync would shift every later result back a page,
+    so one of them would be skipped, and then removed from the mirror as if it no longer
+    existed.  The resource's high-water mark
+    is moved up, so an incremental sync (see sync_updated()) can carry on from here.
+
+    :param connection:  Connection to the mirror database.
+    :type  connection:  sqlite3.Connection
+
+    :param platform:    URL of the RiskSense platform to be queried.
+    :type  platform:    str
+
+    :param key:         API Key.
+    :type  key:         str
+
+    :param client_id:   ID of the client to be mirrored.
+    :type  client_id:   int
+
+    :param resource:    Resource to be mirrored.  One of the keys of RESOURCES.
+    :type  resource:    str
+
+    :param projection:  Projection to be requested.  "basic" or "detail".
+    :type  projection:  str
+
+    :param batch_size:  Number of results written to the database at a time.
+    :type  batch_size:  int
+
+    :param overlap:     Seconds before the start of this sync that the next incremental sync
+                        starts looking for updates from.
+    :type  overlap:     int
+
+    :return:    The number of results now in the mirror.
+    :rtype:     int
+    """
+
+    started = datetime.datetime.utcnow()
+    synced_at = started.isoformat()
+    results = search.iter_search(platform, key, client_id, resource, [], projection, keyset=True)
+    stored = 0
+
+    with connection:
+        for batch in iter(lambda: list(islice(results, batch_size)), []):
+            stored += store_records(connection, resource, client_id, batch, synced_at)
+
+        connection.execute(f"DELETE FROM {RESOURCES[resource]['table']} WHERE client_id = ? AND synced_at < ?",
+                           (client_id, synced_at))
+
+        set_high_water_mark(connection, client_id, resource, started, overlap)
+
+    return stored
+
+
+def sync_updated(connection, platform, key, client_id, resource="hostFinding", projection="basic", batch_size=1000,
+                 overlap=DEFAULT_OVERLAP):
+
+    """
+    Brings the mirror's copy of a resource for a client up to date by requesting only
+    the results updated since the last sync, so the cost of a sync depends on how much
+    has changed rather than on how much there is.  Updated results replace the copies
+    already stored.  Findings that have been closed since the last sync are among the
+    updated results, so their stored status changes to closed.  Results deleted from the
+    platform are not noticed; run a full sync (sync_resource()) now and then to remove
+    them.  Like a full sync, the updates are paged through by ID, so results updated
+    again during the sync (which drop out of the search) don't cause others to be
+    skipped.
+
+    If the resource has never been synced for the client, a full sync is run instead.
+
+    :param connection:  Connection to the mirror database.
+    :type  connection:  sqlite3.Connection
+
+    :param platform:    URL of the RiskSense platform to be queried.
+    :type  platform:    str
+
+    :param key:         API Key.
+    :type  key:         str
+
+    :param client_id:   ID of the client to be mirrored.
+    :type  client_id:   int
+
+    :param resource:    Resource to be mirrored.  One of the keys of RESOURCES.
+    :type  resource:    str
+
+    :param projection:  Projection to be requested.  "basic" or "detail".
+    :type  projection:  str
+
+    :param batch_size:  Number of results written to the database at a time.
+    :type  batch_size:  int
+
+    :param overlap:     Seconds before the start of this sync that the next incremental sync
+                        starts looking for updates from.
+    :type  overlap:     int
+
+    :return:    The number of updated results stored.
+    :rtype:     int
+    """
+
+    high_water_mark = get_high_water_mark(connection, client_id, resource)
+    if high_water_mark is None:
+        print(f"No earlier sync of {resource}s for client id {client_id} found.  Copying all of them.")
+        return sync_resource(connection, platform, key, client_id, resource, projection, batch_size, overlap)
+
+    started = datetime.datetime.utcnow()
+    synced_at = started.isoformat()
+    filters = [updated_since_filter(high_water_mark, started)]
+    results = search.iter_search(platform, key, client_id, resource, filters, projection, keyset=True)
+    stored = 0
+
+    print(f"Getting {resource}s for client id {client_id} updated since {high_water_mark}.")
+
+    #  The high-water mark only moves once every update has been stored, so an interrupted
+    #  sync is simply repeated from the same point.
+    with connection:
+        for batch in iter(lambda: list(islice(results, batch_size)), []):
+            stored += store_records(connection, resource, client_id, batch, synced_at)
+
+        set_high_water_mark(connection, client_id, resource, started, overlap)
+
+    return stored
+
+
+"""
+   Copyright 2019 RiskSense, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
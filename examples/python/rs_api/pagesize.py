@@ -0,0 +1,244 @@
+""" *******************************************************************************************************************
+|
+|  Name        : pagesize.py
+|  Description : Tunes the page size used by searches.  Measures the time and size of each page and grows or shrinks
+                 the page size, within configured bounds, to retrieve the most results per second without pages
+                 taking long enough to risk a server timeout.  The best size found is remembered between runs.
+|  Copyright   : (c) RiskSense, Inc.
+|  License     : Apache-2.0 (https://www.apache.org/licenses/LICENSE-2.0.txt)
+|
+******************************************************************************************************************* """
+
+import json
+import os
+
+#  Largest page of results the platform returns.  Larger requests get a page of this size.
+MAX_PAGE_SIZE = 500
+
+
+class PageSizeTuner:
+
+    """
+    Hill-climbing page size tuner for a single search (resource and projection).
+
+    After every page, record() is called with the number of results, seconds taken and
+    bytes received.  A page that took longer than target_seconds halves the page size.
+    Otherwise the page size keeps growing by growth_factor while results per second keep
+    improving, and steps back to the best size seen once they stop improving.  The best
+    rate seen fades a little each time, so that larger sizes are tried again later if
+    the platform's performance changes part way through a search.
+    """
+
+    def __init__(self, resource, projection, min_size=50, max_size=MAX_PAGE_SIZE, initial_size=100,
+                 target_seconds=10.0, max_bytes=10000000, growth_factor=1.5, state_file=None):
+
+        """
+        :param resource:        Resource being searched (ex. "hostFinding").
+        :type  resource:        str
+
+        :param projection:      Projection being requested.  "basic" or "detail".
+        :type  projection:      str
+
+        :param min_size:        Smallest page size to use.
+        :type  min_size:        int
+
+        :param max_size:        Largest page size to use.  Lowered automatically if the platform
+                                returns smaller pages than this.
+        :type  max_size:        int
+
+        :param initial_size:    Page size to start with, if none has been remembered.
+        :type  initial_size:    int
+
+        :param target_seconds:  Longest a single page should take.  Keep well below the
+                                platform's request timeout.
+        :type  target_seconds:  float
+
+        :param max_bytes:       Largest response a single page should be.
+        :type  max_bytes:       int
+
+        :param growth_factor:   How much to grow the page size by at each step.
+        :type  growth_factor:   float
+
+        :param state_file:      JSON file the best page size for each resource and projection
+                                is remembered in.  Nothing is remembered if None.
+        :type  state_file:      str
+        """
+
+        self.key = resource + "/" + projection
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_seconds = target_seconds
+        self.max_bytes = max_bytes
+        self.growth_factor = growth_factor
+        self.state_file = state_file
+
+        self.size = self.clamp(self.load() or initial_size)
+        self.best_size = self.size
+        self.best_rate = 0.0
+        self.bytes_per_record = 0
+
+    @classmethod
+    def from_config(cls, configuration, resource, projection, state_dir):
+
+        """
+        Creates a page size tuner from the [page_size] section of the config file.  The
+        page size can only be adjusted part way through a keyset search (see the [search]
+        section), so page-numbered searches just use the size remembered by earlier keyset
+        searches.
+
+        :param configuration:   Variables found in the config file.
+        :type  configuration:   dict
+
+        :param resource:        Resource being searched (ex. "hostFinding").
+        :type  resource:        str
+
+        :param projection:      Projection being requested.  "basic" or "detail".
+        :type  projection:      str
+
+        :param state_dir:       Directory the state file is relative to.
+        :type  state_dir:       str
+
+        :return:    The tuner, or None if adaptive page sizes are not enabled.
+        :rtype:     PageSizeTuner
+        """
+
+        settings = configuration.get('page_size', {})
+
+        if not settings.get('adaptive', False):
+            return None
+
+        if not configuration.get('search', {}).get('keyset', False):
+            print("Adaptive page sizes are only tuned for keyset searches.  Set keyset = true in the [search] section "
+                  "of the config file; until then, the remembered page size is used as it is.")
+
+        state_file = settings.get('state_file')
+
+        return cls(
+            resource,
+            projection,
+            min_size=settings.get('min_size', 50),
+            max_size=settings.get('max_size', MAX_PAGE_SIZE),
+            initial_size=settings.get('initial_size', 100),
+            target_seconds=settings.get('target_seconds', 10.0),
+            max_bytes=settings.get('max_bytes', 10000000),
+            state_file=os.path.join(state_dir, state_file) if state_file else None
+        )
+
+    def clamp(self, size):
+
+        """ Keeps a page size within the configured bounds. """
+
+        return int(max(self.min_size, min(self.max_size, size)))
+
+    def record(self, records, seconds, received_bytes, last_page=False):
+
+        """
+        Records how a page performed, and picks the size of the next page.
+
+        :param records:         Number of results in the page.
+        :type  records:         int
+
+        :param seconds:         Seconds taken to retrieve the page.
+        :type  seconds:         float
+
+        :param received_bytes:  Size of the response, in bytes.
+        :type  received_bytes:  int
+
+        :param last_page:       True if there are no more results after this page.
+        :type  last_page:       bool
+
+        :return:    The page size to use for the next page.
+        :rtype:     int
+        """
+
+        if records:
+            self.bytes_per_record = received_bytes / records
+
+        #  A short page that isn't the last one means the platform won't return pages this big.
+        #  Don't ask for more than it returned again.
+        if records < self.size and not last_page:
+            print(f"The platform returned {records} results when {self.size} were requested.  "
+                  f"Limiting the page size to {records}.")
+            self.max_size = max(self.min_size, records)
+            self.size = self.clamp(self.size)
+            self.best_size = min(self.best_size, self.size)
+
+        #  Getting too close to a server timeout (or too large a response).  Back off sharply.
+        if seconds > self.target_seconds or received_bytes > self.max_bytes:
+            self.size = self.clamp(self.size / 2)
+            self.best_size = min(self.best_size, self.size)
+            return self.size
+
+        #  A short page (the last one) says nothing about how larger pages would perform.
+        if records < self.size or seconds <= 0:
+            return self.size
+
+        rate = records / seconds
+
+        if rate > self.best_rate:
+            self.best_rate = rate
+            self.best_size = self.size
+
+            #  Don't grow into a size that would likely take longer than target_seconds, or
+            #  return more than max_bytes.
+            next_size = self.size * self.growth_factor
+            if seconds * self.growth_factor <= self.target_seconds and \
+                    next_size * self.bytes_per_record <= self.max_bytes:
+                self.size = self.clamp(next_size)
+
+        else:
+            self.size = self.best_size
+            self.best_rate *= 0.9
+
+        return self.size
+
+    def load(self):
+
+        """
+        Reads the remembered page size for this resource and projection.
+
+        :return:    The remembered page size, or None.
+        :rtype:     int
+        """
+
+        if not self.state_file or not os.path.isfile(self.state_file):
+            return None
+
+        with open(self.state_file) as state:
+            return json.load(state).get(self.key)
+
+    def save(self):
+
+        """ Remembers the best page size found for this resource and projection. """
+
+        if not self.state_file:
+            return
+
+        sizes = {}
+        if os.path.isfile(self.state_file):
+            with open(self.state_file) as state:
+                sizes = json.load(state)
+
+        sizes[self.key] = self.best_size
+
+        with open(self.state_file + ".tmp", "w") as state:
+            json.dump(sizes, state, indent=2, sort_keys=True)
+
+        os.replace(self.state_file + ".tmp", self.state_file)
+
+
+"""
+   Copyright 2019 RiskSense, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
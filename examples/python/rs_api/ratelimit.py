@@ -0,0 +1,165 @@
+""" *******************************************************************************************************************
+|
+|  Name        : ratelimit.py
+|  Description : Client-side rate limiting for calls to the RiskSense REST API.  A token bucket caps the number of
+                 requests sent per second, and a semaphore caps the number in flight at once.  One limiter is
+                 shared by every thread (or asyncio task) talking to the same platform.
+|  Copyright   : (c) RiskSense, Inc.
+|  License     : Apache-2.0 (https://www.apache.org/licenses/LICENSE-2.0.txt)
+|
+******************************************************************************************************************* """
+
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+
+    """
+    Token bucket rate limiter.  Tokens are added at requests_per_second, up to burst of
+    them, and each request takes one.  When the bucket is empty, callers wait until a
+    token is available.  A requests_per_second of 0 disables the rate limit, and a
+    max_concurrent of 0 disables the limit on requests in flight.
+    """
+
+    def __init__(self, requests_per_second=0, burst=None, max_concurrent=0):
+
+        """
+        :param requests_per_second: Sustained number of requests allowed per second.
+        :type  requests_per_second: float
+
+        :param burst:               Number of requests that can be sent at once after an idle period.
+                                    Defaults to requests_per_second (minimum 1).
+        :type  burst:               int
+
+        :param max_concurrent:      Maximum number of requests in flight at once.
+        :type  max_concurrent:      int
+        """
+
+        self.requests_per_second = requests_per_second
+        self.burst = burst or max(1, int(requests_per_second))
+        self.max_concurrent = max_concurrent
+
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent > 0 else None
+        self.async_slots = None
+
+    @classmethod
+    def from_config(cls, configuration):
+
+        """
+        Creates a rate limiter from the [rate_limit] section of the config file.
+
+        :param configuration:   Variables found in the config file.
+        :type  configuration:   dict
+
+        :return:    The rate limiter.
+        :rtype:     RateLimiter
+        """
+
+        settings = configuration.get('rate_limit', {})
+
+        return cls(
+            requests_per_second=settings.get('requests_per_second', 0),
+            burst=settings.get('burst'),
+            max_concurrent=settings.get('max_concurrent', 0)
+        )
+
+    def reserve(self):
+
+        """
+        Takes a token from the bucket, and returns how long the caller must wait before
+        sending its request.  The token is taken immediately, so callers that are made to
+        wait are served in the order they arrived.
+
+        :return:    Number of seconds to wait.
+        :rtype:     float
+        """
+
+        if self.requests_per_second <= 0:
+            return 0.0
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.requests_per_second)
+            self.updated = now
+            self.tokens -= 1
+
+            if self.tokens >= 0:
+                return 0.0
+
+            return -self.tokens / self.requests_per_second
+
+    def acquire(self):
+
+        """ Blocks until a request may be sent.  Call release() once the response has been read. """
+
+        if self.slots is not None:
+            self.slots.acquire()
+
+        time.sleep(self.reserve())
+
+    def release(self):
+
+        """ Marks a request started with acquire() as finished. """
+
+        if self.slots is not None:
+            self.slots.release()
+
+    def __enter__(self):
+
+        self.acquire()
+
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+
+        self.release()
+
+    async def acquire_async(self):
+
+        """ Waits, without blocking the event loop, until a request may be sent. """
+
+        if self.max_concurrent > 0:
+            if self.async_slots is None:
+                self.async_slots = asyncio.Semaphore(self.max_concurrent)
+            await self.async_slots.acquire()
+
+        await asyncio.sleep(self.reserve())
+
+    def release_async(self):
+
+        """ Marks a request started with acquire_async() as finished. """
+
+        if self.async_slots is not None:
+            self.async_slots.release()
+
+    async def __aenter__(self):
+
+        await self.acquire_async()
+
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+
+        self.release_async()
+
+
+"""
+   Copyright 2019 RiskSense, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
@@ -0,0 +1,179 @@
+""" *******************************************************************************************************************
+|
+|  Name        : retry.py
+|  Description : Retry policy shared by every API call the example scripts make.  Failed calls that are likely to
+                 succeed if tried again (throttling, gateway errors, dropped connections) are retried with
+                 exponential backoff and jitter, honoring any Retry-After header sent by the platform.
+|  Copyright   : (c) RiskSense, Inc.
+|  License     : Apache-2.0 (https://www.apache.org/licenses/LICENSE-2.0.txt)
+|
+******************************************************************************************************************* """
+
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+
+class RetryPolicy:
+
+    """
+    Decides whether a failed API call should be retried, and how long to wait first.
+    """
+
+    #  Status codes that are worth retrying.  429 means we have been throttled; the
+    #  others are returned while the platform (or a proxy in front of it) is overloaded
+    #  or restarting.
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, max_attempts=5, backoff_base=1.0, backoff_max=60.0):
+
+        """
+        :param max_attempts:    Maximum number of times a call is attempted, including the first.
+        :type  max_attempts:    int
+
+        :param backoff_base:    Seconds to wait before the first retry.  Doubles for each retry after that.
+        :type  backoff_base:    float
+
+        :param backoff_max:     Maximum number of seconds to wait between attempts.
+        :type  backoff_max:     float
+        """
+
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    @classmethod
+    def from_config(cls, configuration):
+
+        """
+        Creates a retry policy from the [retry] section of the config file.
+
+        :param configuration:   Variables found in the config file.
+        :type  configuration:   dict
+
+        :return:    The retry policy.
+        :rtype:     RetryPolicy
+        """
+
+        settings = configuration.get('retry', {})
+
+        return cls(
+            max_attempts=settings.get('max_attempts', 5),
+            backoff_base=settings.get('backoff_base', 1.0),
+            backoff_max=settings.get('backoff_max', 60.0)
+        )
+
+    def should_retry(self, attempt, status_code=None, idempotent=True):
+
+        """
+        Decides whether a call should be attempted again.
+
+        :param attempt:     Number of the attempt that just failed (1 for the first).
+        :type  attempt:     int
+
+        :param status_code: Status code returned, or None if no response was received.
+        :type  status_code: int
+
+        :param idempotent:  Whether the call can safely be repeated.  Calls that create
+                            something are only retried when throttled (429), since the
+                            platform may have acted on them before an error was returned.
+        :type  idempotent:  bool
+
+        :return:    True if the call should be attempted again.
+        :rtype:     bool
+        """
+
+        if attempt >= self.max_attempts:
+            return False
+
+        if status_code is None:
+            return idempotent
+
+        if not idempotent:
+            return status_code == 429
+
+        return status_code in self.RETRY_STATUSES
+
+    def delay(self, attempt, retry_after=None):
+
+        """
+        Returns how long to wait before the next attempt.  A Retry-After header from the
+        platform is honored; otherwise the delay grows exponentially with "full jitter",
+        so that many workers retrying at once don't all hit the platform together.
+
+        :param attempt:     Number of the attempt that just failed (1 for the first).
+        :type  attempt:     int
+
+        :param retry_after: Value of the Retry-After header, if one was returned.
+        :type  retry_after: str
+
+        :return:    Number of seconds to wait.
+        :rtype:     float
+        """
+
+        if retry_after:
+            seconds = parse_retry_after(retry_after)
+            if seconds is not None:
+                return min(seconds, self.backoff_max)
+
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    def wait(self, attempt, retry_after=None, reason=""):
+
+        """
+        Sleeps before the next attempt, and says so on the console.
+
+        :param attempt:     Number of the attempt that just failed (1 for the first).
+        :type  attempt:     int
+
+        :param retry_after: Value of the Retry-After header, if one was returned.
+        :type  retry_after: str
+
+        :param reason:      Why the attempt failed.  Used for console output.
+        :type  reason:      str
+        """
+
+        seconds = self.delay(attempt, retry_after)
+        print(f" - {reason}.  Retrying in {seconds:.1f} seconds (attempt {attempt + 1}/{self.max_attempts}).")
+        time.sleep(seconds)
+
+
+def parse_retry_after(value):
+
+    """
+    Converts a Retry-After header, which is either a number of seconds or an HTTP date,
+    to a number of seconds from now.
+
+    :param value:   Value of the Retry-After header.
+    :type  value:   str
+
+    :return:    Number of seconds, or None if the value can't be understood.
+    :rtype:     float
+    """
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+"""
+   Copyright 2019 RiskSense, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
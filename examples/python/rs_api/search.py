@@ -0,0 +1,642 @@
+""" *******************************************************************************************************************
+|
+|  Name        : search.py
+|  Description : Paginated search engine shared by the example scripts.  Handles the paging of results returned by
+                 the /api/v1/client/{clientId}/<resource>/search endpoints of the RiskSense REST API.
+|  Copyright   : (c) RiskSense, Inc.
+|  License     : Apache-2.0 (https://www.apache.org/licenses/LICENSE-2.0.txt)
+|
+******************************************************************************************************************* """
+
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from rs_api import jsondecode, session
+
+#  Upper bound for the ID range used by keyset pagination.
+KEYSET_MAX_ID = 2 ** 63 - 1
+
+
+def build_search_body(filters, projection="basic", page=0, page_size=100):
+
+    """
+    Assembles the body of a search request.  Results are always sorted by ID (ascending).
+
+    :param filters:     Filters to be applied to the search.
+    :type  filters:     list
+
+    :param projection:  Projection to be requested.  "basic" or "detail".
+    :type  projection:  str
+
+    :param page:        Page of results to be requested.
+    :type  page:        int
+
+    :param page_size:   Number of results in a single page.
+    :type  page_size:   int
+
+    :return:    The body for the search request.
+    :rtype:     dict
+    """
+
+    body = {
+        "filters": filters,
+        "projection": projection,
+        "sort": [
+            {
+                "field": "id",
+                "direction": "ASC"
+            }
+        ],
+        "page": page,
+        "size": page_size
+    }
+
+    return body
+
+
+def field_tree(fields):
+
+    """
+    Turns a list of dotted field paths (ex. ["severity", "host.hostId"]) into the tree
+    used by project_fields().  The "id" field is always included, since pagination and
+    checkpoints depend on it.
+
+    :param fields:  Dotted paths of the fields to keep.
+    :type  fields:  list
+
+    :return:    Nested dict of the fields to keep, with None marking a field kept whole.
+    :rtype:     dict
+    """
+
+    tree = {}
+
+    for path in ["id"] + list(fields):
+        node = tree
+        keys = path.split(".")
+
+        for key in keys[:-1]:
+            #  A parent already kept whole covers this path.
+            if key in node and node[key] is None:
+                break
+            node = node.setdefault(key, {})
+
+        else:
+            node[keys[-1]] = None
+
+    return tree
+
+
+def project_fields(record, tree):
+
+    """
+    Copies only the selected fields of a result, keeping their nesting.  Fields inside
+    lists of objects (ex. "tags.name") are selected from every object in the list.
+    Fields the result doesn't have are left out.
+
+    :param record:  Result returned by a search.
+    :type  record:  dict
+
+    :param tree:    Fields to keep, as returned by field_tree().
+    :type  tree:    dict
+
+    :return:    The result, with only the selected fields.
+    :rtype:     dict
+    """
+
+    projected = {}
+
+    for key, subtree in tree.items():
+        if key not in record:
+            continue
+
+        value = record[key]
+
+        if subtree is None:
+            projected[key] = value
+        elif isinstance(value, dict):
+            projected[key] = project_fields(value, subtree)
+        elif isinstance(value, list):
+            projected[key] = [project_fields(item, subtree) if isinstance(item, dict) else item for item in value]
+        else:
+            projected[key] = value
+
+    return projected
+
+
+def page_records(jsonified_result, embedded_key, fields=None):
+
+    """
+    Picks the results out of a single page returned by a search.  The platform omits
+    the "_embedded" section entirely when a search has no results.
+
+    :param jsonified_result:    JSON-converted response for a single page of results.
+    :type  jsonified_result:    dict
+
+    :param embedded_key:        Key that the results are found under (ex. "hosts").
+    :type  embedded_key:        str
+
+    :param fields:              If provided, only these fields of each result are kept.  See
+                                field_tree().
+    :type  fields:              dict
+
+    :return:    The results found in the page.
+    :rtype:     list
+    """
+
+    records = jsonified_result.get('_embedded', {}).get(embedded_key, [])
+
+    if fields is None:
+        return records
+
+    return [project_fields(record, fields) for record in records]
+
+
+def fetch_page(api, method, url, body, page, number_of_pages, description, stats=None):
+
+    """
+    Requests a single page of results from the API.
+
+    :param api:             Shared client to send the request with.
+    :type  api:             session.ApiClient
+
+    :param method:          "POST" to send body as a JSON search body, or "GET" to send it as
+                            query string parameters.
+    :type  method:          str
+
+    :param url:             URL of the endpoint.
+    :type  url:             str
+
+    :param body:            Body of the request (including "size").  It is copied, not modified.
+    :type  body:            dict
+
+    :param page:            Page of results to be requested.
+    :type  page:            int
+
+    :param number_of_pages: Total number of pages available ("?" if not yet known).  Used for
+                            progress output.
+    :type  number_of_pages: int
+
+    :param description:     What is being retrieved (ex. "hosts for client id 123").  Used for
+                            progress and error output.
+    :type  description:     str
+
+    :param stats:           If provided, the seconds taken and bytes received are stored in it
+                            under "seconds" and "bytes".
+    :type  stats:           dict
+
+    :return:    The JSON-converted response for the page.
+    :rtype:     dict
+    """
+
+    page_body = dict(body, page=page)
+
+    print(f"Getting page {page + 1}/{number_of_pages} of {description}...")
+
+    started = time.monotonic()
+
+    if method == "GET":
+        response = api.get(url, params=page_body)
+    else:
+        response = api.post(url, data=json.dumps(page_body))
+
+    if stats is not None:
+        stats['seconds'] = time.monotonic() - started
+        stats['bytes'] = len(response.content)
+
+    #  If request is successful...
+    if response and response.status_code == 200:
+        jsonified_result = jsondecode.response_json(response)
+
+    #  If request is unsuccessful...
+    else:
+        print(f"There was an error retrieving page {page} of {description}.")
+        print(f"Status Code: {response.status_code}")
+        print(f"Response: {response.text}")
+        exit(1)
+
+    return jsonified_result
+
+
+def fetch_page_records(api, method, url, body, page, number_of_pages, description, embedded_key, fields=None):
+
+    """
+    Requests a single page of results from the API, and picks the results out of it.
+    See fetch_page() and page_records().  When run by a worker thread, only the selected
+    fields are handed back, and the rest of the page can be freed straight away.
+
+    :return:    The results found in the page.
+    :rtype:     list
+    """
+
+    return page_records(fetch_page(api, method, url, body, page, number_of_pages, description), embedded_key, fields)
+
+
+def iter_pages(api, method, url, body, embedded_key, description, max_workers=1, start_page=0, fields=None):
+
+    """
+    Yields the results from each page available from a paged endpoint, one page at a
+    time, so that callers can process them without holding every page in memory.
+
+    Once the first page has been retrieved the remaining pages are independent of each
+    other.  If max_workers is greater than 1, they are requested concurrently by up to
+    max_workers threads, with no more than 2 * max_workers pages requested ahead of the
+    caller.  Pages are still yielded in page order.
+
+    :param api:             Shared client to send the requests with.
+    :type  api:             session.ApiClient
+
+    :param method:          "POST" for search endpoints, "GET" for list endpoints.
+    :type  method:          str
+
+    :param url:             URL of the endpoint.
+    :type  url:             str
+
+    :param body:            Body of the request (including "size").
+    :type  body:            dict
+
+    :param embedded_key:    Key that the results are found under (ex. "hosts").
+    :type  embedded_key:    str
+
+    :param description:     What is being retrieved.  Used for progress and error output.
+    :type  description:     str
+
+    :param max_workers:     Maximum number of page requests to have in flight at once.
+    :type  max_workers:     int
+
+    :param start_page:      Page to start from.  Earlier pages are skipped.
+    :type  start_page:      int
+
+    :param fields:          If provided, only these fields of each result are kept.  See
+                            field_tree().
+    :type  fields:          dict
+
+    :return:    A generator of lists, each holding the results from one page.
+    :rtype:     generator
+    """
+
+    #  The first page of results also tells us the number of pages that are available.
+    jsonified_result = fetch_page(api, method, url, body, start_page, "?", description)
+    number_of_pages = jsonified_result['page']['totalPages']
+
+    #  Hand back the results from the first page, rather than requesting it a second time.
+    yield page_records(jsonified_result, embedded_key, fields)
+
+    remaining_pages = iter(range(start_page + 1, number_of_pages))
+
+    if max_workers > 1 and number_of_pages - start_page > 2:
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+            #  Keep a window of pages in flight.  Pages are yielded in the order they were
+            #  submitted, so the results remain sorted.
+            pending = deque(
+                executor.submit(fetch_page_records, api, method, url, body, p, number_of_pages, description,
+                                embedded_key, fields)
+                for p in islice(remaining_pages, 2 * max_workers)
+            )
+
+            while pending:
+                records = pending.popleft().result()
+
+                next_page = next(remaining_pages, None)
+                if next_page is not None:
+                    pending.append(executor.submit(fetch_page_records, api, method, url, body, next_page,
+                                                   number_of_pages, description, embedded_key, fields))
+
+                yield records
+
+    else:
+        for p in remaining_pages:
+            yield fetch_page_records(api, method, url, body, p, number_of_pages, description, embedded_key, fields)
+
+
+def keyset_filter(last_id):
+
+    """
+    Builds the filter used by keyset pagination to request only results with an ID
+    greater than the last one already retrieved.
+
+    :param last_id:     ID of the last result already retrieved.
+    :type  last_id:     int
+
+    :return:    The filter.
+    :rtype:     dict
+    """
+
+    return {
+        "field": "id",
+        "exclusive": False,
+        "operator": "RANGE",
+        "value": str(last_id + 1) + "," + str(KEYSET_MAX_ID)
+    }
+
+
+def iter_keyset_pages(api, url, body, embedded_key, description, last_id=None, tuner=None, fields=None):
+
+    """
+    Yields the results from each page of a search, one page at a time, using keyset
+    pagination.  Instead of asking for page 1, 2, 3..., every request asks for the first
+    page of results with an ID greater than the last ID already retrieved.  Since the
+    results are sorted by ID, this costs the same at any depth, and results are not
+    skipped or repeated if the data changes part way through.
+
+    Each request depends on the one before it, so pages are requested one at a time.
+    Since no request depends on the size of the pages before it, a tuner can change the
+    page size between requests.
+
+    :param api:             Shared client to send the requests with.
+    :type  api:             session.ApiClient
+
+    :param url:             URL of the search endpoint.
+    :type  url:             str
+
+    :param body:            Body of the search request (sorted by ID, ascending).
+    :type  body:            dict
+
+    :param embedded_key:    Key that the results are found under (ex. "hosts").
+    :type  embedded_key:    str
+
+    :param description:     What is being retrieved.  Used for progress and error output.
+    :type  description:     str
+
+    :param last_id:         ID to continue after.  Starts from the beginning if None.
+    :type  last_id:         int
+
+    :param tuner:           If provided, picks the size of each page from the time taken and bytes
+                            received for the pages before it.
+    :type  tuner:           pagesize.PageSizeTuner
+
+    :param fields:          If provided, only these fields of each result are kept.  See
+                            field_tree().
+    :type  fields:          dict
+
+    :return:    A generator of lists, each holding the results from one page.
+    :rtype:     generator
+    """
+
+    page_size = tuner.size if tuner else body['size']
+    stats = {}
+
+    while True:
+        filters = list(body['filters'])
+        if last_id is not None:
+            filters.append(keyset_filter(last_id))
+
+        jsonified_result = fetch_page(api, "POST", url, dict(body, filters=filters, size=page_size), 0, "?",
+                                      description if last_id is None else f"{description} after id {last_id}",
+                                      stats)
+        records = page_records(jsonified_result, embedded_key, fields)
+
+        #  Every request asks for the first page of what is left, so there are no more results
+        #  once that is the only page.  A short page isn't enough to go by, since the platform
+        #  may return fewer results than were asked for.
+        last_page = not records or jsonified_result['page']['totalPages'] <= 1
+
+        if tuner:
+            page_size = tuner.record(len(records), stats['seconds'], stats['bytes'], last_page)
+
+        if records:
+            yield records
+            last_id = records[-1]['id']
+
+        if last_page:
+            return
+
+
+def collect_pages(api, method, url, body, embedded_key, description, max_workers=1):
+
+    """
+    Retrieves every page of results available from a paged endpoint.  See iter_pages().
+
+    :return:    A list of all results returned by the API.
+    :rtype:     list
+    """
+
+    all_results = []
+
+    for records in iter_pages(api, method, url, body, embedded_key, description, max_workers):
+        all_results.extend(records)
+
+    return all_results
+
+
+def iter_search(platform, key, client_id, resource, filters, projection="basic", page_size=100, max_workers=1,
+                checkpoint=None, keyset=False, tuner=None, fields=None):
+
+    """
+    Yields each of the results of a search against the specified resource, requesting
+    the pages of results as they are needed.  Results are yielded sorted by ID (ascending).
+
+    :param platform:    URL of the RiskSense platform to be queried.
+    :type  platform:    str
+
+    :param key:         API Key.
+    :type  key:         str
+
+    :param client_id:   ID of the client to be queried.
+    :type  client_id:   int
+
+    :param resource:    Resource to be searched ("host", "hostFinding", "group", "tag", "user", "network").
+    :type  resource:    str
+
+    :param filters:     Filters to be applied to the search.
+    :type  filters:     list
+
+    :param projection:  Projection to be requested.  "basic" or "detail".
+    :type  projection:  str
+
+    :param page_size:   Number of results in a single page.
+    :type  page_size:   int
+
+    :param max_workers: Maximum number of page requests to have in flight at once.
+    :type  max_workers: int
+
+    :param checkpoint:  If provided, progress is saved after each page has been processed, and
+                        a search that was interrupted resumes from the last completed page.
+    :type  checkpoint:  checkpoint.Checkpoint
+
+    :param keyset:      Use keyset pagination (see iter_keyset_pages()) rather than page numbers.
+                        max_workers is ignored, as keyset pages must be requested in order.
+    :type  keyset:      bool
+
+    :param tuner:       If provided, page_size is ignored.  Keyset searches adjust the page size
+                        as they go, and the best size is saved at the end.  Page-numbered searches
+                        use the size remembered by the tuner for the whole search.
+    :type  tuner:       pagesize.PageSizeTuner
+
+    :param fields:      Dotted paths of the fields to keep from each result (ex. ["severity",
+                        "host.hostId"]).  Every field is kept if None.  "id" is always kept.
+    :type  fields:      list
+
+    :return:    A generator of the results returned by the API.  Any saved progress has
+                already been loaded into checkpoint when it is returned, so the number
+                of results retrieved by an earlier run is known before the first request.
+    :rtype:     generator
+    """
+
+    #  Assemble the URL for the API call
+    url = platform + "/api/v1/client/" + str(client_id) + "/" + resource + "/search"
+
+    #  Results are returned in the response under _embedded.<resource>s
+    embedded_key = resource + "s"
+
+    #  Define the body for the API call.
+    if tuner:
+        page_size = tuner.size
+    body = build_search_body(filters, projection, 0, page_size)
+
+    api = session.get_client(platform, key)
+    description = f"{embedded_key} for client id {client_id}"
+    tree = field_tree(fields) if fields else None
+
+    if keyset:
+        #  The mode is part of the checkpoint's fingerprint, so a checkpoint saved in one
+        #  mode isn't resumed in the other.  The page size isn't, since keyset progress
+        #  doesn't depend on it.
+        start_page = checkpoint.load(url, dict(body, pagination="keyset", size=None)) if checkpoint else 0
+        pages = iter_keyset_pages(api, url, body, embedded_key, description,
+                                  checkpoint.last_id if checkpoint else None, tuner, tree)
+
+    else:
+        start_page = checkpoint.load(url, body) if checkpoint else 0
+        pages = iter_pages(api, "POST", url, body, embedded_key, description, max_workers, start_page, tree)
+
+    return iter_page_results(pages, start_page, checkpoint, tuner)
+
+
+def iter_page_results(pages, start_page=0, checkpoint=None, tuner=None):
+
+    """
+    Yields each of the results from a generator of pages, saving progress to the
+    checkpoint as each page is finished with, and tidying up once every page is done.
+    See iter_search().
+
+    :param pages:       Generator of lists, each holding the results from one page.
+    :type  pages:       generator
+
+    :param start_page:  Page the first list of results is from.
+    :type  start_page:  int
+
+    :param checkpoint:  If provided, progress is saved after each page has been processed.
+    :type  checkpoint:  checkpoint.Checkpoint
+
+    :param tuner:       If provided, the best page size found is saved at the end.
+    :type  tuner:       pagesize.PageSizeTuner
+
+    :return:    A generator of the results.
+    :rtype:     generator
+    """
+
+    page = start_page
+
+    for records in pages:
+        yield from records
+
+        #  The caller has asked for more, so it has finished with every result in this page.
+        if checkpoint:
+            checkpoint.page_done(page, records)
+        page += 1
+
+    if checkpoint:
+        checkpoint.finish()
+
+    if tuner:
+        tuner.save()
+
+
+def paginated_search(platform, key, client_id, resource, filters, projection="basic", page_size=100,
+                     max_workers=1, keyset=False, fields=None):
+
+    """
+    Retrieve all of the results of a search against the specified resource, cycling
+    through all of the pages of results that are available.  Results are returned
+    sorted by ID (ascending).
+
+    :param platform:    URL of the RiskSense platform to be queried.
+    :type  platform:    str
+
+    :param key:         API Key.
+    :type  key:         str
+
+    :param client_id:   ID of the client to be queried.
+    :type  client_id:   int
+
+    :param resource:    Resource to be searched ("host", "hostFinding", "group", "tag", "user", "network").
+    :type  resource:    str
+
+    :param filters:     Filters to be applied to the search.
+    :type  filters:     list
+
+    :param projection:  Projection to be requested.  "basic" or "detail".
+    :type  projection:  str
+
+    :param page_size:   Number of results in a single page.
+    :type  page_size:   int
+
+    :param max_workers: Maximum number of page requests to have in flight at once.
+    :type  max_workers: int
+
+    :param keyset:      Use keyset pagination rather than page numbers.  See iter_keyset_pages().
+    :type  keyset:      bool
+
+    :param fields:      Dotted paths of the fields to keep from each result.  See iter_search().
+    :type  fields:      list
+
+    :return:    A list of all results returned by the API.
+    :rtype:     list
+    """
+
+    return list(iter_search(platform, key, client_id, resource, filters, projection, page_size, max_workers,
+                            keyset=keyset, fields=fields))
+
+
+def paginated_list(platform, key, path, embedded_key, page_size=100, max_workers=1):
+
+    """
+    Retrieve all of the results from a list endpoint that is paged with "page" and
+    "size" query string parameters (ex. /api/v1/client).
+
+    :param platform:        URL of the RiskSense platform to be queried.
+    :type  platform:        str
+
+    :param key:             API Key.
+    :type  key:             str
+
+    :param path:            Path of the endpoint (ex. "/api/v1/client").
+    :type  path:            str
+
+    :param embedded_key:    Key that the results are found under (ex. "clients").
+    :type  embedded_key:    str
+
+    :param page_size:       Number of results in a single page.
+    :type  page_size:       int
+
+    :param max_workers:     Maximum number of page requests to have in flight at once.
+    :type  max_workers:     int
+
+    :return:    A list of all results returned by the API.
+    :rtype:     list
+    """
+
+    return collect_pages(session.get_client(platform, key), "GET", platform + path, {"size": page_size},
+                         embedded_key, embedded_key, max_workers)
+
+
+"""
+   Copyright 2019 RiskSense, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
@@ -0,0 +1,217 @@
+""" *******************************************************************************************************************
+|
+|  Name        : session.py
+|  Description : Shared HTTP client used for every call the example scripts make to the RiskSense REST API.  Wraps a
+                 pooled requests.Session so connections (and their TLS handshakes) are reused across calls.
+|  Copyright   : (c) RiskSense, Inc.
+|  License     : Apache-2.0 (https://www.apache.org/licenses/LICENSE-2.0.txt)
+|
+******************************************************************************************************************* """
+
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+from rs_api import jsondecode
+from rs_api.ratelimit import RateLimiter
+from rs_api.retry import RetryPolicy
+
+
+class ApiClient:
+
+    """
+    Keep-alive HTTP client for the RiskSense REST API.  The API key and content type
+    headers are sent with every request, every request (including retries) passes
+    through the client's rate limiter, and failed requests are retried according to the
+    client's retry policy.
+    """
+
+    def __init__(self, platform, key, pool_size=10, retry_policy=None, rate_limiter=None):
+
+        """
+        :param platform:        URL of the RiskSense platform to be queried.
+        :type  platform:        str
+
+        :param key:             API Key.
+        :type  key:             str
+
+        :param pool_size:       Maximum number of connections to keep open to the platform.
+        :type  pool_size:       int
+
+        :param retry_policy:    Policy for retrying failed requests.  The defaults are used if None.
+        :type  retry_policy:    RetryPolicy
+
+        :param rate_limiter:    Rate limiter shared by every thread using this client.  No limit
+                                is applied if None.
+        :type  rate_limiter:    RateLimiter
+        """
+
+        self.platform = platform
+        self.pool_size = pool_size
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter or RateLimiter()
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "x-api-key": key,
+            "content-type": "application/json"
+        })
+
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method, url, idempotent=True, **kwargs):
+
+        """
+        Sends a request to the API over the pooled session.  Requests that fail in a way
+        that is worth retrying (see RetryPolicy) are sent again after a backoff.
+
+        :param method:      HTTP method ("GET", "POST", "PUT", ...).
+        :type  method:      str
+
+        :param url:         URL for the API call.
+        :type  url:         str
+
+        :param idempotent:  Whether the request can safely be repeated.  Pass False for
+                            requests that create something.
+        :type  idempotent:  bool
+
+        :return:    The response from the platform.  If all attempts fail, the last
+                    response received is returned.
+        :rtype:     requests.Response
+        """
+
+        attempt = 1
+
+        while True:
+            try:
+                with self.rate_limiter:
+                    response = self.session.request(method, url, **kwargs)
+
+            except (requests.ConnectionError, requests.Timeout) as error:
+                if not self.retry_policy.should_retry(attempt, None, idempotent):
+                    raise
+
+                self.retry_policy.wait(attempt, reason=f"{method} {url} failed ({error.__class__.__name__})")
+
+            else:
+                if not self.retry_policy.should_retry(attempt, response.status_code, idempotent):
+                    return response
+
+                #  Hand the connection back to the pool (needed if the response is being streamed).
+                response.close()
+
+                self.retry_policy.wait(attempt, response.headers.get("Retry-After"),
+                                       reason=f"{method} {url} returned {response.status_code}")
+
+            attempt += 1
+
+    def get(self, url, **kwargs):
+
+        """ Sends a GET request to the API. """
+
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+
+        """ Sends a POST request to the API. """
+
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+
+        """ Sends a PUT request to the API. """
+
+        return self.request("PUT", url, **kwargs)
+
+    def close(self):
+
+        """ Closes all pooled connections. """
+
+        self.session.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def open_client(platform, key, configuration=None):
+
+    """
+    Creates the shared client for the platform and API key, replacing any existing one.
+    Scripts call this once at start-up with the settings from their config file.
+
+    :param platform:        URL of the RiskSense platform to be queried.
+    :type  platform:        str
+
+    :param key:             API Key.
+    :type  key:             str
+
+    :param configuration:   Variables found in the config file.  The [http], [retry],
+                            [rate_limit] and [json] sections are used, if present.
+    :type  configuration:   dict
+
+    :return:    The shared client.
+    :rtype:     ApiClient
+    """
+
+    configuration = configuration or {}
+
+    #  Pick the decoder used to parse every response.
+    jsondecode.use_decoder(configuration.get('json', {}).get('decoder', 'auto'))
+
+    with _clients_lock:
+        existing = _clients.get((platform, key))
+        if existing is not None:
+            existing.close()
+
+        _clients[(platform, key)] = ApiClient(
+            platform,
+            key,
+            pool_size=configuration.get('http', {}).get('pool_size', 10),
+            retry_policy=RetryPolicy.from_config(configuration),
+            rate_limiter=RateLimiter.from_config(configuration)
+        )
+
+        return _clients[(platform, key)]
+
+
+def get_client(platform, key):
+
+    """
+    Returns the shared client for the platform and API key, creating one with the
+    default settings if open_client() has not been called.
+
+    :param platform:    URL of the RiskSense platform to be queried.
+    :type  platform:    str
+
+    :param key:         API Key.
+    :type  key:         str
+
+    :return:    The shared client.
+    :rtype:     ApiClient
+    """
+
+    with _clients_lock:
+        if (platform, key) not in _clients:
+            _clients[(platform, key)] = ApiClient(platform, key)
+
+        return _clients[(platform, key)]
+
+
+"""
+   Copyright 2019 RiskSense, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
@@ -0,0 +1,720 @@
+""" *******************************************************************************************************************
+|
+|  Name        : sinks.py
+|  Description : Output sinks that the example scripts can stream search results into, one result at a time, as the
+                 pages of results arrive.  Nothing is collected into a list first, so memory use stays flat however
+                 many results there are.
+|  Copyright   : (c) RiskSense, Inc.
+|  License     : Apache-2.0 (https://www.apache.org/licenses/LICENSE-2.0.txt)
+|
+******************************************************************************************************************* """
+
+import contextlib
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+
+
+def compressed_writer(raw, compression=None):
+
+    """
+    Wraps a binary file object so that what is written to it is compressed.  Closing
+    the wrapper finishes the compressed stream, but leaves raw open.
+
+    :param raw:         File object the compressed bytes are written to.
+    :type  raw:         io.BufferedIOBase
+
+    :param compression: "gzip", "zstd" or None.  zstd requires the zstandard package.
+    :type  compression: str
+
+    :return:    The file object to write to (raw itself if compression is None).
+    :rtype:     io.BufferedIOBase
+    """
+
+    if not compression:
+        return raw
+
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6)
+
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            print("zstd compression requires the zstandard package (pip install zstandard).")
+            exit(1)
+
+        return zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+
+    print(f"Unknown compression \"{compression}\".  Use \"gzip\" or \"zstd\".")
+    exit(1)
+
+
+class Sink:
+
+    """
+    Base class for output sinks.  Sinks are context managers: results are written with
+    write() inside the with block, and the output is completed and closed when the block
+    ends.  While a sink is writing to stdout, console output is sent to stderr instead,
+    so that it doesn't get mixed in with the results.
+    """
+
+    #  File extension used in the default output path.
+    EXTENSION = ""
+
+    def __init__(self, path):
+
+        """
+        :param path:    Path to the output file, or "-" for stdout.
+        :type  path:    str
+        """
+
+        self.path = path
+        self.count = 0
+        self.resume = 0
+        self.redirect = None
+
+    @classmethod
+    def create(cls, path, settings, resource, projection):
+
+        """
+        Creates a sink from the [output] section of the config file.
+
+        :param path:        Path to the output file, or "-" for stdout.
+        :type  path:        str
+
+        :param settings:    The [output] section of the config file.
+        :type  settings:    dict
+
+        :param resource:    Resource whose results will be written (ex. "host").
+        :type  resource:    str
+
+        :param projection:  Projection the results were requested with.  "basic" or "detail".
+        :type  projection:  str
+
+        :return:    The sink.
+        :rtype:     Sink
+        """
+
+        return cls(path, settings.get('compression') or None)
+
+    @classmethod
+    def extension(cls, settings):
+
+        """
+        :param settings:    The [output] section of the config file.
+        :type  settings:    dict
+
+        :return:    The file extension for output written with these settings (ex. ".csv.gz").
+        :rtype:     str
+        """
+
+        return cls.EXTENSION
+
+    def __enter__(self):
+
+        self.open()
+
+        if self.path == "-":
+            self.redirect = contextlib.redirect_stdout(sys.stderr)
+            self.redirect.__enter__()
+
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+
+        if self.redirect:
+            self.redirect.__exit__(exc_type, exc, tb)
+            self.redirect = None
+
+        self.close()
+
+    def resumable(self):
+
+        """
+        :return:    True if the sink can carry on an output file left by an interrupted run.
+        :rtype:     bool
+        """
+
+        return False
+
+    def resume_after(self, records):
+
+        """
+        Makes the sink carry on the output file left by an interrupted run, rather than
+        starting it again.  Anything in the file after the first records results is cut
+        off when the sink is opened, and the rest of the results are added after them.
+
+        :param records: Number of results the interrupted run finished with (ex. the
+                        records count of a checkpoint.Checkpoint).
+        :type  records: int
+        """
+
+        if records and not self.resumable():
+            print(f"A search can't be resumed into {self.path}.  Delete the checkpoint file to start the search "
+                  f"again, or set a different output path.")
+            exit(1)
+
+        self.resume = records
+
+    def open(self):
+
+        """ Opens the output.  Called on entering the with block. """
+
+        raise NotImplementedError
+
+    def write(self, record):
+
+        """
+        Writes a single result.
+
+        :param record:  Result returned by a search.
+        :type  record:  dict
+        """
+
+        raise NotImplementedError
+
+    def sync(self):
+
+        """ Pushes the results written so far out to the file.  Used before saving a checkpoint. """
+
+        pass
+
+    def close(self):
+
+        """ Completes and closes the output.  Called on leaving the with block. """
+
+        raise NotImplementedError
+
+    def write_all(self, records):
+
+        """
+        Writes every result from an iterable (ex. a generator returned by search.iter_search()).
+
+        :param records: Results returned by a search.
+        :type  records: iterable
+
+        :return:    The total number of results written by the sink.
+        :rtype:     int
+        """
+
+        for record in records:
+            self.write(record)
+
+        return self.count
+
+
+class TextSink(Sink):
+
+    """ Base class for sinks that write text to a file or stdout, optionally compressed. """
+
+    #  Newline translation for the text stream (see io.TextIOWrapper).
+    NEWLINE = "\n"
+
+    #  Added to the file extension for each compression.
+    COMPRESSION_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+    def __init__(self, path, compression=None):
+
+        """
+        :param path:        Path to the output file, or "-" for stdout.
+        :type  path:        str
+
+        :param compression: "gzip", "zstd" or None.
+        :type  compression: str
+        """
+
+        super().__init__(path)
+        self.compression = compression
+        self.raw = None
+        self.binary = None
+        self.output = None
+
+    @classmethod
+    def extension(cls, settings):
+
+        return cls.EXTENSION + cls.COMPRESSION_EXTENSIONS.get(settings.get('compression'), "")
+
+    def resumable(self):
+
+        #  There is no cutting back stdout or a compressed stream to the end of a result.
+        return self.path != "-" and not self.compression
+
+    def rows(self, lines):
+
+        """
+        Splits the lines of an output file into results.  Each line holds one result.
+
+        :param lines:   Lines of the file, decoded.
+        :type  lines:   iterable
+
+        :return:    An iterable of the results in the file, in any form.
+        :rtype:     iterable
+        """
+
+        return lines
+
+    def resume_offset(self, existing):
+
+        """
+        Finds where the first self.resume results written to an output file end.
+
+        :param existing:    The output file, opened for reading in binary mode.
+        :type  existing:    io.BufferedIOBase
+
+        :return:    Offset of the end of the last of those results, in bytes, or None if the
+                    file holds fewer results than that.
+        :rtype:     int
+        """
+
+        offset = 0
+
+        #  Only whole lines are read, so offset is always the end of the last complete row.
+        def lines():
+            nonlocal offset
+            for line in existing:
+                offset += len(line)
+                yield line.decode("utf-8")
+
+        for number, _ in enumerate(self.rows(lines()), 1):
+            if number == self.resume:
+                return offset
+
+        return None
+
+    def open(self):
+
+        if self.resume:
+            offset = None
+            if os.path.isfile(self.path):
+                with open(self.path, "rb") as existing:
+                    offset = self.resume_offset(existing)
+
+            if offset is None:
+                print(f"{self.path} holds fewer than the {self.resume} results already retrieved, so the search "
+                      f"can't be resumed into it.  Delete the checkpoint file to start the search again.")
+                exit(1)
+
+            #  Cut off anything written after the last checkpoint, and carry on from there.
+            self.raw = open(self.path, "r+b")
+            self.raw.truncate(offset)
+            self.raw.seek(offset)
+            self.count = self.resume
+            print(f"Adding to the {self.resume} results already in {self.path}.")
+
+        else:
+            self.raw = sys.stdout.buffer if self.path == "-" else open(self.path, "wb")
+
+        self.binary = compressed_writer(self.raw, self.compression)
+        self.output = io.TextIOWrapper(self.binary, encoding="utf-8", newline=self.NEWLINE)
+
+    def sync(self):
+
+        #  Flushing a compressed stream part way through costs compression, and compressed
+        #  files can't be resumed anyway.
+        if not self.compression:
+            self.output.flush()
+
+    def close(self):
+
+        self.output.flush()
+        self.output.detach()
+
+        #  Finish the compressed stream, then close the file (but not stdout).
+        if self.binary is not self.raw:
+            self.binary.close()
+
+        if self.path == "-":
+            self.raw.flush()
+        else:
+            self.raw.close()
+
+
+class NdjsonSink(TextSink):
+
+    """ Writes results as newline-delimited JSON: one JSON object per line. """
+
+    EXTENSION = ".ndjson"
+
+    def write(self, record):
+
+        self.output.write(json.dumps(record, separators=(",", ":")))
+        self.output.write("\n")
+        self.count += 1
+
+
+#  The columns written by ParquetSink for each resource and projection: (column name, dotted
+#  path of the field in each result, type).  Types are "int", "float", "bool" or "string".
+#  Fields that are missing, or can't be converted to the column's type, are left null.
+#  Objects and lists are written as JSON strings.
+BASIC_COLUMNS = {
+    "hostFinding": [
+        ("id", "id", "int"),
+        ("client_id", "clientId", "int"),
+        ("host_id", "host.hostId", "int"),
+        ("host_name", "host.hostName", "string"),
+        ("ip_address", "host.ipAddress", "string"),
+        ("title", "title", "string"),
+        ("severity", "severity", "float"),
+        ("status", "status", "string"),
+        ("discovered_on", "discoveredOn", "string"),
+        ("last_found_on", "lastFoundOn", "string")
+    ],
+    "host": [
+        ("id", "id", "int"),
+        ("client_id", "clientId", "int"),
+        ("host_name", "hostName", "string"),
+        ("ip_address", "ipAddress", "string"),
+        ("criticality", "criticality", "int"),
+        ("rs3", "rs3", "int"),
+        ("discovered_on", "discoveredOn", "string"),
+        ("last_found_on", "lastFoundOn", "string")
+    ]
+}
+
+#  Extra columns written for results requested with the "detail" projection.
+DETAIL_COLUMNS = {
+    "hostFinding": [
+        ("description", "description", "string"),
+        ("solution", "solution", "string"),
+        ("vrr", "riskRating", "float"),
+        ("cves", "vulnerabilities.vulnInfoList", "string"),
+        ("groups", "groups", "string"),
+        ("tags", "tags", "string")
+    ],
+    "host": [
+        ("fqdn", "fqdn", "string"),
+        ("operating_system", "os.name", "string"),
+        ("network_id", "network.id", "int"),
+        ("network_name", "network.name", "string"),
+        ("groups", "groups", "string"),
+        ("tags", "tags", "string")
+    ]
+}
+
+
+def record_field(record, path):
+
+    """
+    Looks up a field in a result by its dotted path (ex. "host.hostId").
+
+    :param record:  Result returned by a search.
+    :type  record:  dict
+
+    :param path:    Dotted path of the field.
+    :type  path:    str
+
+    :return:    The value of the field, or None if it isn't present.
+    """
+
+    value = record
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+
+    return value
+
+
+def column_value(value, column_type):
+
+    """
+    Converts a field's value to the type of the column it is written to.
+
+    :param value:       Value of the field.
+
+    :param column_type: "int", "float", "bool" or "string".
+    :type  column_type: str
+
+    :return:    The converted value, or None if it can't be converted.
+    """
+
+    if value is None:
+        return None
+
+    if column_type == "string":
+        return json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+
+    if column_type == "bool":
+        return value if isinstance(value, bool) else str(value).lower() == "true"
+
+    try:
+        return int(value) if column_type == "int" else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ParquetSink(Sink):
+
+    """
+    Writes host findings or hosts to a Parquet file, with a fixed set of columns for
+    each resource and projection (see BASIC_COLUMNS and DETAIL_COLUMNS).  Results are
+    buffered and written as a row group every row_group_size results, so only one row
+    group is held in memory at a time.  Requires the pyarrow package.
+    """
+
+    ARROW_TYPES = {"int": "int64", "float": "float64", "bool": "bool_", "string": "string"}
+
+    EXTENSION = ".parquet"
+
+    def __init__(self, path, resource, projection="basic", compression="snappy", row_group_size=50000):
+
+        """
+        :param path:            Path to the output file.
+        :type  path:            str
+
+        :param resource:        Resource being written.  "hostFinding" or "host".
+        :type  resource:        str
+
+        :param projection:      Projection the results were requested with.  "basic" or "detail".
+        :type  projection:      str
+
+        :param compression:     Parquet compression codec ("snappy", "gzip", "zstd" or "none").
+        :type  compression:     str
+
+        :param row_group_size:  Number of results in each row group.
+        :type  row_group_size:  int
+        """
+
+        super().__init__(path)
+
+        if resource not in BASIC_COLUMNS:
+            print(f"Parquet output is only available for: {', '.join(BASIC_COLUMNS)}.")
+            exit(1)
+
+        if path == "-":
+            print("Parquet output must be written to a file, not stdout.")
+            exit(1)
+
+        self.columns = BASIC_COLUMNS[resource] + (DETAIL_COLUMNS[resource] if projection == "detail" else [])
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self.buffer = None
+        self.writer = None
+        self.schema = None
+        self.pyarrow = None
+
+    @classmethod
+    def create(cls, path, settings, resource, projection):
+
+        return cls(path, resource, projection, settings.get('compression') or "snappy",
+                   settings.get('row_group_size', 50000))
+
+    def open(self):
+
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            print("Parquet output requires the pyarrow package (pip install pyarrow).")
+            exit(1)
+
+        self.pyarrow = pyarrow
+        self.schema = pyarrow.schema([
+            (name, getattr(pyarrow, self.ARROW_TYPES[column_type])()) for name, _, column_type in self.columns
+        ])
+        self.writer = pyarrow.parquet.ParquetWriter(self.path, self.schema, compression=self.compression)
+        self.buffer = {name: [] for name, _, _ in self.columns}
+
+    def write(self, record):
+
+        for name, path, column_type in self.columns:
+            self.buffer[name].append(column_value(record_field(record, path), column_type))
+
+        self.count += 1
+
+        if self.count % self.row_group_size == 0:
+            self.flush()
+
+    def flush(self):
+
+        """ Writes the buffered results to the file as a row group. """
+
+        if self.buffer[self.columns[0][0]]:
+            self.writer.write_table(self.pyarrow.Table.from_pydict(self.buffer, schema=self.schema))
+            self.buffer = {name: [] for name, _, _ in self.columns}
+
+    def close(self):
+
+        self.flush()
+        self.writer.close()
+
+
+def flatten(record, prefix=""):
+
+    """
+    Flattens a result's nested objects into a single level, keyed by dotted path (ex.
+    {"host": {"hostId": 1}} becomes {"host.hostId": 1}).  Lists are left as they are.
+
+    :param record:  Result returned by a search (or an object nested inside one).
+    :type  record:  dict
+
+    :param prefix:  Dotted path of record within the result.
+    :type  prefix:  str
+
+    :return:    The flattened result.
+    :rtype:     dict
+    """
+
+    flattened = {}
+
+    for key, value in record.items():
+        if isinstance(value, dict):
+            flattened.update(flatten(value, prefix + key + "."))
+        else:
+            flattened[prefix + key] = value
+
+    return flattened
+
+
+class CsvSink(TextSink):
+
+    """
+    Writes results to a CSV file, one row per result.  Each column is a dotted path into
+    the result (ex. "host.hostName"), so fields of nested objects get columns of their
+    own.  Lists and objects are written as JSON, and missing fields are left empty.  If
+    no columns are given, every field of the first result is used.
+    """
+
+    #  The csv module writes its own line endings.
+    NEWLINE = ""
+
+    EXTENSION = ".csv"
+
+    def __init__(self, path, columns=None, compression=None):
+
+        """
+        :param path:        Path to the output file, or "-" for stdout.
+        :type  path:        str
+
+        :param columns:     Dotted paths of the fields to write, in order.
+        :type  columns:     list
+
+        :param compression: "gzip", "zstd" or None.
+        :type  compression: str
+        """
+
+        super().__init__(path, compression)
+        self.columns = list(columns) if columns else None
+        self.writer = None
+
+    @classmethod
+    def create(cls, path, settings, resource, projection):
+
+        return cls(path, settings.get('columns', {}).get(resource), settings.get('compression') or None)
+
+    def rows(self, lines):
+
+        reader = csv.reader(lines)
+
+        #  The first row holds the column names, not a result.
+        header = next(reader, None)
+        if self.columns is None:
+            self.columns = header
+
+        elif header is not None and header != self.columns:
+            print(f"The columns of {self.path} don't match the configured columns, so the search can't be resumed "
+                  f"into it.  Delete the checkpoint file to start the search again.")
+            exit(1)
+
+        return reader
+
+    def open(self):
+
+        super().open()
+        self.writer = csv.writer(self.output)
+
+        #  A resumed file already has its header.
+        if self.columns and not self.resume:
+            self.writer.writerow(self.columns)
+
+    def write(self, record):
+
+        if self.columns is None:
+            self.columns = list(flatten(record))
+            self.writer.writerow(self.columns)
+
+        self.writer.writerow([
+            column_value(record_field(record, column), "string") or "" for column in self.columns
+        ])
+        self.count += 1
+
+
+#  Output path used if none is set in the [output] section of the config file.
+DEFAULT_PATH = "{resource}s{extension}"
+
+#  Sinks that can be selected with the "format" setting in the [output] section of the config file.
+FORMATS = {
+    "ndjson": NdjsonSink,
+    "parquet": ParquetSink,
+    "csv": CsvSink
+}
+
+
+def open_sink(configuration, resource, projection="basic", resume=0, base_dir=None):
+
+    """
+    Creates the output sink selected in the [output] section of the config file.
+
+    :param configuration:   Variables found in the config file.
+    :type  configuration:   dict
+
+    :param resource:        Resource whose results will be written (ex. "host").  Replaces
+                            "{resource}" in the configured path.  "{extension}" is replaced
+                            by the file extension for the format (ex. ".csv.gz").
+    :type  resource:        str
+
+    :param projection:      Projection the results were requested with.  "basic" or "detail".
+    :type  projection:      str
+
+    :param resume:          Number of results already written by an interrupted run of the
+                            same search.  See Sink.resume_after().
+    :type  resume:          int
+
+    :param base_dir:        Directory a relative output path is relative to (ex. the directory
+                            of the config file).  The current directory if None.
+    :type  base_dir:        str
+
+    :return:    The sink, or None if no output format is configured.
+    :rtype:     Sink
+    """
+
+    settings = configuration.get('output', {})
+    output_format = settings.get('format')
+
+    if not output_format:
+        return None
+
+    if output_format not in FORMATS:
+        print(f"Unknown output format \"{output_format}\".  Use one of: {', '.join(FORMATS)}.")
+        exit(1)
+
+    sink_class = FORMATS[output_format]
+    path = (settings.get('path') or DEFAULT_PATH).format(resource=resource, extension=sink_class.extension(settings))
+    if path != "-" and base_dir:
+        path = os.path.join(base_dir, path)
+
+    sink = sink_class.create(path, settings, resource, projection)
+    sink.resume_after(resume)
+
+    return sink
+
+
+"""
+   Copyright 2019 RiskSense, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
@@ -0,0 +1,205 @@
+""" *******************************************************************************************************************
+|
+|  Name        :  benchmark_json_decoders.py
+|  Description :  Compares how quickly each of the installed JSON decoders (orjson, ujson and the standard library's
+                  json module) parses recorded pages of host finding search results.  Pages are recorded from the
+                  RiskSense REST API the first time the script is run, and reused after that.
+|  Copyright   :  (c) RiskSense, Inc.
+|  License     :  Apache-2.0 (https://www.apache.org/licenses/LICENSE-2.0.txt)
+|
+********************************************************************************************************************"""
+
+import glob
+import importlib
+import json
+import os
+import sys
+import time
+import toml
+
+#  Make the shared rs_api package (one directory up) importable.
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+from rs_api import jsondecode, search, session  # noqa: E402
+
+
+def record_responses(platform, key, client_id, directory, pages=5, projection="detail"):
+
+    """
+    Saves the raw bodies of the first few pages of open host findings, exactly as they
+    were received from the API.
+
+    :param platform:    URL of the RiskSense platform to be queried.
+    :type  platform:    str
+
+    :param key:         API Key.
+    :type  key:         str
+
+    :param client_id:   ID of the client to be queried.
+    :type  client_id:   int
+
+    :param directory:   Directory the pages are saved to.
+    :type  directory:   str
+
+    :param pages:       Number of pages to save.
+    :type  pages:       int
+
+    :param projection:  Projection to be requested.  "basic" or "detail".
+    :type  projection:  str
+
+    :return:    Paths to the saved pages.
+    :rtype:     list
+    """
+
+    url = platform + "/api/v1/client/" + str(client_id) + "/hostFinding/search"
+    filters = [
+        {
+            "field": "generic_state",
+            "exclusive": False,
+            "operator": "EXACT",
+            "value": "open"
+        }
+    ]
+
+    api = session.get_client(platform, key)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+
+    for page in range(pages):
+        print(f"Recording page {page + 1}/{pages} of hostFindings for client id {client_id}...")
+        response = api.post(url, data=json.dumps(search.build_search_body(filters, projection, page)))
+
+        #  If request is unsuccessful...
+        if response.status_code != 200:
+            print(f"There was an error retrieving page {page} of hostFindings.")
+            print(f"Status Code: {response.status_code}")
+            print(f"Response: {response.text}")
+            exit(1)
+
+        path = os.path.join(directory, f"hostfindings_page_{page}.json")
+        with open(path, "wb") as recording:
+            recording.write(response.content)
+        paths.append(path)
+
+        if not search.page_records(jsondecode.response_json(response), "hostFindings"):
+            break
+
+    return paths
+
+
+def benchmark(documents, decoder, repeat=20):
+
+    """
+    Times how long a decoder takes to parse every document, from bytes.
+
+    :param documents:   The JSON documents to be parsed.
+    :type  documents:   list
+
+    :param decoder:     Name of the decoder module ("orjson", "ujson" or "json").
+    :type  decoder:     str
+
+    :param repeat:      Number of times to parse every document.  The fastest run is kept.
+    :type  repeat:      int
+
+    :return:    The fastest time taken to parse every document once, in seconds.
+    :rtype:     float
+    """
+
+    loads = importlib.import_module(decoder).loads
+    fastest = None
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for document in documents:
+            loads(document)
+        elapsed = time.perf_counter() - started
+        fastest = elapsed if fastest is None else min(fastest, elapsed)
+
+    return fastest
+
+
+def read_config_file(filename):
+
+    """
+    Reads TOML-formatted configuration file.
+
+    :param filename:    Path to file to be read.
+    :type  filename:    str
+
+    :return:    Variables found in config file.
+    :rtype:     dict
+    """
+
+    #  Read the config file
+    toml_data = open(filename).read()
+
+    #  Load the definitions in the config file
+    data = toml.loads(toml_data)
+
+    return data
+
+
+def main():
+
+    """ Main body of script """
+
+    #  Define the path to the config file, and read it.
+    conf_file = os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), 'conf', 'config.toml')
+    configuration = read_config_file(conf_file)
+
+    #  Recorded pages can also be passed on the command line, instead of recording them.
+    paths = sys.argv[1:]
+    directory = os.path.join(os.path.dirname(conf_file), 'recorded_responses')
+
+    if not paths:
+        paths = sorted(glob.glob(os.path.join(directory, "*.json")))
+
+    if not paths:
+        rs_url = configuration['platform']['url']
+        api_key = configuration['platform']['api_key']
+        client_id = configuration['platform']['client_id']
+
+        #  Open the shared, pooled HTTP session used for every API call made by this script.
+        session.open_client(rs_url, api_key, configuration)
+
+        paths = record_responses(rs_url, api_key, client_id, directory)
+
+    documents = []
+    for path in paths:
+        with open(path, "rb") as recording:
+            documents.append(recording.read())
+
+    total_bytes = sum(len(document) for document in documents)
+    print()
+    print(f"Parsing {len(documents)} recorded pages ({total_bytes / 1048576:.1f} MB).")
+    print()
+
+    #  Time every installed decoder, and compare them to the standard library.
+    baseline = benchmark(documents, "json")
+    for decoder in jsondecode.available_decoders():
+        elapsed = baseline if decoder == "json" else benchmark(documents, decoder)
+        print(f"{decoder:>8}: {elapsed * 1000:8.1f} ms  {total_bytes / 1048576 / elapsed:8.1f} MB/s  "
+              f"{baseline / elapsed:5.2f}x json")
+
+    print()
+    print(f"Selected decoder: {jsondecode.use_decoder(configuration.get('json', {}).get('decoder', 'auto'))}")
+
+
+#  Execute the Script
+if __name__ == "__main__":
+    main()
+
+"""
+   Copyright 2019 RiskSense, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
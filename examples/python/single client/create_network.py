@@ -9,9 +9,13 @@
 
 import json
 import os
-import requests
+import sys
 import toml
 
+#  Make the shared rs_api package (one directory up) importable.
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+from rs_api import jsondecode, session  # noqa: E402
+
 
 def create_network(platform, key, cli_id, desired_name, desired_type):
 
@@ -40,10 +44,11 @@ def create_network(platform, key, cli_id, desired_name, desired_type):
     #  Assemble the URL for the API call
     url = platform + "/api/v1/client/" + str(cli_id) + "/network/"
 
+    #  Get the shared client used to send the API call.  It provides the API key header.
+    api = session.get_client(platform, key)
+
     #  Define the header for the API call
     header = {
-        "x-api-key": key,
-        "content-type": "application/json",
         "Cache-Control": "no-cache"
     }
 
@@ -55,11 +60,11 @@ def create_network(platform, key, cli_id, desired_name, desired_type):
     }
 
     # Send API request to the platform
-    raw_response = requests.post(url, headers=header, data=json.dumps(body))
+    raw_response = api.post(url, headers=header, data=json.dumps(body), idempotent=False)
 
     # If platform reports Success
     if raw_response and raw_response.status_code == 201:
-        json_response = json.loads(raw_response.text)
+        json_response = jsondecode.response_json(raw_response)
 
     # If request is unsuccessful...
     else:
@@ -105,6 +110,9 @@ def main():
     api_key = configuration['platform']['api_key']
     client_id = configuration['platform']['client_id']
 
+    #  Open the shared, pooled HTTP session used for every API call made by this script.
+    session.open_client(rs_url, api_key, configuration)
+
     #  Define the name for your new network.  UPDATE AS DESIRED
     network_name = "My_Test_Network"
 
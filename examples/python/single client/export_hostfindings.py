@@ -9,11 +9,14 @@
 
 import json
 import datetime
-import time
 import os
-import requests
+import sys
 import toml
 
+#  Make the shared rs_api package (one directory up) importable.
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+from rs_api import export, jsondecode, session  # noqa: E402
+
 
 def initiate_export(platform, key, client, filename):
 
@@ -45,10 +48,11 @@ def initiate_export(platform, key, client, filename):
     #  https://<platform>/api/vi/client/<client ID>/hostFinding/export
     api_url = platform + '/api/v1/client/' + str(client) + '/hostFinding/export'
 
+    #  Get the shared client used to send the API call.  It provides the API key header.
+    api = session.get_client(platform, key)
+
     #  Define the header for the API call
     header = {
-        "x-api-key": key,
-        "content-type": "application/json",
         "Cache-Control": "no-cache"
     }
 
@@ -76,12 +80,12 @@ def initiate_export(platform, key, client, filename):
     }
 
     # Send API request to the platform
-    response = requests.post(api_url, headers=header, data=json.dumps(body))
+    response = api.post(api_url, headers=header, data=json.dumps(body), idempotent=False)
 
     # If successful...
     if response and response.status_code == 200:
         print("Export request submitted successfully.")
-        jsonified_response = json.loads(response.text)
+        jsonified_response = jsondecode.response_json(response)
         export_identifier = jsonified_response['id']
 
     # If not successful...
@@ -94,10 +98,11 @@ def initiate_export(platform, key, client, filename):
     return export_identifier
 
 
-def download_exported_file(platform, key, client, export, filename):
+def download_exported_file(platform, key, client, export_id, filename, chunk_size=export.DEFAULT_CHUNK_SIZE):
 
     """
-    Downloads an export via the RiskSense REST API.
+    Downloads an export via the RiskSense REST API.  The file is streamed to disk in
+    chunks, so that large exports don't need to fit in memory.
 
     :param platform:    URL of the RiskSense platform to be queried.
     :type  platform:    str
@@ -108,47 +113,31 @@ def download_exported_file(platform, key, client, export, filename):
     :param client:      Client ID associated with the export.
     :type  client:      int
 
-    :param export:      Identifier of the export to be downloaded.
-    :type  export:      int
+    :param export_id:   Identifier of the export to be downloaded.
+    :type  export_id:   int
 
     :param filename:    File path and name where download will be stored.
     :type  filename:    str
 
+    :param chunk_size:  Number of bytes to read and write at a time.
+    :type  chunk_size:  int
+
     :return:    Returns a boolean reflecting whether or not the download was successful.
     :rtype:     bool
     """
 
-    success = False
-
-    #  Assemble the URL for the API call
-    url = platform + "/api/v1/client/" + str(client) + "/export/" + str(export)
-
-    #  Define the header for the API call
-    header = {
-        'x-api-key': key,
-        'content-type': 'application/json'
-    }
-
     print("Attempting to download your export file.")
 
-    #  Send API request to the platform
-    response = requests.get(url, headers=header)
+    #  Stream the file to disk, printing our progress every 10%.
+    checksum = export.download_export(platform, key, client, export_id, filename, chunk_size,
+                                      progress=export.progress_printer())
 
-    #  If successful...
-    if response.status_code == 200:
-        print("Writing your file to disk.")
-        open(filename, "wb").write(response.content)
-        print(" - Done.")
-        success = True
+    if checksum is None:
+        return False
 
-    #  If not successful...
-    else:
-        print("There was an error getting your file.")
-        print(f"Response Status Code: {response.status_code}")
-        print(f"Response Text:{response.text}")
-        exit(1)
+    print(f" - Done.  SHA-256: {checksum}")
 
-    return success
+    return True
 
 
 def read_config_file(filename):
@@ -182,6 +171,9 @@ def main():
     api_key = configuration['platform']['api_key']
     client_id = configuration['platform']['client_id']
 
+    #  Open the shared, pooled HTTP session used for every API call made by this script.
+    session.open_client(rs_url, api_key, configuration)
+
     #  Set filename for your export
     export_filename = 'hostfindings_export'  # UPDATE AS DESIRED
 
@@ -193,16 +185,18 @@ def main():
     export_id = initiate_export(rs_url, api_key, client_id, export_filename)
 
     #  Wait for file to be exported.  This could take quite a while depending now how big
-    #  your export is, and how busy the platform is.  You may need to adjustaccordingly.
-    #  Currently set to wait 5 minutes.
-    wait_time = 600  # Seconds
-    counter = 0
-
-    # Display a countdown timer while we wait for the platform to generate the export file.
-    while counter < wait_time:
-        print(f" - Sleeping for {wait_time - counter} seconds to allow the platform some time to generate the file.")
-        time.sleep(1)
-        counter += 1
+    #  your export is, and how busy the platform is.  The status of the export is checked
+    #  with a growing interval, and the file is downloaded as soon as it is ready.  Adjust
+    #  the timeout in the [export] section of the config file if needed.
+    settings = configuration.get('export', {})
+    ready = export.wait_for_export(rs_url, api_key, client_id, export_id,
+                                   poll_interval=settings.get('poll_interval', 2.0),
+                                   max_poll_interval=settings.get('max_poll_interval', 60.0),
+                                   timeout=settings.get('timeout', 3600.0))
+
+    if not ready:
+        print("Your export file was not generated by the platform.")
+        exit(1)
 
     ######################################
     #  Download exported file
@@ -213,11 +207,20 @@ def main():
     exported_path_file = export_filename + '.zip'
 
     # Request download from the platform.
-    downloaded = download_exported_file(rs_url, api_key, client_id, export_id, exported_path_file)
+    downloaded = download_exported_file(rs_url, api_key, client_id, export_id, exported_path_file,
+                                        settings.get('chunk_size', export.DEFAULT_CHUNK_SIZE))
 
     if downloaded:
         print("Success.")
 
+        #  Read the findings straight out of the zip file, one row at a time, without
+        #  extracting it.  Replace the count with your own processing of each row.
+        number_of_rows = 0
+        for _, row in export.iter_export_rows(exported_path_file):
+            number_of_rows += 1
+
+        print(f"{number_of_rows} host findings found in {exported_path_file}.")
+
     else:
         print("There was an error downloading your export file from the platform.")
         exit(1)
@@ -9,55 +9,39 @@
 ******************************************************************************************************************* """
 
 
-import json
 import os
-import requests
+import sys
 import toml
 
+#  Make the shared rs_api package (one directory up) importable.
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+from rs_api import client_list, session  # noqa: E402
 
-def get_clients(platform, key):
+
+def get_clients(platform, key, cache_file=None, cache_max_age=0):
 
     """
     Retrieve all clients that are associated with a user.
 
-    :param platform:    URL for RiskSense platform to be queried.
-    :type  platform:    str
+    :param platform:        URL for RiskSense platform to be queried.
+    :type  platform:        str
+
+    :param key:             API Key.
+    :type  key:             str
+
+    :param cache_file:      Path to a file to cache the list of clients in.  No cache is used if None.
+    :type  cache_file:      str
 
-    :param key:         API Key.
-    :type  key:         str
+    :param cache_max_age:   Number of seconds a cached list of clients can be reused for.
+    :type  cache_max_age:   int
 
     :return:    Returns a list of clients associated with the API Key.
     :rtype:     list
     """
 
-    #  Assemble the URL for the API call
-    url = platform + "/api/v1/client"
-
-    #  Define the header for the API call
-    header = {
-        'x-api-key': key,
-        'content-type': 'application/json'
-    }
-
-    #  Send API request to the platform
-    response = requests.get(url, headers=header)
-
-    #  If request is successful...
-    if response and response.status_code == 200:
-        #  Convert the response to JSON format
-        jsonified_response = json.loads(response.text)
-
-    #  If request is unsuccessful...
-    else:
-        print(f"There was an error getting the clients.")
-        print(f"Response Status Code: {response.status_code}")
-        print(f"Response Text: {response.text}")
-        exit(1)
-
-    #  Pick out all clients from the JSON formatted response
-    found_clients = jsonified_response['_embedded']['clients']
-
-    return found_clients
+    #  Retrieve every page of clients, not just the first one.  A cached list of clients
+    #  is reused if it is no older than cache_max_age seconds.
+    return client_list.get_clients(platform, key, cache_file, cache_max_age)
 
 
 def read_config_file(filename):
@@ -93,8 +77,16 @@ def main():
     rs_url = configuration['platform']['url']
     api_key = configuration['platform']['api_key']
 
+    #  Open the shared, pooled HTTP session used for every API call made by this script.
+    session.open_client(rs_url, api_key, configuration)
+
+    #  The list of clients is cached next to the config file, so it can be reused by later runs.
+    client_cache = configuration.get('clients', {})
+    cache_file = os.path.join(os.path.dirname(conf_file), client_cache.get('cache_file', 'client_cache.json'))
+    cache_max_age = client_cache.get('cache_max_age', 0)
+
     #  Send request for client IDs.  A list of the clients is returned.
-    clients = get_clients(rs_url, api_key)
+    clients = get_clients(rs_url, api_key, cache_file, cache_max_age)
 
     number_of_clients = len(clients)
 
@@ -7,11 +7,14 @@
 |
 ******************************************************************************************************************* """
 
-import json
 import os
-import requests
+import sys
 import toml
 
+#  Make the shared rs_api package (one directory up) importable.
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+from rs_api import search, session, sinks  # noqa: E402
+
 
 def read_config_file(filename):
 
@@ -34,11 +37,12 @@ def read_config_file(filename):
     return data
 
 
-def get_groups(platform, key, client_id):
+def iter_groups(platform, key, client_id, max_workers=1, checkpoint=None):
 
     """
-    Retrieve a list of all of the groups associated with the
-    specified client ID.
+    Yields each of the groups associated with the specified client ID.
+    Results are yielded one page at a time, so they can be processed without holding
+    all of them in memory.
 
     :param platform:    URL of the RiskSense platform to be queried.
     :type  platform:    str
@@ -49,24 +53,15 @@ def get_groups(platform, key, client_id):
     :param client_id:   ID of the client to be queried.
     :type  client_id:   int
 
-    :return:    A list of all groups returned by the API.
-    :rtype:     list
-    """
-
-    #  Assemble the URL for the API call
-    url = platform + "/api/v1/client/" + str(client_id) + "/group/search"
+    :param max_workers: Maximum number of pages of results to request concurrently.
+    :type  max_workers: int
 
-    #  Set the page size for returned results
-    page_size = 100
+    :param checkpoint:  Saves progress after each page, so an interrupted search can be resumed.
+    :type  checkpoint:  checkpoint.Checkpoint
 
-    #  Set the initial page of results to retrieve
-    page = 0
-
-    #  Define the header for the API call
-    header = {
-        "x-api-key": key,
-        "content-type": "application/json"
-    }
+    :return:    A generator of the groups found.
+    :rtype:     generator
+    """
 
     #  Define the filters to be used in your query.  In this case we are filtering
     #  for groups with a name like "test".  UPDATE AS DESIRED.  You can find what
@@ -83,62 +78,35 @@ def get_groups(platform, key, client_id):
         #  just as you can in the UI.
     ]
 
-    # Define the body for your API call.
-    body = {
-        "filters": filters,  # Using the filter(s) defined above.
-        "projection": "basic",
-        "sort": [
-            {
-                "field": "id",
-                "direction": "ASC"
-            }
-        ],
-        "page": page,
-        "size": page_size
-    }
-
-    #  Send your request to the API, and get the number of pages of results
-    #  that are available.
-    response = requests.post(url, headers=header, data=json.dumps(body))
-
-    #  If success is reported back
-    if response and response.status_code == 200:
-        jsonified_result = json.loads(response.text)
+    #  Send the search to the API, requesting the pages of results as they are needed.
+    return search.iter_search(platform, key, client_id, "group", filters, projection="basic",
+                              max_workers=max_workers, checkpoint=checkpoint)
 
-    else:
-        print("There was an error retrieving the hosts from the API.")
-        print(f"Status Code Returned: {response.status_code}")
-        print(f"Response: {response.text}")
-        exit(1)
 
-    number_of_pages = jsonified_result['page']['totalPages']
+def get_groups(platform, key, client_id, max_workers=1):
 
-    returned_groups = []
-
-    #  Cycle thorough all of the pages of group results and add them to a list to be returned.
-    while page < number_of_pages:
+    """
+    Retrieve a list of all of the groups associated with the
+    specified client ID.
 
-        print(f"Getting page {page + 1}/{number_of_pages} of groups for client id {client_id}...")
-        response = requests.post(url, headers=header, data=json.dumps(body))
+    :param platform:    URL of the RiskSense platform to be queried.
+    :type  platform:    str
 
-        if response and response.status_code == 200:
-            jsonified_result = json.loads(response.text)
+    :param key:         API Key.
+    :type  key:         str
 
-        else:
-            print(f"There was an error retrieving page {page} of the found groups.")
-            print(f"Status Code: {response.status_code}")
-            print(f"Response: {response.text}")
-            exit(1)
+    :param client_id:   ID of the client to be queried.
+    :type  client_id:   int
 
-        #  Append the groups found to our list to be returned.
-        for group in jsonified_result['_embedded']['groups']:
-            returned_groups.append(group)
+    :param max_workers: Maximum number of pages of results to request concurrently.
+    :type  max_workers: int
 
-        # Increment the page number to retrieve in the next run.
-        page += 1
-        body['page'] = page
+    :return:    A list of all groups returned by the API.
+    :rtype:     list
+    """
 
-    return returned_groups
+    #  Collect every one of the groups yielded by iter_groups() into a single list.
+    return list(iter_groups(platform, key, client_id, max_workers=max_workers))
 
 
 def main():
@@ -153,9 +121,23 @@ def main():
     rs_url = configuration['platform']['url']
     api_key = configuration['platform']['api_key']
     client_id = configuration['platform']['client_id']
+    max_workers = configuration.get('search', {}).get('max_workers', 1)
+
+    #  Open the shared, pooled HTTP session used for every API call made by this script.
+    session.open_client(rs_url, api_key, configuration)
+
+    #  If an output format is set in the [output] section of the config file, stream the
+    #  groups to it as the pages arrive, rather than collecting them into a list first.
+    output = sinks.open_sink(configuration, "group", base_dir=os.path.dirname(conf_file))
+    if output:
+        with output:
+            output.write_all(iter_groups(rs_url, api_key, client_id, max_workers=max_workers))
+
+        print(f"{output.count} groups written to {output.path}.")
+        return
 
     #  Call function to get groups via the API
-    groups = get_groups(rs_url, api_key, client_id)
+    groups = get_groups(rs_url, api_key, client_id, max_workers=max_workers)
 
     #  Print information for all groups returned to the console
     for group in groups:
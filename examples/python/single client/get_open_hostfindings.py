@@ -8,16 +8,22 @@
 |
 ******************************************************************************************************************* """
 
-import json
 import os
-import requests
+import sys
 import toml
 
+#  Make the shared rs_api package (one directory up) importable.
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+from rs_api import checkpoint, pagesize, search, session, sinks  # noqa: E402
 
-def get_all_open_hostfindings(platform, key, client_id):
+
+def iter_open_hostfindings(platform, key, client_id, max_workers=1, checkpoint=None, keyset=False, tuner=None,
+                           fields=None):
 
     """
-    Retrieve all open hostfindings that are associated with the specified client ID.
+    Yields each of the open hostfindings that are associated with the specified client ID.
+    Results are yielded one page at a time, so they can be processed without holding
+    all of them in memory.
 
     :param platform:    URL for RiskSense Platform to be queried.
     :type  platform:    str
@@ -28,24 +34,26 @@ def get_all_open_hostfindings(platform, key, client_id):
     :param client_id:   Client ID to be queried
     :type  client_id:   int
 
-    :return:    Returns a list of the hostfindings found.
-    :rtype:     list
-    """
+    :param max_workers: Maximum number of pages of results to request concurrently.
+    :type  max_workers: int
+
+    :param checkpoint:  Saves progress after each page, so an interrupted search can be resumed.
+    :type  checkpoint:  checkpoint.Checkpoint
 
-    #  Assemble the URL for the API call
-    url = platform + "/api/v1/client/" + str(client_id) + "/hostFinding/search"
+    :param keyset:      Page through the results by ID (keyset pagination) rather than by page
+                        number.  Faster for very large searches.
+    :type  keyset:      bool
 
-    #  Set the page size for the returned results.  This is the number of results in a single page.
-    page_size = 100
+    :param tuner:       Picks the page size, instead of the default of 100.
+    :type  tuner:       pagesize.PageSizeTuner
 
-    #  Set the initial page to retrieve.
-    page = 0
+    :param fields:      Dotted paths of the only fields to keep from each hostfinding (ex.
+                        ["severity", "host.hostId"]).  Every field is kept if None.
+    :type  fields:      list
 
-    #  Define the header for the API call.
-    header = {
-        "x-api-key": key,
-        "content-type": "application/json"
-    }
+    :return:    A generator of the hostfindings found.
+    :rtype:     generator
+    """
 
     #  Define the filters for the API call.  In this case, we are filtering for all
     #  hostfindings that are open.
@@ -59,74 +67,36 @@ def get_all_open_hostfindings(platform, key, client_id):
         #  You can stack multiple filters here to further narrow your results , just as in the UI.
     ]
 
-    #  Define the body for the API call.
-    body = {
-        "filters": filters,
-        "projection": "basic",  # Can also be set to "detail"
-        "sort": [
-            {
-                "field": "id",
-                "direction": "ASC"
-            }
-        ],
-        "page": page,
-        "size": page_size
-    }
-
-    #  Send API request to the platform
-    response = requests.post(url, headers=header, data=json.dumps(body))
-
-    #  If request is successful...
-    if response and response.status_code == 200:
-
-        # Convert response to JSON format
-        jsonified_result = json.loads(response.text)
-
-        # Get the number of available pages of results from the response.
-        number_of_pages = jsonified_result['page']['totalPages']
-
-    #  If request is unsuccessful...
-    else:
-        print("There was an error retrieving the hostfindings from the API")
-        print(f"Status Code: {response.status_code}")
-        print(f"Response: {response.text}")
-        exit(1)
+    #  Send the search to the API, requesting the pages of results as they are needed.  The projection
+    #  can also be set to "detail".
+    return search.iter_search(platform, key, client_id, "hostFinding", filters, projection="basic",
+                              max_workers=max_workers, checkpoint=checkpoint, keyset=keyset, tuner=tuner,
+                              fields=fields)
 
-    all_hostfindings = []
 
-    ####################################################
-    #
-    #  Cycle thorough all of the pages of hostfindings
-    #  and add them to a list to be returned.
-    #
-    ####################################################
-    while page < number_of_pages:
+def get_all_open_hostfindings(platform, key, client_id, max_workers=1):
 
-        print(f"Getting page {page + 1}/{number_of_pages} pages of hostFindings for client id {client_id}...")
+    """
+    Retrieve all open hostfindings that are associated with the specified client ID.
 
-        #  Send API request to the platform for this page of hostfindings
-        response = requests.post(url, headers=header, data=json.dumps(body))
+    :param platform:    URL for RiskSense Platform to be queried.
+    :type  platform:    str
 
-        #  If request is successful...
-        if response.status_code == 200:
-            jsonified_result = json.loads(response.text)
+    :param key:         API Key
+    :type  key:         str
 
-        #  If request is unsuccessful...
-        else:
-            print(f"There was an issue retrieving page {page} of hostfindings.")
-            print(f"Status Code: {response.status_code}")
-            print(f"Response: {response.text}")
-            exit(1)
+    :param client_id:   Client ID to be queried
+    :type  client_id:   int
 
-        #  Cycle through findings in this set of results and append to the list to be returned.
-        for finding in jsonified_result['_embedded']['hostFindings']:
-            all_hostfindings.append(finding)
+    :param max_workers: Maximum number of pages of results to request concurrently.
+    :type  max_workers: int
 
-        #  Increment the page number for the next run.
-        page += 1
-        body['page'] = page
+    :return:    Returns a list of the hostfindings found.
+    :rtype:     list
+    """
 
-    return all_hostfindings
+    #  Collect every one of the hostfindings yielded by iter_open_hostfindings() into a single list.
+    return list(iter_open_hostfindings(platform, key, client_id, max_workers=max_workers))
 
 
 def read_config_file(filename):
@@ -162,12 +132,55 @@ def main():
     rs_url = configuration['platform']['url']
     api_key = configuration['platform']['api_key']
     client_id = configuration['platform']['client_id']
-
-    #  Get all open hostfindings associated with the client ID
-    hostfindings = get_all_open_hostfindings(rs_url, api_key, client_id)
+    max_workers = configuration.get('search', {}).get('max_workers', 1)
+    keyset = configuration.get('search', {}).get('keyset', False)
+    fields = configuration.get('search', {}).get('fields', {}).get('hostFinding')
+
+    #  Open the shared, pooled HTTP session used for every API call made by this script.
+    session.open_client(rs_url, api_key, configuration)
+
+    #  If a checkpoint file is configured, progress is saved after every page, and a run that
+    #  was interrupted picks up where it left off.
+    checkpoint_file = configuration.get('search', {}).get('checkpoint_file')
+    progress = None
+    if checkpoint_file:
+        progress = checkpoint.Checkpoint(os.path.join(os.path.dirname(conf_file), checkpoint_file))
+
+    #  If adaptive page sizes are enabled, the page size is tuned as the search runs, and the
+    #  best size found is remembered for the next run.
+    tuner = pagesize.PageSizeTuner.from_config(configuration, "hostFinding", "basic", os.path.dirname(conf_file))
+
+    hostfindings = iter_open_hostfindings(rs_url, api_key, client_id, max_workers=max_workers, checkpoint=progress,
+                                          keyset=keyset, tuner=tuner, fields=fields)
+
+    #  If an output format is set in the [output] section of the config file, stream the
+    #  hostfindings to it as the pages arrive, rather than collecting them into a list first.
+    #  A resumed search carries on the output file from the last saved page.
+    output = sinks.open_sink(configuration, "hostFinding", resume=progress.records if progress else 0,
+                             base_dir=os.path.dirname(conf_file))
+    if output:
+        #  Make sure the output file holds every result counted by each saved checkpoint.
+        if progress:
+            progress.before_save = output.sync
+
+        with output:
+            output.write_all(hostfindings)
+
+        print(f"{output.count} open hostFindings written to {output.path}.")
+        return
+
+    #  Count all open hostfindings associated with the client ID as they are retrieved,
+    #  rather than holding all of them in memory.
+    number_of_hostfindings = 0
+    for _ in hostfindings:
+        number_of_hostfindings += 1
+
+    #  Include the hostfindings counted by an earlier, interrupted run.
+    if progress:
+        number_of_hostfindings = progress.records
 
     #  Print the number of hostfindings found to the console.
-    print(f"{len(hostfindings)} open hostFindings found.")
+    print(f"{number_of_hostfindings} open hostFindings found.")
     print()
 
 
@@ -7,10 +7,13 @@
 |
 ******************************************************************************************************************* """
 
-import json
 import os
+import sys
 import toml
-import requests
+
+#  Make the shared rs_api package (one directory up) importable.
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+from rs_api import jsondecode, session  # noqa: E402
 
 
 def read_config_file(filename):
@@ -54,15 +57,13 @@ def get_hostfinding_filters(platform, key, cli_id):
 
     url = platform + '/api/v1/client/' + str(cli_id) + '/search/hostFinding/filter'
 
-    header = {
-        "x-api-key": key,
-        "content-type": "application/json"
-    }
+    #  Get the shared client used to send the API call.  It provides the API key header.
+    api = session.get_client(platform, key)
 
-    response = requests.get(url, headers=header)
+    response = api.get(url)
 
     if response and response.status_code == 200:
-        jsonified_response = json.loads(response.text)
+        jsonified_response = jsondecode.response_json(response)
 
     else:
         print("There was a problem retrieving your saved hostFinding filters from the API.")
@@ -86,6 +87,9 @@ def main():
     api_key = configuration['platform']['api_key']
     client_id = configuration['platform']['client_id']
 
+    #  Open the shared, pooled HTTP session used for every API call made by this script.
+    session.open_client(rs_url, api_key, configuration)
+
     response = get_hostfinding_filters(rs_url, api_key, client_id)
 
     for single_filter in response:
@@ -7,11 +7,14 @@
 |
 ******************************************************************************************************************* """
 
-import json
 import os
-import requests
+import sys
 import toml
 
+#  Make the shared rs_api package (one directory up) importable.
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+from rs_api import jsondecode, session  # noqa: E402
+
 
 def get_client_info(platform, key, client_id):
 
@@ -34,18 +37,15 @@ def get_client_info(platform, key, client_id):
     #  Assemble the URL for the API request
     url = platform + "/api/v1/client/" + str(client_id)
 
-    #  Define the header for the API request
-    header = {
-        'x-api-key': key,
-        'content-type': 'application/json'
-    }
+    #  Get the shared client used to send the API call.  It provides the API key header.
+    api = session.get_client(platform, key)
 
     #  Send the request to the API
-    response = requests.get(url, headers=header)
+    response = api.get(url)
 
     #  If the request was successful...
     if response and response.status_code == 200:
-        found_info = json.loads(response.text)
+        found_info = jsondecode.response_json(response)
 
     #  If the request was unsuccessful...
     else:
@@ -91,6 +91,9 @@ def main():
     api_key = configuration['platform']['api_key']
     id_to_query = configuration['platform']['client_id']
 
+    #  Open the shared, pooled HTTP session used for every API call made by this script.
+    session.open_client(rs_url, api_key, configuration)
+
     #  Send the request for the client info to the API
     id_info = get_client_info(rs_url, api_key, id_to_query)
 
@@ -8,16 +8,21 @@
 |
 ******************************************************************************************************************* """
 
-import json
 import os
-import requests
+import sys
 import toml
 
+#  Make the shared rs_api package (one directory up) importable.
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+from rs_api import search, session, sinks  # noqa: E402
 
-def get_users(platform, key, client_id):
+
+def iter_users(platform, key, client_id, max_workers=1, checkpoint=None):
 
     """
-    Gets and returns a list of all users with a 'Manager' role for the specified client ID.
+    Yields each of the users with a 'Manager' role for the specified client ID.
+    Results are yielded one page at a time, so they can be processed without holding
+    all of them in memory.
 
     :param platform:    URL for the RiskSense platform to be queried.
     :type  platform:    str
@@ -28,24 +33,15 @@ def get_users(platform, key, client_id):
     :param client_id:   Client ID to be queried.
     :type  client_id:   int
 
-    :return:    Returns a list of all users with a 'Manager' role for the specified client ID.
-    :rtype:     list
-    """
-
-    #  Assemble the URL for the API request
-    url = platform + "/api/v1/client/" + str(client_id) + "/user/search"
-
-    #  Define the page size for returned results.  This is the number of results in a single page.
-    page_size = 100
+    :param max_workers: Maximum number of pages of results to request concurrently.
+    :type  max_workers: int
 
-    #  Define the page number to begin with when sending the API request.
-    page = 0
+    :param checkpoint:  Saves progress after each page, so an interrupted search can be resumed.
+    :type  checkpoint:  checkpoint.Checkpoint
 
-    #  Define the header for your API request
-    header = {
-        "x-api-key": key,
-        "content-type": "application/json"
-    }
+    :return:    A generator of the users found.
+    :rtype:     generator
+    """
 
     #  Define the filters to be used in the API request.  In this case we are filtering for
     #  all users with a "Manager" role.
@@ -59,65 +55,34 @@ def get_users(platform, key, client_id):
         #  You can stack multiple filters here to further narrow your results, just as in the UI
     ]
 
-    #  Define the body for the API request.
-    body = {
-        "filters": filters,
-        "projection": "basic",
-        "sort": [
-            {
-                "field": "id",
-                "direction": "ASC"
-            }
-        ],
-        "page": page,
-        "size": page_size
-    }
-
-    #  Send the request to the API
-    response = requests.post(url, headers=header, data=json.dumps(body))
-
-    #  If the request is successful...
-    if response and response.status_code == 200:
-        jsonified_result = json.loads(response.text)
-        number_of_pages = jsonified_result['page']['totalPages']
+    #  Send the search to the API, requesting the pages of results as they are needed.
+    return search.iter_search(platform, key, client_id, "user", filters, projection="basic",
+                              max_workers=max_workers, checkpoint=checkpoint)
 
-    #  If the request is unsuccessful...
-    else:
-        print("There was an error retrieving the users from the API.")
-        print(f"Status Code: {response.status_code}")
-        print(f"Response: {response.text}")
-        exit(1)
 
-    found_users = []
+def get_users(platform, key, client_id, max_workers=1):
 
-    #  Cycle thorough all of the pages of users and add them to a list to be returned.
-    while page < number_of_pages:
-
-        print(f"Getting page {page + 1}/{number_of_pages} of users for client id {client_id}...")
+    """
+    Gets and returns a list of all users with a 'Manager' role for the specified client ID.
 
-        # Send the request to the API
-        response = requests.post(url, headers=header, data=json.dumps(body))
+    :param platform:    URL for the RiskSense platform to be queried.
+    :type  platform:    str
 
-        #  If the request is successful...
-        if response and response.status_code == 200:
-            # Convert the response text to JSON format.
-            jsonified_result = json.loads(response.text)
+    :param key:         API Key
+    :type  key:         str
 
-        #  If the request is unsuccessful...
-        else:
-            print(f"There was an error retrieving page {page} of users from the API.")
-            print(f"Status Code: {response.status_code}")
-            print(f"Response: {response.text}")
-            exit(1)
+    :param client_id:   Client ID to be queried.
+    :type  client_id:   int
 
-        for finding in jsonified_result['_embedded']['users']:
-            found_users.append(finding)
+    :param max_workers: Maximum number of pages of results to request concurrently.
+    :type  max_workers: int
 
-        #  Increment the page number for the next run
-        page += 1
-        body['page'] = page
+    :return:    Returns a list of all users with a 'Manager' role for the specified client ID.
+    :rtype:     list
+    """
 
-    return found_users
+    #  Collect every one of the users yielded by iter_users() into a single list.
+    return list(iter_users(platform, key, client_id, max_workers=max_workers))
 
 
 def read_config_file(filename):
@@ -153,9 +118,23 @@ def main():
     rs_url = configuration['platform']['url']
     api_key = configuration['platform']['api_key']
     client_id = configuration['platform']['client_id']
+    max_workers = configuration.get('search', {}).get('max_workers', 1)
+
+    #  Open the shared, pooled HTTP session used for every API call made by this script.
+    session.open_client(rs_url, api_key, configuration)
+
+    #  If an output format is set in the [output] section of the config file, stream the
+    #  users to it as the pages arrive, rather than collecting them into a list first.
+    output = sinks.open_sink(configuration, "user", base_dir=os.path.dirname(conf_file))
+    if output:
+        with output:
+            output.write_all(iter_users(rs_url, api_key, client_id, max_workers=max_workers))
+
+        print(f"{output.count} users written to {output.path}.")
+        return
 
     # Get users.  The 'users' variable is a list of all users found for that client
-    users = get_users(rs_url, api_key, client_id)
+    users = get_users(rs_url, api_key, client_id, max_workers=max_workers)
 
     #  Print the number of users with a "Manager" role to the console.
     print(f"{len(users)} users (Managers) found. ")
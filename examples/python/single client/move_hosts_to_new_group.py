@@ -9,9 +9,13 @@
 
 import json
 import os
-import requests
+import sys
 import toml
 
+#  Make the shared rs_api package (one directory up) importable.
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+from rs_api import session  # noqa: E402
+
 
 def move_hosts_to_new_group(platform, key, client, group):
 
@@ -39,11 +43,8 @@ def move_hosts_to_new_group(platform, key, client, group):
     #  Assemble the URL for the API call
     url = platform + "/api/v1/client/" + str(client) + "/host/group/move"
 
-    #  Define the header for the API call
-    header = {
-        "x-api-key": key,
-        "content-type": "application/json"
-    }
+    #  Get the shared client used to send the API call.  It provides the API key header.
+    api = session.get_client(platform, key)
 
     #  Define the filters to be used in your query.  In this case we are filtering
     #  for hosts with a hostname of my.hostname.com.  Update to reflect your
@@ -69,7 +70,7 @@ def move_hosts_to_new_group(platform, key, client, group):
     }
 
     #  Send your request to the API.
-    response = requests.post(url, headers=header, data=json.dumps(body))
+    response = api.post(url, data=json.dumps(body))
 
     #  If request is reported as successful...
     if response and response.status_code == 200:
@@ -117,6 +118,9 @@ def main():
     api_key = configuration['platform']['api_key']
     client_id = configuration['platform']['client_id']
 
+    #  Open the shared, pooled HTTP session used for every API call made by this script.
+    session.open_client(rs_url, api_key, configuration)
+
     #  Specify ID for group that you would like to move your hosts to.
     group_id = 0  # UPDATE THIS WITH YOUR DESIRED GROUP ID
 
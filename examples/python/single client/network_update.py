@@ -9,9 +9,13 @@
 
 import json
 import os
-import requests
+import sys
 import toml
 
+#  Make the shared rs_api package (one directory up) importable.
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+from rs_api import jsondecode, session  # noqa: E402
+
 
 def update_network(platform, key, client, net_id, new_name):
 
@@ -40,10 +44,11 @@ def update_network(platform, key, client, net_id, new_name):
     #  Assemble the URL for the API request.
     url = platform + "/api/v1/client/" + str(client) + "/network/" + str(net_id)
 
+    #  Get the shared client used to send the API call.  It provides the API key header.
+    api = session.get_client(platform, key)
+
     #  Define the header for the API request.
     header = {
-        "x-api-key": key,
-        "content-type": "application/json",
         "Cache-Control": "no-cache"
     }
 
@@ -53,11 +58,11 @@ def update_network(platform, key, client, net_id, new_name):
     }
 
     #  Submit the update request to the API
-    response = requests.put(url, headers=header, data=json.dumps(body))
+    response = api.put(url, headers=header, data=json.dumps(body))
 
     #  If the request is successful...
     if response and response.status_code == 200:
-        network_response = json.loads(response.text)
+        network_response = jsondecode.response_json(response)
 
     #  If the request is unsuccessful...
     else:
@@ -103,6 +108,9 @@ def main():
     api_key = configuration['platform']['api_key']
     client_id = configuration['platform']['client_id']
 
+    #  Open the shared, pooled HTTP session used for every API call made by this script.
+    session.open_client(rs_url, api_key, configuration)
+
     #  Update to define the network ID to be updated.
     network_id = 0  # UPDATE AS DESIRED
 
@@ -7,16 +7,21 @@
 |
 ******************************************************************************************************************* """
 
-import json
 import os
+import sys
 import toml
-import requests
 
+#  Make the shared rs_api package (one directory up) importable.
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+from rs_api import search, session, sinks  # noqa: E402
 
-def get_networks(platform, key, client_id):
+
+def iter_networks(platform, key, client_id, max_workers=1, checkpoint=None):
 
     """
-    Gets all networks with a type of 'hostname' for the specified client ID.
+    Yields each of the networks with a type of 'hostname' for the specified client ID.
+    Results are yielded one page at a time, so they can be processed without holding
+    all of them in memory.
 
     :param platform:    URL of RiskSense platform to be queried.
     :type  platform:    str
@@ -27,25 +32,15 @@ def get_networks(platform, key, client_id):
     :param client_id:   Client ID to be queried.
     :type  client_id:   int
 
-    :return:    Returns a list of dictionaries containing all of the found networks.
-    :rtype:     dict
-    """
-
-    #  Assemble the URL for the API request.
-    url = platform + "/api/v1/client/" + str(client_id) + "/network/search"
-
-    #  Define the page size for your request.  This is the number of results that can
-    #  be returned in a single page.
-    page_size = 100
+    :param max_workers: Maximum number of pages of results to request concurrently.
+    :type  max_workers: int
 
-    #  Define the starting page for your requests.
-    page = 0
+    :param checkpoint:  Saves progress after each page, so an interrupted search can be resumed.
+    :type  checkpoint:  checkpoint.Checkpoint
 
-    #  Define the header for your request.
-    header = {
-        "x-api-key": key,
-        "content-type": "application/json"
-    }
+    :return:    A generator of the networks found.
+    :rtype:     generator
+    """
 
     #  Define the filter(s) for your request.  In this case, we are filtering for
     #  any network that is of the type "hostname".
@@ -59,65 +54,35 @@ def get_networks(platform, key, client_id):
         #  You can stack multiple filters here to further narrow the results, just as in the UI
     ]
 
-    #  Define the body for your request.
-    body = {
-        "filters": filters,
-        "projection": "basic",  # There is no "detail" projection for networks
-        "sort": [
-            {
-                "field": "id",
-                "direction": "ASC"
-            }
-        ],
-        "page": page,
-        "size": page_size
-    }
-
-    #  Submit your request to the API.
-    response = requests.post(url, headers=header, data=json.dumps(body))
-
-    #  If the request is successful...
-    if response and response.status_code == 200:
-        jsonified_result = json.loads(response.text)
+    #  Send the search to the API, requesting the pages of results as they are needed.
+    #  There is no "detail" projection for networks.
+    return search.iter_search(platform, key, client_id, "network", filters, projection="basic",
+                              max_workers=max_workers, checkpoint=checkpoint)
 
-    #  If the request is unsuccessful...
-    else:
-        print("There was an error retrieving the networks from the API.")
-        print(f"Status Code: {response.status_code}")
-        print(f"Response: {response.text}")
-        exit(1)
 
-    number_of_pages = jsonified_result['page']['totalPages']
-    found_networks = []
+def get_networks(platform, key, client_id, max_workers=1):
 
-    # Cycle through all of the pages of results, and add them to a single list (found_networks)
-    while page < number_of_pages:
-
-        print(f"Getting page {page + 1}/{number_of_pages} of networks for client id {client_id}...")
+    """
+    Gets all networks with a type of 'hostname' for the specified client ID.
 
-        #  Submit your request to the API.
-        response = requests.post(url, headers=header, data=json.dumps(body))
+    :param platform:    URL of RiskSense platform to be queried.
+    :type  platform:    str
 
-        #  If the request is successful...
-        if response.status_code == 200:
-            jsonified_result = json.loads(response.text)
+    :param key:         API Key
+    :type  key:         str
 
-        #  If the request is unsuccessful...
-        else:
-            print(f"There was an error retrieving page {page} of the networks from the API.")
-            print(f"Status Code: {response.status_code}")
-            print(f"Response: {response.text}")
-            exit(1)
+    :param client_id:   Client ID to be queried.
+    :type  client_id:   int
 
-        #  Cycle through all of the findings returned, and append them to the found_networks list
-        for finding in jsonified_result['_embedded']['networks']:
-            found_networks.append(finding)
+    :param max_workers: Maximum number of pages of results to request concurrently.
+    :type  max_workers: int
 
-        #  Increment the page number for the next run.
-        page += 1
-        body['page'] = page
+    :return:    Returns a list of dictionaries containing all of the found networks.
+    :rtype:     dict
+    """
 
-    return found_networks
+    #  Collect every one of the networks yielded by iter_networks() into a single list.
+    return list(iter_networks(platform, key, client_id, max_workers=max_workers))
 
 
 def read_config_file(filename):
@@ -153,9 +118,23 @@ def main():
     rs_url = configuration['platform']['url']
     api_key = configuration['platform']['api_key']
     client_id = configuration['platform']['client_id']
+    max_workers = configuration.get('search', {}).get('max_workers', 1)
+
+    #  Open the shared, pooled HTTP session used for every API call made by this script.
+    session.open_client(rs_url, api_key, configuration)
+
+    #  If an output format is set in the [output] section of the config file, stream the
+    #  networks to it as the pages arrive, rather than collecting them into a list first.
+    output = sinks.open_sink(configuration, "network", base_dir=os.path.dirname(conf_file))
+    if output:
+        with output:
+            output.write_all(iter_networks(rs_url, api_key, client_id, max_workers=max_workers))
+
+        print(f"{output.count} networks written to {output.path}.")
+        return
 
     # Get a list of networks for the specified client.
-    networks = get_networks(rs_url, api_key, client_id)
+    networks = get_networks(rs_url, api_key, client_id, max_workers=max_workers)
 
     #  Print the number of networks found to the console.
     print(f"{len(networks)} hostname networks found.")
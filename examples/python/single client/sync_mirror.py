@@ -0,0 +1,103 @@
+""" *******************************************************************************************************************
+|
+|  Name        :  sync_mirror.py
+|  Description :  Copies the hosts, host findings, groups, tags, networks and users associated with a client into a
+                  local SQLite database via the RiskSense REST API.  Reports can then query the indexed local copy
+                  as often as they like, without sending any requests to the API.
+|  Copyright   :  (c) RiskSense, Inc.
+|  License     :  Apache-2.0 (https://www.apache.org/licenses/LICENSE-2.0.txt)
+|
+******************************************************************************************************************* """
+
+import os
+import sys
+import toml
+
+#  Make the shared rs_api package (one directory up) importable.
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+from rs_api import mirror, session  # noqa: E402
+
+
+def read_config_file(filename):
+
+    """
+    Reads TOML-formatted configuration file.
+
+    :param filename:    Path to file to be read.
+    :type  filename:    str
+
+    :return:    Variables found in config file.
+    :rtype:     dict
+    """
+
+    #  Read the config file
+    toml_data = open(filename).read()
+
+    #  Load the definitions contained in the config file
+    data = toml.loads(toml_data)
+
+    return data
+
+
+def main():
+
+    """ Main body of script """
+
+    #  Define the path to the config file, and read it.
+    conf_file = os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), 'conf', 'config.toml')
+    configuration = read_config_file(conf_file)
+
+    # Set our variables based on what is read from the config file.
+    rs_url = configuration['platform']['url']
+    api_key = configuration['platform']['api_key']
+    client_id = configuration['platform']['client_id']
+    settings = configuration.get('mirror', {})
+    database = os.path.join(os.path.dirname(conf_file), settings.get('database', 'risksense_mirror.db'))
+    resources = settings.get('resources', list(mirror.RESOURCES))
+    projection = settings.get('projection', 'basic')
+    incremental = settings.get('incremental', [])
+
+    #  Open the shared, pooled HTTP session used for every API call made by this script.
+    session.open_client(rs_url, api_key, configuration)
+
+    #  Open the mirror, creating its tables and indexes the first time.
+    connection = mirror.connect(database)
+
+    for resource in resources:
+
+        #  Resources synced incrementally only request what has changed since the last run.
+        if resource in incremental:
+            number_of_results = mirror.sync_updated(connection, rs_url, api_key, client_id, resource, projection)
+
+            print(f"{number_of_results} updated {resource}s for client id {client_id} copied to {database}.")
+
+        #  Otherwise, replace the mirror's copy of the resource with what is on the platform now.
+        else:
+            number_of_results = mirror.sync_resource(connection, rs_url, api_key, client_id, resource, projection)
+
+            print(f"{number_of_results} {resource}s for client id {client_id} copied to {database}.")
+
+        print()
+
+    connection.close()
+
+
+# Execute the script
+if __name__ == '__main__':
+    main()
+
+"""
+   Copyright 2019 RiskSense, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
@@ -0,0 +1,257 @@
+""" *******************************************************************************************************************
+|
+|  Name        : test_export.py
+|  Description : Tests for resumable export downloads (rs_api/export.py), run against a local stub of the export
+                 download endpoint that can cut the connection part way through the file and can ignore Range
+                 requests, and for reading the rows of a downloaded export.
+|  Copyright   : (c) RiskSense, Inc.
+|  License     : Apache-2.0 (https://www.apache.org/licenses/LICENSE-2.0.txt)
+|
+******************************************************************************************************************* """
+
+import hashlib
+import os
+import re
+import socket
+import sys
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+#  Make the shared rs_api package (one directory up) importable.
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+from rs_api import export, session  # noqa: E402
+
+API_KEY = "test-key"
+CLIENT_ID = 123
+EXPORT_ID = 456
+
+#  Contents of the exported file served by the stub.
+EXPORT_DATA = os.urandom(3 * 1024 * 1024)
+
+
+class ExportStub(BaseHTTPRequestHandler):
+
+    """
+    Stand-in for /api/v1/client/{clientId}/export/{exportId}.  Records the Range header of
+    every request received (None if there wasn't one).  The next cuts responses are cut
+    off after cut_after bytes of the file have been sent.  If ranges is False, Range
+    headers are ignored and the whole file is always sent.
+    """
+
+    cuts = 0
+    cut_after = 1024 * 1024
+    ranges = True
+    range_headers = []
+
+    def do_GET(self):
+
+        range_header = self.headers.get('Range')
+        self.range_headers.append(range_header)
+
+        start = 0
+        if range_header and self.ranges:
+            start = int(re.match(r"bytes=(\d+)-", range_header).group(1))
+
+            if start >= len(EXPORT_DATA):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(EXPORT_DATA)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+        body = EXPORT_DATA[start:]
+
+        self.send_response(206 if start else 200)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Length", str(len(body)))
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{len(EXPORT_DATA) - 1}/{len(EXPORT_DATA)}")
+        self.end_headers()
+
+        if not ExportStub.cuts:
+            self.wfile.write(body)
+            return
+
+        #  Drop the connection part way through the file.
+        ExportStub.cuts -= 1
+        self.wfile.write(body[:self.cut_after])
+        self.wfile.flush()
+        self.close_connection = True
+        self.connection.shutdown(socket.SHUT_RDWR)
+
+    def log_message(self, *args):
+
+        pass
+
+
+@pytest.fixture
+def platform():
+
+    """ Starts the stub, and yields its URL. """
+
+    ExportStub.cuts = 0
+    ExportStub.cut_after = 1024 * 1024
+    ExportStub.ranges = True
+    ExportStub.range_headers = []
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ExportStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    session.open_client(url, API_KEY, {"retry": {"max_attempts": 3, "backoff_base": 0.01, "backoff_max": 0.01}})
+
+    yield url
+
+    server.shutdown()
+    server.server_close()
+
+
+def download(platform, filename, **kwargs):
+
+    """ Downloads the stub's export to filename, in small chunks. """
+
+    return export.download_export(platform, API_KEY, CLIENT_ID, EXPORT_ID, str(filename), chunk_size=64 * 1024,
+                                  **kwargs)
+
+
+def assert_downloaded(filename, checksum):
+
+    """ Checks that filename holds the whole export, and that no .part file is left behind. """
+
+    with open(filename, "rb") as downloaded:
+        assert downloaded.read() == EXPORT_DATA
+
+    assert checksum == hashlib.sha256(EXPORT_DATA).hexdigest()
+    assert not os.path.exists(str(filename) + ".part")
+
+
+def test_complete_download(platform, tmp_path):
+
+    filename = tmp_path / "export.zip"
+
+    assert_downloaded(filename, download(platform, filename))
+    assert ExportStub.range_headers == [None]
+
+
+def test_resumes_after_connection_is_cut(platform, tmp_path):
+
+    filename = tmp_path / "export.zip"
+    ExportStub.cuts = 1
+
+    assert_downloaded(filename, download(platform, filename))
+
+    #  The second request carries on from the bytes already received.
+    assert len(ExportStub.range_headers) == 2
+    assert ExportStub.range_headers[0] is None
+    assert 0 < int(re.match(r"bytes=(\d+)-$", ExportStub.range_headers[1]).group(1)) <= 1024 * 1024
+
+
+def test_resumes_from_leftover_part_file(platform, tmp_path):
+
+    filename = tmp_path / "export.zip"
+    with open(str(filename) + ".part", "wb") as part_file:
+        part_file.write(EXPORT_DATA[:1000])
+
+    assert_downloaded(filename, download(platform, filename))
+    assert ExportStub.range_headers == ["bytes=1000-"]
+
+
+def test_starts_again_if_range_is_ignored(platform, tmp_path):
+
+    filename = tmp_path / "export.zip"
+    ExportStub.cuts = 1
+    ExportStub.ranges = False
+
+    assert_downloaded(filename, download(platform, filename))
+    assert len(ExportStub.range_headers) == 2
+    assert ExportStub.range_headers[1] is not None
+
+
+def test_starts_again_if_part_file_is_too_long(platform, tmp_path):
+
+    filename = tmp_path / "export.zip"
+    with open(str(filename) + ".part", "wb") as part_file:
+        part_file.write(EXPORT_DATA + b"extra")
+
+    assert_downloaded(filename, download(platform, filename))
+    assert ExportStub.range_headers == [f"bytes={len(EXPORT_DATA) + 5}-", None]
+
+
+def test_checksum_mismatch(platform, tmp_path):
+
+    filename = tmp_path / "export.zip"
+
+    assert download(platform, filename, expected_sha256="0" * 64) is None
+    assert not os.path.exists(filename)
+    assert not os.path.exists(str(filename) + ".part")
+
+
+def test_gives_up_after_retries(platform, tmp_path):
+
+    filename = tmp_path / "export.zip"
+
+    #  Cut off every attempt the retry policy allows.
+    ExportStub.cuts = 3
+    ExportStub.cut_after = 200 * 1024
+
+    assert download(platform, filename) is None
+
+    #  The bytes received are kept, so a later run can carry on from them.
+    assert len(ExportStub.range_headers) == 3
+    assert os.path.getsize(str(filename) + ".part") > 0
+
+
+
+def write_export(filename, files):
+
+    """ Writes a zip file holding the given {name: text} files, like a downloaded export. """
+
+    with zipfile.ZipFile(filename, "w") as archive:
+        for name, text in files.items():
+            archive.writestr(name, text)
+
+
+def test_export_rows_are_typed(tmp_path):
+
+    filename = tmp_path / "export.zip"
+    write_export(filename, {
+        "findings.csv": "\ufeffID,Name,Score,Open,ZIP\n1,web01,9.5,true,007\n2,,0.0,false,\n",
+        "readme.txt": "not a csv file"
+    })
+
+    assert list(export.iter_export_rows(str(filename))) == [
+        ("findings.csv", {"ID": 1, "Name": "web01", "Score": 9.5, "Open": True, "ZIP": "007"}),
+        ("findings.csv", {"ID": 2, "Name": None, "Score": 0.0, "Open": False, "ZIP": None})
+    ]
+
+
+def test_export_rows_with_missing_and_extra_values(tmp_path):
+
+    filename = tmp_path / "export.zip"
+    write_export(filename, {"findings.csv": "A,B,C\n1,2,3\n4,5\n6,7,8,9,true\n"})
+
+    assert [row for _, row in export.iter_export_rows(str(filename))] == [
+        {"A": 1, "B": 2, "C": 3},
+        {"A": 4, "B": 5, "C": None},
+        {"A": 6, "B": 7, "C": 8, export.EXTRA_VALUES: ["9", "true"]}
+    ]
+
+
+"""
+   Copyright 2019 RiskSense, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
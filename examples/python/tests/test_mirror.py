@@ -0,0 +1,150 @@
+""" *******************************************************************************************************************
+|
+|  Name        : test_mirror.py
+|  Description : Tests for the local SQLite mirror (rs_api/mirror.py), run against a local stub of the search
+                 endpoint whose results can change part way through a sync.
+|  Copyright   : (c) RiskSense, Inc.
+|  License     : Apache-2.0 (https://www.apache.org/licenses/LICENSE-2.0.txt)
+|
+******************************************************************************************************************* """
+
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+#  Make the shared rs_api package (one directory up) importable.
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+from rs_api import mirror, session  # noqa: E402
+
+API_KEY = "test-key"
+CLIENT_ID = 123
+
+
+class HostSearchStub(BaseHTTPRequestHandler):
+
+    """
+    Stand-in for /api/v1/client/{clientId}/host/search.  Serves the hosts in host_ids,
+    sorted by ID, honouring the "id" RANGE filter used by keyset pagination.  If
+    delete_after_first is set, that host is removed once the first page has been served,
+    as if it had been deleted on the platform during the sync.
+    """
+
+    host_ids = []
+    delete_after_first = None
+
+    def do_POST(self):
+
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+
+        matching = list(self.host_ids)
+        for search_filter in body['filters']:
+            if search_filter['field'] == "id" and search_filter['operator'] == "RANGE":
+                low, high = (int(value) for value in search_filter['value'].split(","))
+                matching = [host_id for host_id in matching if low <= host_id <= high]
+
+        size = body['size']
+        first = body['page'] * size
+
+        result = {
+            "_embedded": {"hosts": [{"id": host_id, "hostName": f"host{host_id}"}
+                                    for host_id in matching[first:first + size]]},
+            "page": {
+                "size": size,
+                "number": body['page'],
+                "totalElements": len(matching),
+                "totalPages": -(-len(matching) // size)
+            }
+        }
+
+        content = json.dumps(result).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+        if self.delete_after_first is not None:
+            HostSearchStub.host_ids.remove(self.delete_after_first)
+            HostSearchStub.delete_after_first = None
+
+    def log_message(self, *args):
+
+        pass
+
+
+@pytest.fixture
+def platform():
+
+    """ Starts the stub, and yields its URL. """
+
+    HostSearchStub.host_ids = list(range(1, 501))
+    HostSearchStub.delete_after_first = None
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), HostSearchStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    session.open_client(url, API_KEY)
+
+    yield url
+
+    server.shutdown()
+    server.server_close()
+
+
+def mirrored_ids(connection):
+
+    """ Returns the IDs of the hosts in the mirror. """
+
+    return [row[0] for row in connection.execute("SELECT id FROM host WHERE client_id = ? ORDER BY id",
+                                                 (CLIENT_ID,))]
+
+
+def test_full_sync(platform, tmp_path):
+
+    connection = mirror.connect(str(tmp_path / "mirror.db"))
+
+    assert mirror.sync_resource(connection, platform, API_KEY, CLIENT_ID, "host") == 500
+    assert mirrored_ids(connection) == list(range(1, 501))
+
+    #  Hosts deleted on the platform are removed by the next full sync.
+    HostSearchStub.host_ids.remove(250)
+
+    assert mirror.sync_resource(connection, platform, API_KEY, CLIENT_ID, "host") == 499
+    assert 250 not in mirrored_ids(connection)
+
+
+def test_delete_during_full_sync_keeps_live_hosts(platform, tmp_path):
+
+    connection = mirror.connect(str(tmp_path / "mirror.db"))
+    mirror.sync_resource(connection, platform, API_KEY, CLIENT_ID, "host")
+
+    #  A host on the first page is deleted once that page has been served.  Paging by
+    #  page number would then skip host 101, and remove it from the mirror.
+    HostSearchStub.delete_after_first = 50
+
+    mirror.sync_resource(connection, platform, API_KEY, CLIENT_ID, "host")
+
+    assert set(HostSearchStub.host_ids) <= set(mirrored_ids(connection))
+    assert 101 in mirrored_ids(connection)
+
+
+"""
+   Copyright 2019 RiskSense, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
@@ -0,0 +1,121 @@
+""" *******************************************************************************************************************
+|
+|  Name        : test_search.py
+|  Description : Tests for the paginated search engine (rs_api/search.py), run against a local stub of the search
+                 endpoint that counts the requests it receives.
+|  Copyright   : (c) RiskSense, Inc.
+|  License     : Apache-2.0 (https://www.apache.org/licenses/LICENSE-2.0.txt)
+|
+******************************************************************************************************************* """
+
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+#  Make the shared rs_api package (one directory up) importable.
+sys.path.append(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+from rs_api import search, session  # noqa: E402
+
+API_KEY = "test-key"
+CLIENT_ID = 123
+
+
+class SearchStub(BaseHTTPRequestHandler):
+
+    """
+    Stand-in for /api/v1/client/{clientId}/<resource>/search.  Serves total_results results,
+    sorted by ID, and records the page number of every request received.
+    """
+
+    total_results = 0
+    requested_pages = []
+
+    def do_POST(self):
+
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.requested_pages.append(body['page'])
+
+        size = body['size']
+        first = body['page'] * size
+        last = min(first + size, self.total_results)
+
+        result = {
+            "_embedded": {"hosts": [{"id": i + 1} for i in range(first, last)]},
+            "page": {
+                "size": size,
+                "number": body['page'],
+                "totalElements": self.total_results,
+                "totalPages": -(-self.total_results // size)
+            }
+        }
+
+        content = json.dumps(result).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+
+        pass
+
+
+@pytest.fixture
+def platform():
+
+    """ Starts the stub, and yields its URL. """
+
+    SearchStub.requested_pages = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SearchStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    session.open_client(url, API_KEY)
+
+    yield url
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+@pytest.mark.parametrize("total_results, expected_pages", [(1050, 11), (1000, 10), (40, 1)])
+def test_one_request_per_page(platform, max_workers, total_results, expected_pages):
+
+    SearchStub.total_results = total_results
+
+    results = search.paginated_search(platform, API_KEY, CLIENT_ID, "host", [], page_size=100,
+                                      max_workers=max_workers)
+
+    assert [result['id'] for result in results] == list(range(1, total_results + 1))
+    assert sorted(SearchStub.requested_pages) == list(range(expected_pages))
+
+
+def test_no_results(platform):
+
+    SearchStub.total_results = 0
+
+    assert search.paginated_search(platform, API_KEY, CLIENT_ID, "host", []) == []
+    assert SearchStub.requested_pages == [0]
+
+
+"""
+   Copyright 2019 RiskSense, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""